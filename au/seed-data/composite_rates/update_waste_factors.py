@@ -8,13 +8,27 @@ NRM Waste Factor Standards:
 - Tiles: 1.10 (was 1.08, gap -2%)
 - Brickwork: 1.07 (was 1.05, gap -2%)
 - Concrete: 1.05 (was 1.02-1.03, gap -2-3%)
+
+All group files are loaded and classified in one batch and the totals of
+changed composites are recomputed in one vectorised roll-up, so a whole
+multi-region library (directories are searched for group_*.json) is
+updated in a single pass:
+
+    python update_waste_factors.py --dry-run
+    python update_waste_factors.py ../regional
 """
 
+import argparse
 import json
 import re
+import sys
+import time
 from pathlib import Path
 from typing import Dict, List, Tuple
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / 'scripts'))
+from costing_kernel import rollup_waste_update  # noqa: E402
+
 # NRM waste factor standards
 WASTE_FACTORS = {
     'timber': 1.10,
@@ -60,16 +74,26 @@ MATERIAL_PATTERNS = {
     ]
 }
 
-def identify_material_type(description: str, name: str = '') -> str:
-    """Identify material type from description and name."""
-    text = f"{description} {name}".lower()
+# One ordered alternation; a named group per material type
+MATERIAL_TYPES = tuple(MATERIAL_PATTERNS)
+MATERIAL_REGEX = re.compile(
+    '|'.join(f"(?P<{material_type}>{'|'.join(patterns)})" for material_type, patterns in MATERIAL_PATTERNS.items()),
+    re.IGNORECASE)
+_PRIORITY = {material_type: rank for rank, material_type in enumerate(MATERIAL_TYPES)}
 
-    for material_type, patterns in MATERIAL_PATTERNS.items():
-        for pattern in patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return material_type
+def identify_material_type(description: str, name: str = '') -> str:
+    """
+    Identify material type from description and name.
 
-    return 'default'
+    Types are tried in MATERIAL_PATTERNS order, so a timber match anywhere
+    in the text wins over an earlier steel match.
+    """
+    best = len(MATERIAL_TYPES)
+    for match in MATERIAL_REGEX.finditer(f"{description} {name}"):
+        best = min(best, _PRIORITY[match.lastgroup])
+        if best == 0:
+            break
+    return MATERIAL_TYPES[best] if best < len(MATERIAL_TYPES) else 'default'
 
 def get_waste_factor_for_material(material_type: str) -> float:
     """Get NRM-compliant waste factor for material type."""
@@ -112,87 +136,147 @@ def analyze_composite(composite: Dict) -> Tuple[str, float, str]:
 
     return (material_type, waste_factor, evidence)
 
-def process_file(filepath: Path) -> Dict:
-    """Process a single composite rates file."""
-    print(f"\nProcessing: {filepath.name}")
-
-    with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    stats = {
-        'total': len(data['rates']),
-        'updated': 0,
-        'unchanged': 0,
-        'by_material': {},
-        'details': []
-    }
+def classify_composites(composites: List[Dict]) -> List[Tuple[str, float, str]]:
+    """
+    analyze_composite for a batch of composites.
 
-    for composite in data['rates']:
-        current_waste = composite.get('material_waste_factor', 1.05)
-        material_type, new_waste, evidence = analyze_composite(composite)
+    Regional copies of a library repeat the same names and descriptions,
+    so results are cached by the text a composite is classified from.
+    """
+    cache = {}
+    results = []
+    for composite in composites:
+        materials = composite.get('components', {}).get('materials', [])
+        if not materials:
+            results.append(analyze_composite(composite))
+            continue
+        key = (composite.get('name', ''), composite.get('description', ''),
+               tuple((m.get('description'), m.get('resource_id')) for m in materials))
+        if key not in cache:
+            cache[key] = analyze_composite(composite)
+        results.append(cache[key])
+    return results
+
+def iter_group_paths(paths: List[Path]) -> List[Path]:
+    """Group files named directly, or found under directories (one per region)."""
+    found = []
+    for path in paths:
+        path = Path(path)
+        found.extend(sorted(path.rglob('group_*.json')) if path.is_dir() else [path])
+    return found
+
+def update_groups(paths: List[Path], dry_run: bool = False) -> Dict[Path, Dict]:
+    """
+    Apply NRM waste factors to every composite of the group files in one batch.
 
-        # Track statistics
-        if material_type not in stats['by_material']:
-            stats['by_material'][material_type] = {
-                'count': 0,
-                'waste_factor': new_waste
-            }
-        stats['by_material'][material_type]['count'] += 1
+    All files are loaded first, composites are classified together and the
+    totals of every changed composite are recomputed in a single vectorised
+    rollup. Files are only rewritten when something changed, and never with
+    dry_run.
 
-        # Update if different
-        if new_waste != current_waste:
+    Returns:
+        {path: stats} in path order
+    """
+    groups = []
+    for filepath in paths:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            groups.append((Path(filepath), json.load(f)))
+
+    composites = [composite for _, data in groups for composite in data['rates']]
+    analyses = iter(classify_composites(composites))
+
+    all_stats = {}
+    updated = []
+    for filepath, data in groups:
+        stats = {
+            'total': len(data['rates']),
+            'updated': 0,
+            'unchanged': 0,
+            'by_material': {},
+            'details': []
+        }
+        for composite in data['rates']:
+            current_waste = composite.get('material_waste_factor', 1.05)
+            material_type, new_waste, evidence = next(analyses)
+
+            # Track statistics
+            if material_type not in stats['by_material']:
+                stats['by_material'][material_type] = {
+                    'count': 0,
+                    'waste_factor': new_waste
+                }
+            stats['by_material'][material_type]['count'] += 1
+
+            if new_waste != current_waste:
+                updated.append((filepath, composite, new_waste))
+                stats['updated'] += 1
+                stats['details'].append({
+                    'code': composite['code'],
+                    'name': composite['name'],
+                    'material_type': material_type,
+                    'old_waste': current_waste,
+                    'new_waste': new_waste,
+                    'evidence': evidence
+                })
+            else:
+                stats['unchanged'] += 1
+        all_stats[filepath] = stats
+
+    # Recalculate nett_total/total_rate for all updated composites in one pass
+    # (only the waste factor changed, not component costs)
+    if updated:
+        totals = rollup_waste_update(
+            labour_total=[c.get('labour_total', 0) for _, c, _ in updated],
+            materials_total=[c.get('materials_total', 0) for _, c, _ in updated],
+            plant_total=[c.get('plant_total', 0) for _, c, _ in updated],
+            waste_factor=[waste for _, _, waste in updated],
+            ohp_percent=[c.get('ohp_percent', 15) for _, c, _ in updated],
+        )
+        details = iter(detail for stats in all_stats.values() for detail in stats['details'])
+        for (filepath, composite, new_waste), nett, total, detail in zip(
+                updated, totals['nett_total'].tolist(), totals['total_rate'].tolist(), details):
+            if dry_run:
+                detail.update(old_total_rate=composite.get('total_rate'), new_total_rate=total)
+                continue
             composite['material_waste_factor'] = new_waste
-
             # Also update waste_percent for consistency
             composite['waste_percent'] = int((new_waste - 1.0) * 100)
+            composite['nett_total'] = nett
+            composite['total_rate'] = total
+
+    if not dry_run:
+        for filepath, data in groups:
+            if all_stats[filepath]['updated']:
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
 
-            # Recalculate nett_total (only waste_percent changed, not component costs)
-            labour_total = composite.get('labour_total', 0)
-            materials_total = composite.get('materials_total', 0)
-            plant_total = composite.get('plant_total', 0)
-
-            # Apply waste factor to materials only
-            materials_with_waste = materials_total * new_waste
-            composite['nett_total'] = round(labour_total + materials_with_waste + plant_total, 2)
-
-            # Update total_rate with OHP
-            ohp_percent = composite.get('ohp_percent', 15)
-            composite['total_rate'] = round(composite['nett_total'] * (1 + ohp_percent / 100), 2)
-
-            stats['updated'] += 1
-            stats['details'].append({
-                'code': composite['code'],
-                'name': composite['name'],
-                'material_type': material_type,
-                'old_waste': current_waste,
-                'new_waste': new_waste,
-                'evidence': evidence
-            })
-        else:
-            stats['unchanged'] += 1
-
-    # Write updated data back
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-    return stats
+    return all_stats
+
+def process_file(filepath: Path, dry_run: bool = False) -> Dict:
+    """Process a single composite rates file."""
+    return update_groups([filepath], dry_run)[Path(filepath)]
 
 def main():
     """Main execution function."""
     base_path = Path(__file__).parent
 
-    files = [
-        'group_0_facilitating.json',
-        'group_1_substructure.json',
-        'group_2_superstructure.json',
-        'group_3_finishes.json',
-        'group_4_fittings.json',
-        'group_5_services.json',
-        'group_8_external.json'
-    ]
+    parser = argparse.ArgumentParser(description='Apply NRM material waste factors to composite rates')
+    parser.add_argument('paths', nargs='*', default=[str(base_path)],
+                        help='Group files, or directories searched for group_*.json (default: this directory)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Print the changes that would be made without writing any file')
+    parser.add_argument('--report', default=str(base_path / 'waste_factor_update_report.json'),
+                        help='Detailed report path (not written with --dry-run)')
+    args = parser.parse_args()
+
+    files = iter_group_paths([Path(p) for p in args.paths])
+    missing = [f for f in files if not f.exists()]
+    for filepath in missing:
+        print(f"WARNING: {filepath} not found, skipping")
+    files = [f for f in files if f.exists()]
 
     print("=" * 80)
-    print("NRM Waste Factor Update - Composite Rates")
+    print("NRM Waste Factor Update - Composite Rates" + (" (dry run)" if args.dry_run else ""))
     print("=" * 80)
 
     all_stats = {
@@ -202,20 +286,22 @@ def main():
         'all_details': []
     }
 
-    for filename in files:
-        filepath = base_path / filename
-        if not filepath.exists():
-            print(f"WARNING: {filename} not found, skipping")
-            continue
-
-        stats = process_file(filepath)
+    start = time.perf_counter()
+    file_stats = update_groups(files, args.dry_run)
+    elapsed = time.perf_counter() - start
 
+    for filepath, stats in file_stats.items():
+        print(f"\nProcessing: {filepath}")
         print(f"  Total composites: {stats['total']}")
         print(f"  Updated: {stats['updated']}")
         print(f"  Unchanged: {stats['unchanged']}")
         print(f"  Material breakdown:")
         for material, info in sorted(stats['by_material'].items()):
             print(f"    {material}: {info['count']} composites @ {info['waste_factor']}")
+        if args.dry_run:
+            for detail in stats['details']:
+                print(f"    ~ {detail['code']:<20} waste {detail['old_waste']} -> {detail['new_waste']}  "
+                      f"total_rate {detail['old_total_rate']} -> {detail['new_total_rate']}  ({detail['material_type']})")
 
         all_stats['total_composites'] += stats['total']
         all_stats['total_updated'] += stats['updated']
@@ -230,15 +316,21 @@ def main():
     print("\n" + "=" * 80)
     print("SUMMARY")
     print("=" * 80)
-    print(f"Total composites processed: {all_stats['total_composites']}")
-    print(f"Total updated: {all_stats['total_updated']}")
+    print(f"Total composites processed: {all_stats['total_composites']} in {elapsed:.2f}s")
+    print(f"Total {'to update' if args.dry_run else 'updated'}: {all_stats['total_updated']}")
+    if not all_stats['total_composites']:
+        return 0
     print(f"Update rate: {all_stats['total_updated'] / all_stats['total_composites'] * 100:.1f}%")
     print(f"\nMaterial breakdown (across all files):")
     for material, info in sorted(all_stats['by_material'].items(), key=lambda x: x[1]['count'], reverse=True):
         print(f"  {material}: {info['count']} composites @ {info['waste_factor']}")
 
+    if args.dry_run:
+        print("\nDry run: no files written")
+        return 0
+
     # Write detailed report
-    report_path = base_path / 'waste_factor_update_report.json'
+    report_path = Path(args.report)
     with open(report_path, 'w', encoding='utf-8') as f:
         json.dump(all_stats, f, indent=2, ensure_ascii=False)
 
@@ -246,21 +338,21 @@ def main():
 
     # Calculate before/after average waste factors
     old_avg = 1.05  # All were 1.05 before
-    if all_stats['total_composites'] > 0:
-        new_avg = sum(
-            info['count'] * info['waste_factor']
-            for info in all_stats['by_material'].values()
-        ) / all_stats['total_composites']
-
-        print(f"\nAverage waste factor:")
-        print(f"  Before: {old_avg:.3f}")
-        print(f"  After: {new_avg:.3f}")
-        print(f"  Change: +{(new_avg - old_avg):.3f} ({(new_avg / old_avg - 1) * 100:.1f}%)")
-
-        # Estimate quantity impact
-        print(f"\nEstimated material quantity impact:")
-        print(f"  Previous underestimation: ~{(1 - old_avg / new_avg) * 100:.1f}%")
-        print(f"  Correction factor: {new_avg / old_avg:.4f}x")
+    new_avg = sum(
+        info['count'] * info['waste_factor']
+        for info in all_stats['by_material'].values()
+    ) / all_stats['total_composites']
+
+    print(f"\nAverage waste factor:")
+    print(f"  Before: {old_avg:.3f}")
+    print(f"  After: {new_avg:.3f}")
+    print(f"  Change: +{(new_avg - old_avg):.3f} ({(new_avg / old_avg - 1) * 100:.1f}%)")
+
+    # Estimate quantity impact
+    print(f"\nEstimated material quantity impact:")
+    print(f"  Previous underestimation: ~{(1 - old_avg / new_avg) * 100:.1f}%")
+    print(f"  Correction factor: {new_avg / old_avg:.4f}x")
+    return 0
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
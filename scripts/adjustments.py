@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Time-indexed regional factor, GST and escalation lookups.
+
+005_adjustment_tables.sql models regional_factors and gst_rates as values
+per region with [effective_from, effective_to] ranges, and
+escalation_indices as an index value per (year, quarter). The seed copy is
+au/reference-data/adjustment_factors.json; a Supabase CSV export of any of
+the tables can replace its seed table.
+
+Each interval table is held as arrays sorted by (region, effective_from)
+and packed into one int64 key per row, so a batch of point-in-time lookups
+is a single np.searchsorted followed by an effective_to check. Escalation
+indices are sorted by quarter ordinal (year * 4 + quarter - 1) and resolve
+to the latest index at or before a quarter; quarters before the first
+index use the first one, quarters after the last use the last one, and
+both are reported as extrapolated.
+
+Rebasing a rate from (source region, base_date) to (target region, target
+date) multiplies its money fields by
+
+    escalation(target quarter) / escalation(base quarter)
+    * regional_factor(target region, target date) / regional_factor(source region, base_date)
+
+computed for a whole library or estimate portfolio in one pass:
+
+    python adjustments.py lookup --region NT --date 2025-06-30
+    python adjustments.py rebase --to 2026-10-01 --region NT
+    python adjustments.py --bench 100000
+"""
+import argparse
+import csv
+import json
+import re
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from costing_kernel import py_round
+from regional_rates import Regions, load_regions
+
+BASE_DIR = Path(__file__).parent.parent
+RATES_DIR = BASE_DIR / 'au' / 'seed-data' / 'composite_rates'
+ADJUSTMENTS_FILE = BASE_DIR / 'au' / 'reference-data' / 'adjustment_factors.json'
+
+TOTAL_FIELDS = ('labour_total', 'materials_total', 'plant_total', 'nett_total', 'total_rate')
+
+# Days since epoch fit well inside this; keys are region_id * _KEY_STRIDE + day
+_KEY_STRIDE = 1 << 32
+_OPEN_END = np.iinfo(np.int64).max
+
+_MONTHS = {name: i for i, name in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), 1)}
+
+
+# =============================================================================
+# DATES
+# =============================================================================
+
+def parse_date(value) -> date:
+    """
+    Parse ISO dates ('2025-06-30'), base_date labels ('Jan-2025') and
+    quarters ('2025Q3', '2025-Q3', first day of the quarter).
+    """
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    match = re.fullmatch(r'(\d{4})-?[Qq]([1-4])', text)
+    if match:
+        return date(int(match.group(1)), 3 * int(match.group(2)) - 2, 1)
+    match = re.fullmatch(r'([A-Za-z]{3})[a-z]*[- ](\d{4})', text)
+    if match and match.group(1).lower() in _MONTHS:
+        return date(int(match.group(2)), _MONTHS[match.group(1).lower()], 1)
+    try:
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        raise ValueError(f'Unrecognised date: {value!r}') from None
+
+
+def day_number(value) -> int:
+    """Days since 1970-01-01."""
+    return parse_date(value).toordinal() - date(1970, 1, 1).toordinal()
+
+
+def quarter_ordinal(value) -> int:
+    d = parse_date(value)
+    return d.year * 4 + (d.month - 1) // 3
+
+
+class Labels(NamedTuple):
+    """
+    A factorised label column: labels[i] == unique[inverse[i]].
+
+    Regions and base dates repeat heavily across a library or portfolio,
+    so lookups resolve each distinct label once and gather by inverse.
+    """
+    unique: np.ndarray
+    inverse: np.ndarray
+
+    def take(self, rows: np.ndarray) -> 'Labels':
+        return Labels(self.unique, self.inverse[rows])
+
+    def fill(self, mask: np.ndarray, other: 'Labels') -> 'Labels':
+        """Labels with rows where mask is set taken from other."""
+        inverse = np.where(mask, other.inverse + len(self.unique), self.inverse)
+        used, inverse = np.unique(inverse, return_inverse=True)
+        return Labels(np.concatenate([self.unique, other.unique])[used], inverse)
+
+    def map(self, func) -> np.ndarray:
+        """func applied to each distinct label, gathered per row."""
+        return np.array([func(v) for v in self.unique])[self.inverse]
+
+
+def factorise(values) -> Labels:
+    if isinstance(values, Labels):
+        return values
+    seen: Dict[str, int] = {}
+    inverse = np.fromiter((seen.setdefault(str(v), len(seen)) for v in values), dtype=np.int64)
+    return Labels(np.array(list(seen), dtype=object), inverse)
+
+
+def _parse_dates(labels: Labels, default) -> Tuple[Labels, np.ndarray]:
+    """
+    Distinct labels parsed to dates, with blank or unrecognised labels set
+    to default, and the per-row mask of labels that parsed.
+    """
+    dates, known = [], []
+    for value in labels.unique:
+        try:
+            dates.append(parse_date(value))
+            known.append(True)
+        except ValueError:
+            dates.append(parse_date(default))
+            known.append(False)
+    return Labels(np.array(dates, dtype=object), labels.inverse), np.array(known, dtype=bool)[labels.inverse]
+
+
+def _days(values) -> np.ndarray:
+    labels = factorise(values)
+    if not len(labels.unique):
+        return np.zeros(0, dtype=np.int64)
+    return labels.map(day_number).astype(np.int64)
+
+
+# =============================================================================
+# TABLES
+# =============================================================================
+
+def load_table(path: Path, table: str) -> List[Dict]:
+    """Rows of table from the seed JSON (one key per table) or a CSV export."""
+    path = Path(path)
+    if path.suffix.lower() == '.csv':
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            return [{k: (v if v != '' else None) for k, v in row.items()} for row in csv.DictReader(f)]
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get(table, [])
+
+
+class IntervalTable:
+    """
+    Values per key with [effective_from, effective_to] validity ranges.
+
+    effective_to is inclusive and None means open-ended, as in the SQL
+    get_current_* functions. Ranges of one key must not overlap.
+    """
+
+    def __init__(self, rows: Sequence[Mapping], key_field: str, value_field: str):
+        self.keys = sorted({str(row[key_field]) for row in rows})
+        self._key_ids = {key: i for i, key in enumerate(self.keys)}
+        key_ids = np.array([self._key_ids[str(row[key_field])] for row in rows], dtype=np.int64)
+        starts = _days([row['effective_from'] for row in rows])
+        ends = np.array([_OPEN_END if row.get('effective_to') in (None, '') else day_number(row['effective_to'])
+                         for row in rows], dtype=np.int64)
+        values = np.array([float(row[value_field]) for row in rows], dtype=float)
+
+        order = np.lexsort((starts, key_ids))
+        self.key_ids = key_ids[order]
+        self.starts = starts[order]
+        self.ends = ends[order]
+        self.values = values[order]
+        self._packed = self.key_ids * _KEY_STRIDE + self.starts
+
+        same_key = self.key_ids[1:] == self.key_ids[:-1]
+        overlap = same_key & (self.ends[:-1] >= self.starts[1:])
+        if overlap.any():
+            bad = sorted({self.keys[k] for k in self.key_ids[1:][overlap]})
+            raise ValueError(f'Overlapping effective ranges for {", ".join(bad)}')
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def lookup(self, keys, days: np.ndarray) -> np.ndarray:
+        """Value in effect for each (key, day); NaN where none applies."""
+        labels = factorise(keys)
+        key_ids = np.array([self._key_ids.get(k, -1) for k in labels.unique], dtype=np.int64)[labels.inverse]
+        days = np.asarray(days, dtype=np.int64)
+        if not len(self.values):
+            return np.full(len(days), np.nan)
+        pos = np.searchsorted(self._packed, key_ids * _KEY_STRIDE + days, side='right') - 1
+        safe = np.maximum(pos, 0)
+        found = (pos >= 0) & (key_ids >= 0) & (self.key_ids[safe] == key_ids) & (self.ends[safe] >= days)
+        return np.where(found, self.values[safe], np.nan)
+
+    def value(self, key: str, when) -> Optional[float]:
+        result = self.lookup([key], np.array([day_number(when)]))[0]
+        return None if np.isnan(result) else float(result)
+
+
+class EscalationIndex:
+    """Quarterly escalation indices resolved at or before a quarter."""
+
+    def __init__(self, rows: Sequence[Mapping]):
+        base_years = {int(row['base_year']) for row in rows}
+        if len(base_years) > 1:
+            raise ValueError(f'Escalation indices mix base years: {sorted(base_years)}')
+        if not rows:
+            raise ValueError('No escalation indices')
+        quarters = np.array([int(row['year']) * 4 + int(row['quarter']) - 1 for row in rows], dtype=np.int64)
+        order = np.argsort(quarters, kind='stable')
+        self.quarters = quarters[order]
+        self.values = np.array([float(rows[i]['index_value']) for i in order], dtype=float)
+        if (np.diff(self.quarters) == 0).any():
+            raise ValueError('Duplicate escalation quarters')
+
+    def lookup(self, quarters: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(index value, extrapolated mask) for quarter ordinals."""
+        quarters = np.asarray(quarters, dtype=np.int64)
+        pos = np.searchsorted(self.quarters, quarters, side='right') - 1
+        extrapolated = (pos < 0) | (quarters > self.quarters[-1])
+        return self.values[np.maximum(pos, 0)], extrapolated
+
+    def factor(self, base_quarters: np.ndarray, target_quarter: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(escalation factor from each base quarter to target, extrapolated mask)."""
+        base, base_extrapolated = self.lookup(base_quarters)
+        target, target_extrapolated = self.lookup(np.array([target_quarter]))
+        return target[0] / base, base_extrapolated | target_extrapolated[0]
+
+
+# =============================================================================
+# ENGINE
+# =============================================================================
+
+class AdjustmentEngine:
+    """Regional factor, GST and escalation lookups over interval arrays."""
+
+    def __init__(self, regional_factors: Sequence[Mapping], gst_rates: Sequence[Mapping],
+                 escalation_indices: Sequence[Mapping], regions: Optional[Regions] = None):
+        self.regional = IntervalTable(regional_factors, 'region_code', 'factor')
+        self.gst = IntervalTable(gst_rates, 'region_code', 'rate')
+        self.escalation = EscalationIndex(escalation_indices)
+        self.regions = regions or Regions(load_regions())
+
+    @classmethod
+    def from_sources(cls, path: Path = ADJUSTMENTS_FILE, regional_csv: Optional[Path] = None,
+                     gst_csv: Optional[Path] = None, escalation_csv: Optional[Path] = None) -> 'AdjustmentEngine':
+        return cls(load_table(regional_csv or path, 'regional_factors'),
+                   load_table(gst_csv or path, 'gst_rates'),
+                   load_table(escalation_csv or path, 'escalation_indices'))
+
+    def region_codes(self, regions) -> Labels:
+        """Region codes for codes or names (rates store the region name)."""
+        labels = factorise(regions)
+        codes = []
+        for region in labels.unique:
+            try:
+                codes.append(self.regions[region]['code'])
+            except KeyError:
+                codes.append(region)
+        return Labels(np.array(codes, dtype=object), labels.inverse)
+
+    def regional_factor(self, regions, when) -> np.ndarray:
+        return self.regional.lookup(self.region_codes(regions), _days(when))
+
+    def gst_rate(self, regions, when) -> np.ndarray:
+        return self.gst.lookup(self.region_codes(regions), _days(when))
+
+    def rebase_factors(self, source_regions, base_dates, target_date, target_regions=None) -> Dict[str, np.ndarray]:
+        """
+        Per-row multiplier from (source region, base date) to target_date,
+        in target_regions (one region, one per row, or None for each row's
+        own region). Label columns may be sequences or Labels.
+
+        Returns ``factor``, ``escalation``, ``regional`` and the masks
+        ``extrapolated`` (escalation outside the index range) and
+        ``unresolved`` (no regional factor in effect, or a blank or
+        unrecognised base date; factor is NaN).
+        """
+        base_dates, dated = _parse_dates(factorise(base_dates), target_date)
+        source_regions = factorise(source_regions)
+        size = len(base_dates.inverse)
+        base_quarters = np.array([quarter_ordinal(d) for d in base_dates.unique], dtype=np.int64)
+        escalation, extrapolated = self.escalation.factor(base_quarters, quarter_ordinal(target_date))
+        escalation = np.where(dated, escalation[base_dates.inverse], np.nan)
+        extrapolated = dated & extrapolated[base_dates.inverse]
+
+        if target_regions is None:
+            targets = source_regions
+        elif isinstance(target_regions, str):
+            targets = Labels(np.array([target_regions], dtype=object), np.zeros(size, dtype=np.int64))
+        else:
+            targets = target_regions
+        source_factor = self.regional_factor(source_regions, base_dates)
+        target_factor = self.regional.lookup(self.region_codes(targets), np.full(size, day_number(target_date)))
+        regional = np.where(dated, target_factor / source_factor, np.nan)
+        factor = escalation * regional
+        return {
+            'factor': factor,
+            'escalation': escalation,
+            'regional': regional,
+            'extrapolated': extrapolated,
+            'unresolved': np.isnan(factor),
+        }
+
+
+def rebase_totals(totals: Mapping[str, np.ndarray], factors: np.ndarray) -> Dict[str, np.ndarray]:
+    """Scale money columns by per-row factors; unresolved rows keep their values."""
+    keep = np.isnan(factors)
+    scale = np.where(keep, 1.0, factors)
+    return {field: np.where(keep, values, py_round(values * scale, 2)) for field, values in totals.items()}
+
+
+class RateLibrary:
+    """Columnar money fields, base dates and regions of the composite library."""
+
+    def __init__(self, rates: Sequence[Mapping]):
+        self.codes = [rate.get('code') for rate in rates]
+        self.rows = {code: i for i, code in enumerate(self.codes)}
+        self.regions = factorise(rate.get('region', '') for rate in rates)
+        self.base_dates = factorise(rate.get('base_date', '') for rate in rates)
+        self.totals = {field: np.array([rate.get(field) or 0.0 for rate in rates], dtype=float)
+                       for field in TOTAL_FIELDS}
+
+    @classmethod
+    def from_rates_dir(cls, rates_dir: Path = RATES_DIR) -> 'RateLibrary':
+        rates = []
+        for path in sorted(Path(rates_dir).glob('group_*.json')):
+            with open(path, 'r', encoding='utf-8') as f:
+                rates.extend(json.load(f).get('rates', []))
+        return cls(rates)
+
+    def rebase(self, engine: AdjustmentEngine, target_date, target_region: Optional[str] = None):
+        """(rebased totals, factor details) for the whole library."""
+        factors = engine.rebase_factors(self.regions, self.base_dates, target_date, target_region)
+        return rebase_totals(self.totals, factors['factor']), factors
+
+    def reprice_portfolio(self, engine: AdjustmentEngine, lines: Sequence[Mapping], target_date):
+        """
+        Reprice estimate lines ({code, quantity, region?, base_date?}) to
+        target_date in one pass. A line's region defaults to the rate's own
+        and its base_date to the rate's base_date; KeyError for an unknown
+        code. Returns per-line rebased totals, ``amount`` and factor details.
+        """
+        rows = np.array([self.rows[line['code']] for line in lines], dtype=np.int64)
+        quantity = np.array([line.get('quantity', 1) for line in lines], dtype=float)
+        sources = self.regions.take(rows)
+
+        # Per-line overrides, falling back to the rate's own labels
+        targets = factorise(line.get('region') or '' for line in lines)
+        targets = targets.fill(targets.unique[targets.inverse] == '', sources)
+        base_dates = factorise(line.get('base_date') or '' for line in lines)
+        base_dates = base_dates.fill(base_dates.unique[base_dates.inverse] == '', self.base_dates.take(rows))
+
+        factors = engine.rebase_factors(sources, base_dates, target_date, targets)
+        totals = rebase_totals({field: values[rows] for field, values in self.totals.items()}, factors['factor'])
+        totals['amount'] = py_round(quantity * totals['total_rate'], 2)
+        return totals, factors
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def benchmark(library: RateLibrary, engine: AdjustmentEngine, size: int, repeat: int = 20):
+    rng = np.random.default_rng(0)
+    region_codes = [r['code'] for r in engine.regions.regions]
+    lines = [{'code': library.codes[rng.integers(len(library.codes))],
+              'quantity': float(rng.uniform(1, 100)),
+              'region': region_codes[rng.integers(len(region_codes))]} for _ in range(size)]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        totals, _ = library.reprice_portfolio(engine, lines, date.today())
+        timings.append(time.perf_counter() - start)
+    p50, p95 = np.percentile(timings, [50, 95]) * 1000
+    print(f"{size} lines, total {totals['amount'].sum():,.2f}: p50 {p50:.2f} ms  p95 {p95:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Regional factor, GST and escalation adjustments')
+    parser.add_argument('command', nargs='?', choices=('lookup', 'rebase'))
+    parser.add_argument('--region', help='Region code or name')
+    parser.add_argument('--date', default=date.today().isoformat(), help='Lookup date (lookup)')
+    parser.add_argument('--to', default=date.today().isoformat(),
+                        help='Target date or quarter, e.g. 2026-10-01 or 2026Q4 (rebase)')
+    parser.add_argument('--adjustments', default=str(ADJUSTMENTS_FILE), help='Seed adjustment_factors.json')
+    parser.add_argument('--regional-csv', help='regional_factors CSV export (replaces the seed table)')
+    parser.add_argument('--gst-csv', help='gst_rates CSV export (replaces the seed table)')
+    parser.add_argument('--escalation-csv', help='escalation_indices CSV export (replaces the seed table)')
+    parser.add_argument('--rates-dir', default=str(RATES_DIR),
+                        help='Directory holding group_*.json composite files')
+    parser.add_argument('--bench', type=int, metavar='N', help='Benchmark repricing a portfolio of N lines')
+    args = parser.parse_args()
+
+    engine = AdjustmentEngine.from_sources(Path(args.adjustments), args.regional_csv, args.gst_csv,
+                                           args.escalation_csv)
+
+    if args.command == 'lookup':
+        regions = [args.region] if args.region else [r['code'] for r in engine.regions.regions]
+        factors = engine.regional_factor(regions, [args.date] * len(regions))
+        gst = engine.gst_rate(regions, [args.date] * len(regions))
+        index, extrapolated = engine.escalation.lookup(np.array([quarter_ordinal(args.date)]))
+        print(f"Escalation index at {args.date}: {index[0]:g}{' (extrapolated)' if extrapolated[0] else ''}")
+        codes = engine.region_codes(regions)
+        for region, factor, rate in zip(codes.unique[codes.inverse], factors, gst):
+            factor = 'none' if np.isnan(factor) else f'{factor:.4f}'
+            rate = 'none' if np.isnan(rate) else f'{rate:.2%}'
+            print(f"  {region:<14} factor {factor:>6}  GST {rate}")
+        return 0
+
+    library = RateLibrary.from_rates_dir(Path(args.rates_dir))
+    if args.bench:
+        benchmark(library, engine, args.bench)
+        return 0
+    if args.command != 'rebase':
+        parser.error('use "lookup", "rebase" or --bench')
+
+    start = time.perf_counter()
+    totals, factors = library.rebase(engine, args.to, args.region)
+    elapsed = time.perf_counter() - start
+    resolved = ~factors['unresolved']
+    before = library.totals['total_rate'][resolved].sum()
+    after = totals['total_rate'][resolved].sum()
+    print(f"Rebased {int(resolved.sum())} of {len(library.codes)} rates to {args.to}"
+          f"{' in ' + args.region if args.region else ''} in {elapsed * 1000:.2f} ms")
+    print(f"  Sum of total_rate: {before:,.2f} -> {after:,.2f}")
+    if factors['extrapolated'].any():
+        print(f"  WARNING: {int(factors['extrapolated'].sum())} rates use an escalation index outside "
+              f"the indexed quarters", file=sys.stderr)
+    if factors['unresolved'].any():
+        print(f"  WARNING: {int(factors['unresolved'].sum())} rates have no regional factor in effect",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Condition-factor composition over a precomputed multiplier table.
+
+condition_factors.json defines factors in five categories (location,
+height, weather, complexity, quantity), each applying to some resource
+types ("All", "Labour, Plant", "Labour"). Every category gets an implicit
+"unspecified" option plus one option per factor, and every combination of
+one option per category gets a combination id (mixed radix, categories in
+file order). The multiplier of each combination for each resource type is
+precomputed as the outer product of the per-category factors, giving a
+small dense (combinations x resource types) table:
+
+    table = ConditionTable.from_file()
+    combos = table.combinations(item_conditions)      # one id per line
+    labour = labour_totals * table.multipliers(combos, 'Labour')
+
+Conditions are {category: value}, where value is a factor code, the code
+without its CF_<CATEGORY>_ prefix, or the factor name.
+
+CompositeConditions applies the table to composite rates: slot totals are
+scaled per resource type, and the change is carried into nett_total (with
+material waste) and total_rate (with OHP) as a delta on the stored values,
+so a rate without conditions prices exactly as published.
+
+    python condition_factors.py table
+    python condition_factors.py rate GRP3-CEIFIN-067 --height 3.5m_7.0m --location restricted_access
+    python condition_factors.py --bench 2000
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from functools import reduce
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from costing_kernel import DEFAULT_OHP_PERCENT, py_round
+
+BASE_DIR = Path(__file__).parent.parent
+RATES_DIR = BASE_DIR / 'au' / 'seed-data' / 'composite_rates'
+CONDITION_FACTORS_FILE = BASE_DIR / 'au' / 'seed-data' / 'condition_factors.json'
+
+RESOURCE_TYPES = ('Labour', 'Materials', 'Plant')
+SLOT_TYPES = (('labour_total', 'Labour'), ('materials_total', 'Materials'), ('plant_total', 'Plant'))
+TOTAL_FIELDS = ('labour_total', 'materials_total', 'plant_total', 'nett_total', 'total_rate')
+DEFAULT_WASTE_FACTOR = 1.05
+
+
+def load_condition_factors(path: Path = CONDITION_FACTORS_FILE) -> List[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('condition_factors', [])
+
+
+def applies_to(factor: Mapping, resource_type: str) -> bool:
+    """True if a condition factor's applies_to covers resource_type."""
+    targets = {t.strip().lower() for t in str(factor.get('applies_to', '')).split(',')}
+    return 'all' in targets or resource_type.lower() in targets
+
+
+def _slug(text) -> str:
+    return re.sub(r'[^a-z0-9<>%]+', '_', str(text).lower()).strip('_')
+
+
+class ConditionTable:
+    """Dense multiplier table over all combinations of condition options."""
+
+    def __init__(self, factors: Sequence[Mapping], resource_types: Sequence[str] = RESOURCE_TYPES):
+        self.resource_types = tuple(resource_types)
+        self.categories: Dict[str, List[Mapping]] = {}
+        for factor in factors:
+            self.categories.setdefault(factor['category'], []).append(factor)
+
+        # Option 0 of every category is "unspecified" (factor 1.0)
+        self._lookup: Dict[Tuple[str, str], int] = {}
+        for category, options in self.categories.items():
+            prefix = f'CF_{category.upper()}_'
+            for option, factor in enumerate(options, 1):
+                code = factor['code']
+                suffix = code[len(prefix):] if code.startswith(prefix) else code
+                for key in (code, suffix, factor.get('name', '')):
+                    self._lookup.setdefault((category, _slug(key)), option)
+        self.shape = tuple(len(options) + 1 for options in self.categories.values())
+
+        columns = []
+        for resource_type in self.resource_types:
+            vectors = [np.array([1.0] + [float(f['factor']) if applies_to(f, resource_type) else 1.0
+                                         for f in options])
+                       for options in self.categories.values()]
+            columns.append(reduce(np.multiply.outer, vectors, np.ones(())).ravel())
+        self.table = np.stack(columns, axis=1)
+        self._memo: Dict[Tuple, int] = {}
+
+    @classmethod
+    def from_file(cls, path: Path = CONDITION_FACTORS_FILE, **kwargs) -> 'ConditionTable':
+        return cls(load_condition_factors(path), **kwargs)
+
+    def __len__(self) -> int:
+        return self.table.shape[0]
+
+    def option(self, category: str, value) -> int:
+        """Option index of a category value (0 for None); ValueError if unknown."""
+        if category not in self.categories:
+            raise ValueError(f'Unknown condition category: {category}')
+        if value is None:
+            return 0
+        option = self._lookup.get((category, _slug(value)))
+        if option is None:
+            raise ValueError(f'Unknown {category} condition: {value}')
+        return option
+
+    def combination(self, conditions: Optional[Mapping], unknown: Optional[List[str]] = None) -> int:
+        """
+        Combination id of a conditions mapping.
+
+        A None value leaves its category unspecified. Unknown categories or values raise ValueError, or, when an
+        ``unknown`` list is given, are appended to it and left unspecified.
+        """
+        if not conditions:
+            return 0
+        key = tuple(sorted((str(k), str(v)) for k, v in conditions.items()))
+        combo = self._memo.get(key)
+        if combo is not None and unknown is None:
+            return combo
+
+        index = [0] * len(self.shape)
+        positions = {category: i for i, category in enumerate(self.categories)}
+        complete = True
+        for category, value in conditions.items():
+            try:
+                index[positions[category]] = self.option(category, value)
+            except ValueError as e:
+                if unknown is None:
+                    raise
+                unknown.append(str(e))
+                complete = False
+        combo = int(np.ravel_multi_index(index, self.shape))
+        if complete:
+            self._memo[key] = combo
+        return combo
+
+    def combinations(self, conditions: Sequence[Optional[Mapping]]) -> np.ndarray:
+        return np.array([self.combination(c) for c in conditions], dtype=np.int64)
+
+    def describe(self, combo: int) -> Dict[str, str]:
+        """{category: factor code} of the specified options of a combination."""
+        index = np.unravel_index(combo, self.shape)
+        return {category: options[i - 1]['code']
+                for (category, options), i in zip(self.categories.items(), index) if i}
+
+    def multipliers(self, combos, resource_type: str) -> np.ndarray:
+        """Gather the multiplier of each combination for one resource type."""
+        return self.table[combos, self.resource_types.index(resource_type)]
+
+
+class CompositeConditions:
+    """
+    Composite rates adjusted for conditions.
+
+    Slot totals are scaled by the multiplier of their resource type and
+    rounded to cents. nett_total moves by the labour and plant change plus
+    the material change times its waste factor, and total_rate by the nett
+    change plus OHP. Single lookups through ``adjusted_rate`` are cached per
+    (composite, combination).
+    """
+
+    def __init__(self, composites: Sequence[Mapping], table: ConditionTable):
+        self.table = table
+        self.codes = [rate.get('code') for rate in composites]
+        self.rows = {code: i for i, code in enumerate(self.codes)}
+        self.totals = {field: np.array([rate.get(field) or 0.0 for rate in composites], dtype=float)
+                       for field in TOTAL_FIELDS}
+        self.waste = np.array([rate.get('material_waste_factor', DEFAULT_WASTE_FACTOR) for rate in composites],
+                              dtype=float)
+        self.ohp = np.array([rate.get('ohp_percent', DEFAULT_OHP_PERCENT) for rate in composites], dtype=float)
+        self._cache: Dict[Tuple[int, int], Dict[str, float]] = {}
+
+    @classmethod
+    def from_rates_dir(cls, rates_dir: Path = RATES_DIR, table: Optional[ConditionTable] = None):
+        composites = []
+        for path in sorted(Path(rates_dir).glob('group_*.json')):
+            with open(path, 'r', encoding='utf-8') as f:
+                composites.extend(json.load(f).get('rates', []))
+        return cls(composites, table or ConditionTable.from_file())
+
+    def price(self, rows: np.ndarray, combos: np.ndarray) -> Dict[str, np.ndarray]:
+        """Adjusted totals of composite rows under parallel combination ids."""
+        base = {field: values[rows] for field, values in self.totals.items()}
+        totals = {field: py_round(base[field] * self.table.multipliers(combos, resource_type), 2)
+                  for field, resource_type in SLOT_TYPES}
+        delta = (totals['labour_total'] - base['labour_total']
+                 + (totals['materials_total'] - base['materials_total']) * self.waste[rows]
+                 + totals['plant_total'] - base['plant_total'])
+        totals['nett_total'] = py_round(base['nett_total'] + delta, 2)
+        totals['total_rate'] = py_round(base['total_rate'] + (totals['nett_total'] - base['nett_total'])
+                                        * (1 + self.ohp[rows] / 100), 2)
+        return totals
+
+    def adjusted_rate(self, code: str, conditions: Optional[Mapping] = None) -> Dict[str, float]:
+        """Adjusted totals of one composite; KeyError for an unknown code."""
+        row = self.rows[code]
+        combo = self.table.combination(conditions)
+        cached = self._cache.get((row, combo))
+        if cached is None:
+            totals = self.price(np.array([row]), np.array([combo]))
+            cached = {field: float(values[0]) for field, values in totals.items()}
+            self._cache[(row, combo)] = cached
+        return cached
+
+    def price_estimate(self, lines: Sequence[Mapping]) -> Dict[str, np.ndarray]:
+        """
+        Price estimate lines ({code, quantity, conditions}) in one pass.
+
+        Returns the adjusted totals per line plus ``amount`` (quantity x
+        total_rate); raises KeyError for an unknown code.
+        """
+        rows = np.array([self.rows[line['code']] for line in lines], dtype=np.int64)
+        combos = self.table.combinations([line.get('conditions') for line in lines])
+        quantity = np.array([line.get('quantity', 1) for line in lines], dtype=float)
+        totals = self.price(rows, combos)
+        totals['amount'] = py_round(quantity * totals['total_rate'], 2)
+        return totals
+
+
+def benchmark(composites: CompositeConditions, size: int, repeat: int = 50):
+    rng = np.random.default_rng(0)
+    table = composites.table
+    categories = list(table.categories)
+    lines = []
+    for _ in range(size):
+        conditions = {}
+        for category in rng.choice(categories, size=rng.integers(0, 3), replace=False):
+            options = table.categories[category]
+            conditions[str(category)] = options[rng.integers(len(options))]['code']
+        lines.append({'code': composites.codes[rng.integers(len(composites.codes))],
+                      'quantity': float(rng.uniform(1, 200)), 'conditions': conditions})
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        totals = composites.price_estimate(lines)
+        timings.append(time.perf_counter() - start)
+    p50, p95 = np.percentile(timings, [50, 95]) * 1000
+    print(f"{len(table)} combinations x {len(table.resource_types)} resource types")
+    print(f"{size} lines, total {totals['amount'].sum():,.2f}: p50 {p50:.3f} ms  p95 {p95:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply condition factors to composite rates')
+    parser.add_argument('command', nargs='?', choices=('table', 'rate'))
+    parser.add_argument('code', nargs='?', help='Composite code for "rate"')
+    parser.add_argument('--factors', default=str(CONDITION_FACTORS_FILE), help='condition_factors.json path')
+    parser.add_argument('--rates-dir', default=str(RATES_DIR),
+                        help='Directory holding group_*.json composite files')
+    parser.add_argument('--bench', type=int, metavar='N', help='Benchmark pricing an estimate of N lines')
+    args, _ = parser.parse_known_args()
+
+    table = ConditionTable.from_file(Path(args.factors))
+    for category in table.categories:
+        parser.add_argument(f'--{category}', help=f'{category} condition (code, code suffix or name)')
+    args = parser.parse_args()
+
+    if args.command == 'table':
+        print(f"{len(table)} combinations over {', '.join(table.categories)}")
+        for resource_type in table.resource_types:
+            column = table.table[:, table.resource_types.index(resource_type)]
+            print(f"  {resource_type:<10} min {column.min():.4f}  max {column.max():.4f}")
+        return 0
+
+    composites = CompositeConditions.from_rates_dir(Path(args.rates_dir), table)
+    if args.bench:
+        benchmark(composites, args.bench)
+        return 0
+    if args.command != 'rate' or not args.code:
+        parser.error('use "table", "rate CODE" or --bench')
+
+    conditions = {c: getattr(args, c) for c in table.categories if getattr(args, c) is not None}
+    try:
+        combo = table.combination(conditions)
+        rate = composites.adjusted_rate(args.code, conditions)
+    except KeyError:
+        print(f"ERROR: Unknown rate code: {args.code}", file=sys.stderr)
+        return 1
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    json.dump({'code': args.code, 'combination': combo, 'conditions': table.describe(combo), **rate},
+              sys.stdout, indent=2, ensure_ascii=False)
+    print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
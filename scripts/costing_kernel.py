@@ -0,0 +1,107 @@
+"""Columnar costing kernel for composite rate roll-ups.
+
+Holds labour hours, gang rates, material, plant, waste and OHP as NumPy
+arrays and computes every roll-up for a whole library in one vectorised
+pass. Rounding matches Python's built-in round() exactly, so results are
+interchangeable with the per-record arithmetic it replaces.
+"""
+from typing import Dict, Sequence
+
+import numpy as np
+
+DEFAULT_WASTE_PERCENT = 5
+DEFAULT_OHP_PERCENT = 15
+
+# Scaled values closer than this to a .5 boundary are re-rounded in Python
+_HALF_TOLERANCE = 1e-6
+
+
+def py_round(values: np.ndarray, ndigits: int = 2) -> np.ndarray:
+    """
+    Round an array with the same results as Python's round(x, ndigits).
+
+    np.round scales by 10**ndigits before rounding, which only differs from
+    Python's correctly rounded decimal result when the scaled value lands
+    next to a .5 boundary. Those few elements are rounded by Python.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.round(values, ndigits)
+    scaled = values * (10.0 ** ndigits)
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < _HALF_TOLERANCE
+    if near_half.any():
+        idx = np.flatnonzero(near_half)
+        out.flat[idx] = [round(v, ndigits) for v in values.flat[idx].tolist()]
+    return out
+
+
+def _column(values: Sequence[float], size: int = None) -> np.ndarray:
+    arr = np.asarray(values, dtype=np.float64)
+    if size is not None and arr.ndim == 0:
+        arr = np.full(size, float(arr))
+    return arr
+
+
+def rollup_build_ups(hours: Sequence[float],
+                     gang_rate: Sequence[float],
+                     material: Sequence[float],
+                     plant: Sequence[float],
+                     waste_percent: Sequence[float] = DEFAULT_WASTE_PERCENT,
+                     ohp_percent: Sequence[float] = DEFAULT_OHP_PERCENT) -> Dict[str, np.ndarray]:
+    """
+    Roll up generated build-ups (generate_rates.build_rate).
+
+    Waste and OHP are applied to the unrounded direct cost, so total_rate is
+    not derived from the rounded nett_total. Scalars broadcast across rows.
+    """
+    hours = _column(hours)
+    size = hours.shape[0]
+    gang_rate = _column(gang_rate, size)
+    material = _column(material, size)
+    plant = _column(plant, size)
+    waste = 1 + _column(waste_percent, size) / 100
+    ohp = 1 + _column(ohp_percent, size) / 100
+
+    labour = hours * gang_rate
+    nett = (labour + material + plant) * waste
+    total = nett * ohp
+
+    inverse = np.divide(1.0, hours, out=np.zeros_like(hours), where=hours > 0)
+    output = np.where(hours > 0, py_round(inverse, 2), 1.0)
+
+    return {
+        'hrs_per_unit': py_round(hours, 4),
+        'output': output,
+        'rate_per_hour': py_round(gang_rate, 2),
+        'labour_total': py_round(labour, 2),
+        'materials_total': py_round(material, 2),
+        'plant_total': py_round(plant, 2),
+        'nett_total': py_round(nett, 2),
+        'total_rate': py_round(total, 2),
+    }
+
+
+def rollup_waste_update(labour_total: Sequence[float],
+                        materials_total: Sequence[float],
+                        plant_total: Sequence[float],
+                        waste_factor: Sequence[float],
+                        ohp_percent: Sequence[float] = DEFAULT_OHP_PERCENT) -> Dict[str, np.ndarray]:
+    """
+    Recompute totals after a material waste factor change.
+
+    Waste applies to materials only; total_rate is derived from the rounded
+    nett_total, as in update_waste_factors.process_file.
+    """
+    labour_total = _column(labour_total)
+    size = labour_total.shape[0]
+    materials_total = _column(materials_total, size)
+    plant_total = _column(plant_total, size)
+    waste_factor = _column(waste_factor, size)
+    ohp = 1 + _column(ohp_percent, size) / 100
+
+    nett = py_round(labour_total + materials_total * waste_factor + plant_total, 2)
+    total = py_round(nett * ohp, 2)
+
+    return {
+        'nett_total': nett,
+        'total_rate': total,
+    }
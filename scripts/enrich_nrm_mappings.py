@@ -9,20 +9,28 @@ the best Level 4 code match for each composite rate.
 
 Usage:
     python enrich_nrm_mappings.py
+    python enrich_nrm_mappings.py --exhaustive   # score every candidate
+    python enrich_nrm_mappings.py --jobs 4       # process group files in parallel
 
 Author: AI Assistant
 Date: 2026-01-03
 """
 
+import argparse
+import contextlib
 import csv
+import io
 import json
 import os
 import re
-from collections import defaultdict
-from dataclasses import dataclass
+import tempfile
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from difflib import SequenceMatcher
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
 
 
 @dataclass
@@ -41,6 +49,33 @@ class CrosswalkEntry:
     matched_keywords: str
     notes: str
 
+    # Precomputed text features (filled by NRMEnricher.load_crosswalk)
+    normalized_description: str = field(default='', repr=False, compare=False)
+    keyword_set: FrozenSet[str] = field(default=frozenset(), repr=False, compare=False)
+    canonical_unit: str = field(default='', repr=False, compare=False)
+    char_counts: Counter = field(default_factory=Counter, repr=False, compare=False)
+    matcher: Optional[SequenceMatcher] = field(default=None, repr=False, compare=False)
+
+
+class ReviewItem(NamedTuple):
+    """Compact record of a rate that needs manual mapping review."""
+    file: str
+    code: str
+    name: str
+    unit: str
+    nrm1_l2_code: str
+    nrm1_l4_code: str
+    nrm1_description: str
+    mapping_confidence: str
+
+
+class RateText(NamedTuple):
+    """Precomputed text features for one rate."""
+    normalized: str
+    keywords: FrozenSet[str]
+    char_counts: Counter
+    canonical_unit: str
+
 
 @dataclass
 class MatchScore:
@@ -52,6 +87,37 @@ class MatchScore:
     confidence: str
 
 
+class CandidateIndex:
+    """Inverted token index over the crosswalk entries of one L2 code."""
+
+    def __init__(self, entries: List[CrosswalkEntry], tokenize):
+        self.entries = entries
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        for i, entry in enumerate(entries):
+            tokens = tokenize(entry.nrm1_description)
+            if entry.matched_keywords:
+                tokens |= entry.keyword_set
+            for token in tokens:
+                self.postings[token].append(i)
+
+    def shortlist(self, tokens: FrozenSet[str], k: int) -> List[int]:
+        """Return the k entry positions with the largest token overlap."""
+        overlap = Counter()
+        for token in tokens:
+            for i in self.postings.get(token, ()):
+                overlap[i] += 1
+        ranked = sorted(range(len(self.entries)), key=lambda i: -overlap[i])
+        return ranked[:k]
+
+    def similarity_bound(self, pos: int, rate_text: RateText) -> float:
+        """Upper bound on SequenceMatcher.ratio() (same as quick_ratio())."""
+        entry = self.entries[pos]
+        total = len(rate_text.normalized) + len(entry.normalized_description)
+        if not total:
+            return 1.0
+        return 2.0 * sum((rate_text.char_counts & entry.char_counts).values()) / total
+
+
 class NRMEnricher:
     """Main enrichment engine."""
 
@@ -68,12 +134,39 @@ class NRMEnricher:
     CONFIDENCE_HIGH = 0.75
     CONFIDENCE_MEDIUM = 0.50
 
-    def __init__(self, crosswalk_path: str, rates_dir: str, output_dir: str):
+    # Candidates fully scored before bound-based pruning kicks in
+    SHORTLIST_SIZE = 5
+
+    # Supported review sidecar formats
+    SIDECAR_FORMATS = ('csv', 'parquet')
+
+    # Rate text features kept in memory (one entry per distinct name/description/unit)
+    RATE_TEXT_CACHE_SIZE = 4096
+
+    def __init__(self, crosswalk_path: str, rates_dir: str, output_dir: str, exhaustive: bool = False,
+                 sidecar_format: Optional[str] = None, jobs: int = 1):
         self.crosswalk_path = Path(crosswalk_path)
         self.rates_dir = Path(rates_dir)
         self.output_dir = Path(output_dir)
+        self.exhaustive = exhaustive
+        self.sidecar_format = sidecar_format
+        self.jobs = jobs
+        self.low_confidence_items: List[ReviewItem] = []
+        self.no_match_items: List[ReviewItem] = []
         self.crosswalk: Dict[str, List[CrosswalkEntry]] = defaultdict(list)
-        self.stats = {
+        self.candidate_index: Dict[str, CandidateIndex] = {}
+        self._unit_lookup: Dict[str, str] = {}
+        for standard, variants in self.UNIT_EQUIVALENTS.items():
+            for unit in [standard.lower()] + variants:
+                self._unit_lookup.setdefault(unit, standard)
+        self._unit_compat: Dict[Tuple[str, str], bool] = {}
+        self._rate_text = lru_cache(maxsize=self.RATE_TEXT_CACHE_SIZE)(self._rate_text_features)
+        self.stats = self.new_stats()
+
+    @staticmethod
+    def new_stats() -> dict:
+        """Return an empty stats accumulator."""
+        return {
             'total_rates': 0,
             'total_files': 0,
             'high_confidence': 0,
@@ -83,6 +176,16 @@ class NRMEnricher:
             'by_section': defaultdict(lambda: {'total': 0, 'high': 0, 'medium': 0, 'low': 0}),
         }
 
+    def merge_stats(self, other: dict):
+        """Add another stats accumulator (e.g. from a worker) into self.stats."""
+        for key, value in other.items():
+            if key == 'by_section':
+                for section, counts in value.items():
+                    for level, count in counts.items():
+                        self.stats['by_section'][section][level] += count
+            else:
+                self.stats[key] += value
+
     def load_crosswalk(self):
         """Load crosswalk CSV and index by NRM1 L2 code."""
         print(f"Loading crosswalk from {self.crosswalk_path}")
@@ -104,43 +207,70 @@ class NRMEnricher:
                     matched_keywords=row['matched_keywords'],
                     notes=row['notes'],
                 )
+                self._prepare_entry(entry)
                 self.crosswalk[entry.nrm1_l2_code].append(entry)
 
+        # Precompute unit compatibility for every crosswalk unit pairing
+        canonical_units = {e.canonical_unit for entries in self.crosswalk.values() for e in entries}
+        for rate_unit in canonical_units | set(self.UNIT_EQUIVALENTS):
+            for entry_unit in canonical_units:
+                self._canonical_units_compatible(rate_unit, entry_unit)
+
+        for l2_code, entries in self.crosswalk.items():
+            self.candidate_index[l2_code] = CandidateIndex(entries, self.extract_keywords)
+
         print(f"Loaded {sum(len(v) for v in self.crosswalk.values())} crosswalk entries")
         print(f"Covering {len(self.crosswalk)} NRM1 L2 codes")
 
+    def _prepare_entry(self, entry: CrosswalkEntry):
+        """Precompute normalised text, keywords and unit for a crosswalk entry."""
+        entry.normalized_description = ' '.join(entry.nrm1_description.lower().split())
+        if entry.matched_keywords:
+            entry.keyword_set = frozenset(k.strip().lower() for k in entry.matched_keywords.split(','))
+        entry.canonical_unit = self.normalize_unit(entry.nrm1_unit)
+        entry.char_counts = Counter(entry.normalized_description)
+        # seq2 is analysed once; each rate only resets seq1
+        entry.matcher = SequenceMatcher(None, '', entry.normalized_description)
+
     def normalize_unit(self, unit: str) -> str:
         """Normalize unit strings for comparison."""
         unit = unit.lower().strip()
 
         # Check if this unit is in our equivalents
-        for standard, variants in self.UNIT_EQUIVALENTS.items():
-            if unit in [standard.lower()] + variants:
-                return standard
-
-        return unit
+        return self._unit_lookup.get(unit, unit)
+
+    def _canonical_units_compatible(self, norm1: str, norm2: str) -> bool:
+        """Compatibility of two normalised units, memoised in a lookup table."""
+        key = (norm1, norm2)
+        compatible = self._unit_compat.get(key)
+        if compatible is None:
+            if norm1 == norm2:
+                compatible = True
+            # Check multi-unit fields (e.g., "m2/m3" or "nr/m")
+            elif '/' in norm2:
+                compatible = norm1 in norm2.split('/')
+            else:
+                compatible = False
+            self._unit_compat[key] = compatible
+        return compatible
 
     def units_compatible(self, unit1: str, unit2: str) -> bool:
         """Check if two units are compatible."""
-        norm1 = self.normalize_unit(unit1)
-        norm2 = self.normalize_unit(unit2)
-
-        if norm1 == norm2:
-            return True
-
-        # Check multi-unit fields (e.g., "m2/m3" or "nr/m")
-        if '/' in norm2:
-            return norm1 in norm2.split('/')
-
-        return False
-
-    def calculate_text_similarity(self, text1: str, text2: str) -> float:
-        """Calculate similarity between two text strings using difflib."""
-        # Normalize: lowercase, remove extra spaces
-        t1 = ' '.join(text1.lower().split())
-        t2 = ' '.join(text2.lower().split())
-
-        return SequenceMatcher(None, t1, t2).ratio()
+        return self._canonical_units_compatible(self.normalize_unit(unit1), self.normalize_unit(unit2))
+
+    def rate_text(self, rate: dict) -> RateText:
+        """Return the (memoised) text features for a rate."""
+        return self._rate_text(rate.get('name', ''), rate.get('description', ''), rate['unit'])
+
+    def _rate_text_features(self, name: str, description: str, unit: str) -> RateText:
+        rate_text = f"{name} {description}"
+        normalized = ' '.join(rate_text.lower().split())
+        return RateText(
+            normalized=normalized,
+            keywords=frozenset(self.extract_keywords(rate_text)),
+            char_counts=Counter(normalized),
+            canonical_unit=self.normalize_unit(unit),
+        )
 
     def extract_keywords(self, text: str) -> set:
         """Extract meaningful keywords from text."""
@@ -157,23 +287,18 @@ class NRMEnricher:
 
     def score_match(self, rate: dict, entry: CrosswalkEntry) -> MatchScore:
         """Score how well a rate matches a crosswalk entry."""
+        rate_text = self.rate_text(rate)
 
         # 1. Unit compatibility (40% weight)
-        unit_score = 1.0 if self.units_compatible(rate['unit'], entry.nrm1_unit) else 0.0
+        unit_score = 1.0 if self._canonical_units_compatible(rate_text.canonical_unit, entry.canonical_unit) else 0.0
 
         # 2. Description similarity (40% weight)
-        rate_text = f"{rate.get('name', '')} {rate.get('description', '')}"
-        description_score = self.calculate_text_similarity(rate_text, entry.nrm1_description)
+        matcher = entry.matcher
+        matcher.set_seq1(rate_text.normalized)
+        description_score = matcher.ratio()
 
         # 3. Keyword overlap (20% weight)
-        keyword_score = 0.0
-        if entry.matched_keywords:
-            crosswalk_keywords = set(k.strip().lower() for k in entry.matched_keywords.split(','))
-            rate_keywords = self.extract_keywords(rate_text)
-
-            if crosswalk_keywords and rate_keywords:
-                overlap = crosswalk_keywords & rate_keywords
-                keyword_score = len(overlap) / max(len(crosswalk_keywords), len(rate_keywords))
+        keyword_score = self._keyword_score(rate_text.keywords, entry)
 
         # Calculate weighted total
         total_score = (unit_score * 0.4) + (description_score * 0.4) + (keyword_score * 0.2)
@@ -207,6 +332,9 @@ class NRMEnricher:
         if not candidates:
             return None
 
+        if not self.exhaustive:
+            return self._find_best_match_pruned(rate, nrm1_code, candidates)
+
         # Score all candidates
         scored = [(entry, self.score_match(rate, entry)) for entry in candidates]
 
@@ -216,7 +344,64 @@ class NRMEnricher:
         # Return best match
         return scored[0] if scored else None
 
-    def enrich_rate(self, rate: dict) -> dict:
+    def _keyword_score(self, rate_keywords: FrozenSet[str], entry: CrosswalkEntry) -> float:
+        """Keyword overlap component of score_match."""
+        keyword_score = 0.0
+        crosswalk_keywords = entry.keyword_set
+        if crosswalk_keywords and rate_keywords:
+            overlap = crosswalk_keywords & rate_keywords
+            keyword_score = len(overlap) / max(len(crosswalk_keywords), len(rate_keywords))
+        return keyword_score
+
+    def _find_best_match_pruned(self, rate: dict, nrm1_code: str,
+                                candidates: List[CrosswalkEntry]) -> Optional[Tuple[CrosswalkEntry, MatchScore]]:
+        """
+        Find the same best match as the exhaustive path with fewer full scores.
+
+        The SHORTLIST_SIZE candidates with the most token overlap (from the
+        inverted index) are fully scored first. The rest are visited in order
+        of a cheap upper bound on their score, and scoring stops once no
+        remaining bound can beat the best so far. Ties resolve to the earliest
+        crosswalk entry, as the stable sort in the exhaustive path does.
+        """
+        index = self.candidate_index[nrm1_code]
+        rate_text = self.rate_text(rate)
+
+        best_pos = None
+        best_score = None
+
+        def consider(pos: int):
+            nonlocal best_pos, best_score
+            score = self.score_match(rate, candidates[pos])
+            if (best_score is None or score.total_score > best_score.total_score
+                    or (score.total_score == best_score.total_score and pos < best_pos)):
+                best_pos, best_score = pos, score
+
+        shortlist = index.shortlist(rate_text.keywords, self.SHORTLIST_SIZE)
+        for pos in shortlist:
+            consider(pos)
+
+        shortlisted = set(shortlist)
+        bounds = []
+        for pos, entry in enumerate(candidates):
+            if pos in shortlisted:
+                continue
+            unit_score = 1.0 if self._canonical_units_compatible(rate_text.canonical_unit, entry.canonical_unit) else 0.0
+            description_bound = index.similarity_bound(pos, rate_text)
+            keyword_score = self._keyword_score(rate_text.keywords, entry)
+            bounds.append(((unit_score * 0.4) + (description_bound * 0.4) + (keyword_score * 0.2), pos))
+
+        bounds.sort(key=lambda b: (-b[0], b[1]))
+        for bound, pos in bounds:
+            if bound < best_score.total_score:
+                break
+            if bound == best_score.total_score and pos > best_pos:
+                continue
+            consider(pos)
+
+        return candidates[best_pos], best_score
+
+    def enrich_rate(self, rate: dict, source_file: str = '') -> dict:
         """Enrich a single rate with NRM mappings."""
         match_result = self.find_best_match(rate)
 
@@ -262,6 +447,23 @@ class NRMEnricher:
             rate['mapping_confidence'] = 'None'
             self.stats['no_match'] += 1
 
+        # Collect items for the QA report
+        if rate['mapping_confidence'] in ('Low', 'None'):
+            item = ReviewItem(
+                file=source_file,
+                code=rate.get('code', ''),
+                name=rate.get('name', ''),
+                unit=rate.get('unit', ''),
+                nrm1_l2_code=rate['nrm1_l2_code'],
+                nrm1_l4_code=rate['nrm1_l4_code'],
+                nrm1_description=rate['nrm1_description'],
+                mapping_confidence=rate['mapping_confidence'],
+            )
+            if item.mapping_confidence == 'Low':
+                self.low_confidence_items.append(item)
+            else:
+                self.no_match_items.append(item)
+
         # Remove old fields
         rate.pop('nrm1_code', None)
         rate.pop('nrm2_codes', None)
@@ -269,7 +471,7 @@ class NRMEnricher:
         return rate
 
     def process_file(self, filepath: Path):
-        """Process a single JSON file."""
+        """Process a single JSON file and atomically replace it."""
         print(f"\nProcessing {filepath.name}...")
 
         with open(filepath, 'r', encoding='utf-8') as f:
@@ -280,16 +482,27 @@ class NRMEnricher:
 
         # Enrich each rate
         for rate in rates:
-            self.enrich_rate(rate)
+            self.enrich_rate(rate, filepath.name)
             self.stats['total_rates'] += 1
 
         # Update meta
         data['meta']['enriched_date'] = '2026-01-03'
         data['meta']['crosswalk_version'] = 'NRM1_L4_to_NRM2_Crosswalk.csv'
 
-        # Save back to same location
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Save back to same location via a temp file, so a crash mid-write
+        # never leaves a truncated group file behind
+        fd, tmp_path = tempfile.mkstemp(prefix=f'.{filepath.name}.', suffix='.tmp', dir=filepath.parent)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp creates files as 0600; keep the original permissions
+            os.chmod(tmp_path, os.stat(filepath).st_mode & 0o777)
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
 
         print(f"  [OK] Updated {len(rates)} rates")
         self.stats['total_files'] += 1
@@ -304,8 +517,20 @@ class NRMEnricher:
 
         print(f"\nFound {len(json_files)} JSON files to process")
 
-        for filepath in json_files:
-            self.process_file(filepath)
+        if self.jobs <= 1:
+            for filepath in json_files:
+                self.process_file(filepath)
+            return
+
+        init_args = (str(self.crosswalk_path), str(self.rates_dir), str(self.output_dir), self.exhaustive)
+        with ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker, initargs=init_args) as pool:
+            # map() yields in file order, so stats, review items and logs
+            # are merged exactly as a serial run would produce them
+            for log, stats, low_items, no_match_items in pool.map(_process_file_worker, json_files):
+                print(log, end='')
+                self.merge_stats(stats)
+                self.low_confidence_items.extend(low_items)
+                self.no_match_items.extend(no_match_items)
 
     def generate_qa_report(self):
         """Generate a QA report markdown file."""
@@ -357,31 +582,15 @@ class NRMEnricher:
             f.write("\n## Items Requiring Manual Review\n\n")
             f.write("The following items have low confidence mappings and should be manually reviewed:\n\n")
 
-            # Re-read files to collect low confidence items
-            low_confidence_items = []
-            for filepath in sorted(self.rates_dir.glob('group_*.json')):
-                with open(filepath, 'r', encoding='utf-8') as rf:
-                    data = json.load(rf)
-                    for rate in data.get('rates', []):
-                        if rate.get('mapping_confidence') == 'Low':
-                            low_confidence_items.append({
-                                'file': filepath.name,
-                                'code': rate.get('code', ''),
-                                'name': rate.get('name', ''),
-                                'unit': rate.get('unit', ''),
-                                'nrm1_l2_code': rate.get('nrm1_l2_code', ''),
-                                'nrm1_l4_code': rate.get('nrm1_l4_code', ''),
-                                'nrm1_description': rate.get('nrm1_description', ''),
-                            })
-
+            low_confidence_items = self.low_confidence_items
             if low_confidence_items:
                 f.write(f"**Total Low Confidence Items**: {len(low_confidence_items)}\n\n")
                 f.write("| File | Code | Name | Unit | L2 Code | L4 Code | NRM1 Description |\n")
                 f.write("|------|------|------|------|---------|---------|------------------|\n")
 
                 for item in low_confidence_items[:50]:  # Limit to first 50
-                    f.write(f"| {item['file']} | {item['code']} | {item['name']} | {item['unit']} | ")
-                    f.write(f"{item['nrm1_l2_code']} | {item['nrm1_l4_code']} | {item['nrm1_description'][:50]}... |\n")
+                    f.write(f"| {item.file} | {item.code} | {item.name} | {item.unit} | ")
+                    f.write(f"{item.nrm1_l2_code} | {item.nrm1_l4_code} | {item.nrm1_description[:50]}... |\n")
 
                 if len(low_confidence_items) > 50:
                     f.write(f"\n*Showing first 50 of {len(low_confidence_items)} items*\n")
@@ -389,20 +598,7 @@ class NRMEnricher:
                 f.write("[OK] No low confidence items found!\n")
 
             # No match items
-            no_match_items = []
-            for filepath in sorted(self.rates_dir.glob('group_*.json')):
-                with open(filepath, 'r', encoding='utf-8') as rf:
-                    data = json.load(rf)
-                    for rate in data.get('rates', []):
-                        if rate.get('mapping_confidence') == 'None':
-                            no_match_items.append({
-                                'file': filepath.name,
-                                'code': rate.get('code', ''),
-                                'name': rate.get('name', ''),
-                                'unit': rate.get('unit', ''),
-                                'nrm1_l2_code': rate.get('nrm1_l2_code', ''),
-                            })
-
+            no_match_items = self.no_match_items
             if no_match_items:
                 f.write("\n## Items With No Matches\n\n")
                 f.write(f"**Total No Match Items**: {len(no_match_items)}\n\n")
@@ -410,10 +606,40 @@ class NRMEnricher:
                 f.write("|------|------|------|------|------------------|\n")
 
                 for item in no_match_items:
-                    f.write(f"| {item['file']} | {item['code']} | {item['name']} | {item['unit']} | {item['nrm1_l2_code']} |\n")
+                    f.write(f"| {item.file} | {item.code} | {item.name} | {item.unit} | {item.nrm1_l2_code} |\n")
 
         print(f"[OK] QA report generated")
 
+        if self.sidecar_format:
+            self.write_review_sidecar(self.sidecar_format)
+
+    def write_review_sidecar(self, fmt: str = 'csv') -> Path:
+        """Write all low-confidence and no-match items as a CSV or Parquet file."""
+        items = self.low_confidence_items + self.no_match_items
+        columns = list(ReviewItem._fields)
+
+        if fmt == 'parquet':
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                print("WARNING: pyarrow is not installed, writing CSV sidecar instead")
+                fmt = 'csv'
+            else:
+                output_path = self.output_dir / 'nrm-mapping-review.parquet'
+                table = pa.table({col: [getattr(item, col) for item in items] for col in columns})
+                pq.write_table(table, output_path)
+
+        if fmt == 'csv':
+            output_path = self.output_dir / 'nrm-mapping-review.csv'
+            with open(output_path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(items)
+
+        print(f"[OK] Review sidecar written to {output_path} ({len(items)} items)")
+        return output_path
+
     def run(self):
         """Execute the full enrichment pipeline."""
         print("="*70)
@@ -442,8 +668,44 @@ class NRMEnricher:
         print("="*70)
 
 
+# Per-process enricher used by --jobs workers
+_worker_enricher: Optional[NRMEnricher] = None
+
+
+def _init_worker(crosswalk_path: str, rates_dir: str, output_dir: str, exhaustive: bool):
+    """Load the crosswalk once per worker process."""
+    global _worker_enricher
+    _worker_enricher = NRMEnricher(crosswalk_path, rates_dir, output_dir, exhaustive=exhaustive)
+    with contextlib.redirect_stdout(io.StringIO()):
+        _worker_enricher.load_crosswalk()
+
+
+def _process_file_worker(filepath: Path) -> Tuple[str, dict, List[ReviewItem], List[ReviewItem]]:
+    """Enrich one group file in a worker; return its log, stats and review items."""
+    enricher = _worker_enricher
+    enricher.stats = enricher.new_stats()
+    enricher.low_confidence_items = []
+    enricher.no_match_items = []
+
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        enricher.process_file(filepath)
+
+    stats = dict(enricher.stats, by_section={k: dict(v) for k, v in enricher.stats['by_section'].items()})
+    return log.getvalue(), stats, enricher.low_confidence_items, enricher.no_match_items
+
+
 def main():
     """Main entry point."""
+    parser = argparse.ArgumentParser(description='Enrich composite rates with NRM1/NRM2 mappings')
+    parser.add_argument('--exhaustive', action='store_true',
+                        help='Score every crosswalk candidate instead of using the pruned index')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of group files to process in parallel')
+    parser.add_argument('--review-sidecar', choices=NRMEnricher.SIDECAR_FORMATS,
+                        help='Also write review items as CSV or Parquet next to the QA report')
+    args = parser.parse_args()
+
     # Define paths
     base_dir = Path(__file__).parent.parent
     crosswalk_path = base_dir / 'NRM' / 'NRM1_L4_to_NRM2_Crosswalk.csv'
@@ -464,6 +726,9 @@ def main():
         crosswalk_path=str(crosswalk_path),
         rates_dir=str(rates_dir),
         output_dir=str(output_dir),
+        exhaustive=args.exhaustive,
+        sidecar_format=args.review_sidecar,
+        jobs=args.jobs,
     )
 
     enricher.run()
@@ -0,0 +1,731 @@
+#!/usr/bin/env python3
+"""Offline stand-in for the estimate search SQL functions.
+
+heuristics-source/20251222100000_create_estimate_search_tools.sql defines
+``search_composites_for_estimate``, ``search_labour_rates_for_estimate``,
+``search_materials_for_estimate``, ``search_plant_for_estimate`` and
+``lookup_rate_by_id`` on top of pg_trgm and Postgres full-text search. This
+module reproduces their matching and ranking in memory so searches can be
+run and benchmarked without a database:
+
+- similarity() follows pg_trgm: words are lower-cased alphanumeric runs,
+  padded with two leading and one trailing space, and scored as shared
+  trigrams over the trigram union. Shared counts come from a trigram
+  inverted index, so only rows sharing a trigram with the query are touched.
+- @@ and ts_rank() use a weighted positional vector per row and a
+  websearch_to_tsquery-style parser (AND of terms, ``or``, ``-term``).
+  ts_rank follows Postgres' calc_rank_or/calc_rank_and with the default
+  weights and no length normalisation. Lexemes come from a light English
+  stemmer (plural, -ed, -ing, -ly) rather than Snowball, so scores are
+  close to, not identical with, the database.
+
+Sources are the local seed data: composites from the group files (``name``
+stands in for composites.description, the group name for category),
+labour from labour_resources.json, and materials and plant from the
+Supabase exports. The exports carry no base_rate column, so those rows
+return ``base_rate`` None and rank ties stay in source order.
+
+    python estimate_search.py composites "plasterboard ceiling" --unit m²
+    python estimate_search.py plant "concrete pump"
+    python estimate_search.py lookup composite GRP2-TIMFRA-014
+    python estimate_search.py --bench 1000 10000 100000
+"""
+import argparse
+import csv
+import json
+import re
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+RATES_DIR = BASE_DIR / 'au' / 'seed-data' / 'composite_rates'
+LABOUR_FILE = BASE_DIR / 'au' / 'seed-data' / 'labour_resources.json'
+EXPORTS_DIR = BASE_DIR / 'heuristics-source' / 'supabase-exports'
+MATERIALS_CSV = EXPORTS_DIR / 'material_coverage_reference-20260103-v2.csv'
+PLANT_CSV = EXPORTS_DIR / 'plant_productivity_constants-20260103-v2.csv'
+
+# Thresholds and weights from the SQL functions
+DESCRIPTION_THRESHOLD = 0.25
+CODE_THRESHOLD = 0.4
+UNIT_MATCH_FACTOR = 0.9
+UNIT_MISS_FACTOR = 0.7
+
+# ts_rank default weights for D, C, B, A
+RANK_WEIGHTS = {'D': 0.1, 'C': 0.2, 'B': 0.4, 'A': 1.0}
+MAX_ENTRY_POS = 16383
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+# =============================================================================
+# TEXT PROCESSING
+# =============================================================================
+
+_WORD_RE = re.compile(r'[^\W_]+')
+
+# Postgres english.stop
+STOPWORDS = frozenset("""
+i me my myself we our ours ourselves you your yours yourself yourselves he him
+his himself she her hers herself it its itself they them their theirs
+themselves what which who whom this that these those am is are was were be
+been being have has had having do does did doing a an the and but if or
+because as until while of at by for with about against between into through
+during before after above below to from up down in out on off over under
+again further then once here there when where why how all any both each few
+more most other some such no nor not only own same so than too very s t can
+will just don should now
+""".split())
+
+_VOWELS = set('aeiouy')
+
+
+def _has_vowel(text: str) -> bool:
+    return any(ch in _VOWELS for ch in text)
+
+
+@lru_cache(maxsize=None)
+def stem(word: str) -> str:
+    """Light English stemmer: plurals, -ed/-ing, -ly and final y."""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    if word.endswith('sses'):
+        word = word[:-2]
+    elif word.endswith('ies'):
+        word = word[:-2]
+    elif word.endswith('s') and not word.endswith(('ss', 'us')) and _has_vowel(word[:-2]):
+        word = word[:-1]
+
+    for suffix in ('ingly', 'edly', 'ing', 'ed'):
+        if word.endswith(suffix) and _has_vowel(word[:-len(suffix)]):
+            word = word[:-len(suffix)]
+            if word.endswith(('at', 'bl', 'iz')):
+                word += 'e'
+            elif len(word) > 2 and word[-1] == word[-2] and word[-1] not in 'aeiouylsz':
+                word = word[:-1]
+            elif len(word) == 3 and word[0] not in _VOWELS and word[1] in _VOWELS and word[2] not in 'aeiouwxy':
+                word += 'e'
+            break
+    else:
+        if word.endswith('ly') and len(word) > 4:
+            word = word[:-2]
+
+    if len(word) > 2 and word.endswith('y') and word[-2] not in _VOWELS:
+        word = word[:-1] + 'i'
+    return word
+
+
+def tokens(text: Optional[str]) -> List[str]:
+    return _WORD_RE.findall(text.lower()) if text else []
+
+
+def lexemes(text: Optional[str]) -> List[Tuple[int, str]]:
+    """(1-based position, lexeme) pairs; stopwords keep their position."""
+    return [(pos, stem(word)) for pos, word in enumerate(tokens(text), 1) if word not in STOPWORDS]
+
+
+@lru_cache(maxsize=None)
+def _word_trigrams(word: str) -> Tuple[str, ...]:
+    padded = f'  {word} '
+    return tuple(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def trigrams(text: Optional[str]) -> Set[str]:
+    """pg_trgm trigram set of text."""
+    grams = set()
+    for word in tokens(text):
+        grams.update(_word_trigrams(word))
+    return grams
+
+
+def similarity(a: Optional[str], b: Optional[str]) -> float:
+    """pg_trgm similarity(a, b)."""
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    shared = len(ta & tb)
+    return shared / (len(ta) + len(tb) - shared)
+
+
+def repair_text(value: str) -> str:
+    """Undo UTF-8 read as cp1252 in the exports (e.g. 'mÂ³/hr' -> 'm³/hr')."""
+    if 'Â' not in value and 'â' not in value:
+        return value
+    try:
+        return value.encode('cp1252').decode('utf-8')
+    except UnicodeError:
+        return value
+
+
+# =============================================================================
+# QUERIES AND RANKING
+# =============================================================================
+
+class TextQuery:
+    """
+    Parsed websearch_to_tsquery: an OR of conjunctions of (lexeme, negated).
+
+    Quoted phrases are matched as a conjunction of their words.
+    """
+
+    def __init__(self, text: str):
+        self.clauses: List[List[Tuple[str, bool]]] = [[]]
+        for raw in re.findall(r'(?:(?<!\S)-)?[^\W_]+', text.lower()):
+            if raw == 'or':
+                if self.clauses[-1]:
+                    self.clauses.append([])
+                continue
+            negate = raw.startswith('-')
+            word = raw.lstrip('-')
+            if word in STOPWORDS:
+                continue
+            self.clauses[-1].append((stem(word), negate))
+        self.clauses = [clause for clause in self.clauses if clause]
+        seen = []
+        for clause in self.clauses:
+            for lexeme, _ in clause:
+                if lexeme not in seen:
+                    seen.append(lexeme)
+        self.operands = seen
+
+    def __bool__(self) -> bool:
+        return bool(self.clauses)
+
+    @property
+    def is_and(self) -> bool:
+        return len(self.clauses) == 1 and len(self.clauses[0]) > 1
+
+
+def _word_distance(dist: np.ndarray) -> np.ndarray:
+    with np.errstate(over='ignore'):
+        return np.where(dist > 100, 1e-30, 1.0 / (1.005 + 0.05 * np.exp(dist / 1.5 - 2)))
+
+
+class Postings:
+    """
+    Rows holding one lexeme, with its positions and weights per row (CSR).
+
+    ``or_score`` is the row's calc_rank_or contribution for this lexeme,
+    which only depends on the lexeme's own entry and so is computed once.
+    """
+
+    def __init__(self, rows: List[int], entries: List[List[Tuple[int, float]]]):
+        self.rows = np.array(rows, dtype=np.int64)
+        self.offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(entry) for entry in entries], out=self.offsets[1:])
+        self.positions = np.array([pos for entry in entries for pos, _ in entry], dtype=np.int64)
+        self.weights = np.array([weight for entry in entries for _, weight in entry], dtype=float)
+        self.or_score = np.array([self._or_score(entry) for entry in entries], dtype=float)
+
+    @staticmethod
+    def _or_score(entry: List[Tuple[int, float]]) -> float:
+        resj = 0.0
+        wjm = -1.0
+        jm = 0
+        for j, (_, weight) in enumerate(entry):
+            resj += weight / ((j + 1) * (j + 1))
+            if weight > wjm:
+                wjm = weight
+                jm = j
+        # limit (sum(1/i^2), i=1..inf) = pi^2/6
+        return (wjm + resj - wjm / ((jm + 1) * (jm + 1))) / 1.64493406685
+
+    def locate(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(mask over rows holding the lexeme, their posting indexes)."""
+        idx = np.searchsorted(self.rows, rows)
+        idx[idx == len(self.rows)] = 0
+        found = self.rows[idx] == rows if len(self.rows) else np.zeros(len(rows), dtype=bool)
+        return found, idx[found]
+
+
+_NO_POSTINGS = Postings([], [])
+
+
+def _rank_or(postings: Sequence[Postings], rows: np.ndarray) -> np.ndarray:
+    res = np.zeros(len(rows))
+    for posting in postings:
+        found, idx = posting.locate(rows)
+        res[found] += posting.or_score[idx]
+    return res / len(postings)
+
+
+def _rank_and(postings: Sequence[Postings], rows: np.ndarray) -> np.ndarray:
+    """
+    calc_rank_and over rows: every position pair of two distinct operands
+    contributes cur = sqrt(w1 * w2 * word_distance(dist)), folded as
+    res = 1 - (1 - res) * (1 - cur), i.e. res = 1 - prod(1 - cur).
+    """
+    log_keep = np.zeros(len(rows))
+    touched = np.zeros(len(rows), dtype=bool)
+    located = [posting.locate(rows) for posting in postings]
+    for i in range(len(postings)):
+        for k in range(i):
+            (found_a, _), (found_b, _) = located[i], located[k]
+            both = found_a & found_b
+            if not both.any():
+                continue
+            a, b = postings[i], postings[k]
+            ia = np.searchsorted(a.rows, rows[both])
+            ib = np.searchsorted(b.rows, rows[both])
+            na = a.offsets[ia + 1] - a.offsets[ia]
+            nb = b.offsets[ib + 1] - b.offsets[ib]
+            pairs = na * nb
+            owner = np.repeat(np.arange(len(ia)), pairs)
+            local = np.arange(pairs.sum()) - np.repeat(np.cumsum(pairs) - pairs, pairs)
+            pa = a.offsets[ia][owner] + local // nb[owner]
+            pb = b.offsets[ib][owner] + local % nb[owner]
+            dist = np.abs(a.positions[pa] - b.positions[pb])
+            valid = dist > 0
+            cur = np.sqrt(a.weights[pa] * b.weights[pb] * _word_distance(dist))
+            target = np.flatnonzero(both)
+            log_keep[target] += np.bincount(owner[valid], weights=np.log1p(-cur[valid]), minlength=len(ia))
+            touched[target[np.unique(owner[valid])]] = True
+    return np.where(touched, -np.expm1(log_keep), 1e-20)
+
+
+# =============================================================================
+# INDEXES
+# =============================================================================
+
+class TrigramIndex:
+    """Inverted trigram index answering similarity(column, query) for all rows."""
+
+    def __init__(self, texts: Sequence[Optional[str]]):
+        postings: Dict[str, List[int]] = {}
+        sizes = np.zeros(len(texts), dtype=np.int64)
+        for row, text in enumerate(texts):
+            grams = trigrams(text)
+            sizes[row] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(row)
+        self.sizes = sizes
+        self.postings = {gram: np.array(rows, dtype=np.int64) for gram, rows in postings.items()}
+
+    def similarities(self, text: str) -> np.ndarray:
+        grams = trigrams(text)
+        hits = [self.postings[g] for g in grams if g in self.postings]
+        if not hits:
+            return np.zeros(len(self.sizes))
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.sizes))
+        return shared / (self.sizes + len(grams) - shared)
+
+
+class SearchIndex:
+    """
+    Rows of one search table with their tsvector and trigram indexes.
+
+    ``vector_fields`` lists (field, weight) pairs concatenated in order like
+    ``setweight(to_tsvector(...), weight) || ...``; ``similarity_fields``
+    are the columns similarity() is called on.
+    """
+
+    def __init__(self, rows: Sequence[Dict], vector_fields: Sequence[Tuple[str, str]],
+                 similarity_fields: Sequence[str], key: str = 'id'):
+        self.rows = list(rows)
+        self.by_id = {row.get(key): i for i, row in enumerate(self.rows)}
+        lexeme_rows: Dict[str, List[int]] = {}
+        lexeme_entries: Dict[str, List[List[Tuple[int, float]]]] = {}
+        for i, row in enumerate(self.rows):
+            vector: Dict[str, List[Tuple[int, float]]] = {}
+            offset = 0
+            for field, weight in vector_fields:
+                last = 0
+                for pos, lexeme in lexemes(row.get(field)):
+                    vector.setdefault(lexeme, []).append((min(offset + pos, MAX_ENTRY_POS),
+                                                          RANK_WEIGHTS[weight]))
+                    last = pos
+                offset += last
+            for lexeme, entry in vector.items():
+                entry.sort()
+                lexeme_rows.setdefault(lexeme, []).append(i)
+                lexeme_entries.setdefault(lexeme, []).append(entry)
+        self.postings = {lexeme: Postings(ids, lexeme_entries[lexeme]) for lexeme, ids in lexeme_rows.items()}
+        self.trigrams = {field: TrigramIndex([row.get(field) for row in self.rows])
+                         for field in similarity_fields}
+
+        self._columns: Dict[str, Tuple[Dict, np.ndarray]] = {}
+        self._numbers: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def column(self, field: str) -> Tuple[Dict, np.ndarray]:
+        """({value: code}, per-row code array) for a categorical field."""
+        if field not in self._columns:
+            values: Dict = {}
+            codes = np.array([values.setdefault(row.get(field), len(values)) for row in self.rows],
+                             dtype=np.int64)
+            self._columns[field] = (values, codes)
+        return self._columns[field]
+
+    def equals(self, field: str, value, rows: np.ndarray) -> np.ndarray:
+        """Mask of rows whose field equals value (False when value is None)."""
+        values, codes = self.column(field)
+        if value is None or value not in values:
+            return np.zeros(len(rows), dtype=bool)
+        return codes[rows] == values[value]
+
+    def contains(self, field: str, needle: str, rows: np.ndarray) -> np.ndarray:
+        """Mask of rows whose field contains needle, case-insensitively (ILIKE)."""
+        values, codes = self.column(field)
+        needle = needle.lower()
+        hit = np.array([value is not None and needle in str(value).lower() for value in values], dtype=bool)
+        return hit[codes[rows]]
+
+    def numbers(self, field: str, rows: np.ndarray) -> np.ndarray:
+        """Numeric field of rows, missing values as 0."""
+        if field not in self._numbers:
+            self._numbers[field] = np.array([float(row.get(field) or 0.0) for row in self.rows])
+        return self._numbers[field][rows]
+
+    def matches(self, query: TextQuery) -> np.ndarray:
+        """Sorted row ids satisfying vector @@ query."""
+        result = _EMPTY
+        for clause in query.clauses:
+            rows = None
+            for lexeme, negated in sorted(clause, key=lambda term: term[1]):
+                posting = self.postings.get(lexeme, _NO_POSTINGS).rows
+                if negated:
+                    if rows is None:
+                        rows = np.arange(len(self.rows), dtype=np.int64)
+                    rows = np.setdiff1d(rows, posting, assume_unique=True)
+                else:
+                    rows = posting if rows is None else np.intersect1d(rows, posting, assume_unique=True)
+            result = np.union1d(result, rows)
+        return result
+
+    def candidates(self, text: str, thresholds: Dict[str, float]):
+        """
+        Rows matching the text query or above a similarity threshold.
+
+        Returns (query, rows, {field: similarity array over all rows}).
+        """
+        query = TextQuery(text)
+        rows = self.matches(query)
+        sims = {}
+        for field, threshold in thresholds.items():
+            sims[field] = self.trigrams[field].similarities(text)
+            rows = np.union1d(rows, np.flatnonzero(sims[field] > threshold))
+        return query, rows, sims
+
+    def ranks(self, query: TextQuery, rows: np.ndarray) -> np.ndarray:
+        """ts_rank(vector, query) of rows, default weights and normalization 0."""
+        if not query or not len(rows):
+            return np.zeros(len(rows))
+        postings = [self.postings.get(lexeme, _NO_POSTINGS) for lexeme in query.operands]
+        if query.is_and:
+            return _rank_and(postings, rows)
+        return _rank_or(postings, rows)
+
+
+# =============================================================================
+# SOURCES
+# =============================================================================
+
+def load_composites(rates_dir: Path = RATES_DIR) -> List[Dict]:
+    rows = []
+    for path in sorted(Path(rates_dir).glob('group_*.json')):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        category = data.get('meta', {}).get('group_name')
+        for rate in data.get('rates', []):
+            rows.append({
+                'id': rate.get('code'),
+                'code': rate.get('code'),
+                'description': rate.get('name'),
+                'detail': rate.get('description'),
+                'category': rate.get('category', category),
+                'unit': rate.get('unit'),
+                'total_rate': rate.get('total_rate'),
+                'labour_component': rate.get('labour_total'),
+                'material_component': rate.get('materials_total'),
+                'plant_component': rate.get('plant_total'),
+                'effective_date': rate.get('base_date'),
+            })
+    return rows
+
+
+def load_labour(path: Path = LABOUR_FILE) -> List[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [{
+        'id': labour.get('code'),
+        'description': labour.get('trade'),
+        'base_rate': labour.get('base_rate'),
+        'unit': labour.get('unit'),
+        'award_reference': labour.get('award_reference'),
+        'effective_date': data.get('meta', {}).get('base_date'),
+    } for labour in data.get('labour_resources', [])]
+
+
+def _read_export(path: Path) -> Iterable[Dict[str, str]]:
+    # Exports carry embedding and search_vector columns far above the
+    # default csv field limit; those columns are not used here.
+    csv.field_size_limit(sys.maxsize)
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            if row.get('is_active', 'True') == 'True':
+                yield {k: repair_text(v) for k, v in row.items() if k not in ('embedding', 'search_vector')}
+
+
+def load_materials(path: Path = MATERIALS_CSV) -> List[Dict]:
+    return [{
+        'id': row['id'],
+        'description': row.get('description'),
+        'material_type': row.get('material_type'),
+        'material_subtype': row.get('material_subtype'),
+        'product_pattern': row.get('product_pattern'),
+        'source_manufacturer': row.get('source_manufacturer'),
+        'base_rate': None,
+        'unit': row.get('coverage_unit') or None,
+        'supplier': row.get('source_manufacturer') or None,
+        'effective_date': None,
+    } for row in _read_export(path)]
+
+
+def load_plant(path: Path = PLANT_CSV) -> List[Dict]:
+    return [{
+        'id': row['id'],
+        'description': row.get('description'),
+        'equipment_category': row.get('equipment_category'),
+        'equipment_type': row.get('equipment_type'),
+        'notes': row.get('notes'),
+        'base_rate': None,
+        'unit': row.get('output_unit') or None,
+        'supplier': None,
+        'effective_date': None,
+    } for row in _read_export(path)]
+
+
+COMPOSITE_VECTOR = (('description', 'A'), ('detail', 'B'))
+LABOUR_VECTOR = (('description', 'A'),)
+# Mirrors the material_coverage_reference.search_vector generated column
+MATERIAL_VECTOR = (('material_type', 'A'), ('material_subtype', 'A'), ('product_pattern', 'B'),
+                   ('description', 'B'), ('source_manufacturer', 'C'))
+PLANT_VECTOR = (('equipment_category', 'A'), ('equipment_type', 'A'), ('description', 'B'), ('notes', 'C'))
+
+
+# =============================================================================
+# SEARCH SERVICE
+# =============================================================================
+
+class EstimateSearch:
+    """In-memory equivalents of the estimate search functions."""
+
+    def __init__(self, composites: Sequence[Dict] = (), labour: Sequence[Dict] = (),
+                 materials: Sequence[Dict] = (), plant: Sequence[Dict] = ()):
+        self.composites = SearchIndex(composites, COMPOSITE_VECTOR, ('description', 'code'))
+        self.labour = SearchIndex(labour, LABOUR_VECTOR, ('description',))
+        self.materials = SearchIndex(materials, MATERIAL_VECTOR, ('description',))
+        self.plant = SearchIndex(plant, PLANT_VECTOR, ('description',))
+
+    @classmethod
+    def from_seed_data(cls, rates_dir: Path = RATES_DIR) -> 'EstimateSearch':
+        return cls(load_composites(rates_dir), load_labour(), load_materials(), load_plant())
+
+    @staticmethod
+    def _normalise(query: str) -> Optional[str]:
+        normalised = (query or '').strip().lower()
+        return normalised if len(normalised) >= 2 else None
+
+    @staticmethod
+    def _result(index: SearchIndex, rows: np.ndarray, confidence: np.ndarray,
+                fields: Sequence[str]) -> List[Dict]:
+        results = []
+        for row, score in zip(rows, confidence):
+            record = index.rows[row]
+            result = {field: record.get(field) for field in fields}
+            result['confidence'] = float(score)
+            results.append(result)
+        return results
+
+    def search_composites_for_estimate(self, query: str, unit: Optional[str] = None,
+                                       category: Optional[str] = None, limit: int = 10) -> List[Dict]:
+        normalised = self._normalise(query)
+        if normalised is None:
+            return []
+        index = self.composites
+        tsquery, rows, sims = index.candidates(normalised, {'description': DESCRIPTION_THRESHOLD,
+                                                            'code': CODE_THRESHOLD})
+        if category is not None:
+            rows = rows[index.contains('category', category, rows)]
+        ranks = index.ranks(tsquery, rows)
+        unit_match = index.equals('unit', unit, rows)
+        totals = index.numbers('total_rate', rows)
+        confidence = (np.where(unit_match, UNIT_MATCH_FACTOR, UNIT_MISS_FACTOR)
+                      * np.maximum(ranks, sims['description'][rows] * 0.6))
+
+        order = np.lexsort((np.arange(len(rows)), -totals, -ranks, ~unit_match))[:limit]
+        return self._result(index, rows[order], confidence[order],
+                            ('id', 'code', 'description', 'category', 'unit', 'total_rate',
+                             'labour_component', 'material_component', 'plant_component'))
+
+    def search_labour_rates_for_estimate(self, query: str, limit: int = 10) -> List[Dict]:
+        normalised = self._normalise(query)
+        if normalised is None:
+            return []
+        index = self.labour
+        tsquery, rows, sims = index.candidates(normalised, {'description': DESCRIPTION_THRESHOLD})
+        ranks = index.ranks(tsquery, rows)
+        rates = index.numbers('base_rate', rows)
+        confidence = np.maximum(ranks, sims['description'][rows] * 0.5)
+
+        order = np.lexsort((np.arange(len(rows)), -rates, -ranks))[:limit]
+        results = self._result(index, rows[order], confidence[order],
+                               ('id', 'description', 'base_rate', 'unit', 'award_reference'))
+        for result in results:
+            result['unit'] = result['unit'] or 'hr'
+        return results
+
+    def search_materials_for_estimate(self, query: str, unit: Optional[str] = None,
+                                      limit: int = 10) -> List[Dict]:
+        normalised = self._normalise(query)
+        if normalised is None:
+            return []
+        index = self.materials
+        tsquery, rows, sims = index.candidates(normalised, {'description': DESCRIPTION_THRESHOLD})
+        ranks = index.ranks(tsquery, rows)
+        unit_match = index.equals('unit', unit, rows)
+        confidence = (np.where(unit_match, UNIT_MATCH_FACTOR, UNIT_MISS_FACTOR)
+                      * np.maximum(ranks, sims['description'][rows] * 0.5))
+
+        order = np.lexsort((np.arange(len(rows)), -ranks, ~unit_match))[:limit]
+        return self._result(index, rows[order], confidence[order],
+                            ('id', 'description', 'base_rate', 'unit', 'supplier'))
+
+    def search_plant_for_estimate(self, query: str, limit: int = 10) -> List[Dict]:
+        normalised = self._normalise(query)
+        if normalised is None:
+            return []
+        index = self.plant
+        tsquery, rows, sims = index.candidates(normalised, {'description': DESCRIPTION_THRESHOLD})
+        ranks = index.ranks(tsquery, rows)
+        rates = index.numbers('base_rate', rows)
+        confidence = np.maximum(ranks, sims['description'][rows] * 0.5)
+
+        order = np.lexsort((np.arange(len(rows)), -rates, -ranks))[:limit]
+        results = self._result(index, rows[order], confidence[order],
+                               ('id', 'description', 'base_rate', 'unit', 'supplier'))
+        for result in results:
+            result['unit'] = result['unit'] or 'day'
+        return results
+
+    def lookup_rate_by_id(self, rate_id: str, rate_type: str) -> List[Dict]:
+        """Rows for rate_id; an unknown rate_type yields one row with found=False."""
+        sources = {
+            'labour': (self.labour, 'base_rate', 'hr'),
+            'material': (self.materials, 'base_rate', None),
+            'plant': (self.plant, 'base_rate', 'day'),
+            'composite': (self.composites, 'total_rate', None),
+        }
+        if rate_type not in sources:
+            return [{'id': None, 'description': None, 'rate': None, 'unit': None,
+                     'effective_date': None, 'found': False}]
+        index, rate_field, default_unit = sources[rate_type]
+        row = index.by_id.get(rate_id)
+        if row is None:
+            return []
+        record = index.rows[row]
+        return [{'id': record.get('id'), 'description': record.get('description'),
+                 'rate': record.get(rate_field), 'unit': record.get('unit') or default_unit,
+                 'effective_date': record.get('effective_date'), 'found': True}]
+
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+
+BENCH_QUERIES = (
+    ('composites', 'plasterboard ceiling', 'm²'),
+    ('composites', 'concrete slab', None),
+    ('composites', 'plasterbord lining', None),
+    ('composites', 'timber or steel -roof', None),
+    ('materials', 'tile adhesive', 'm2'),
+    ('plant', 'concrete pump', None),
+)
+
+
+def replicate(rows: Sequence[Dict], size: int) -> List[Dict]:
+    """Synthetic table of `size` rows for benchmarking (ids made unique)."""
+    out = []
+    copy = 0
+    while len(out) < size:
+        for row in rows:
+            if len(out) == size:
+                break
+            extra = {'id': f"{row.get('id')}-{copy}"}
+            if 'code' in row:
+                extra['code'] = f"{row.get('code')}-{copy}"
+            out.append(dict(row, **extra))
+        copy += 1
+    return out
+
+
+def benchmark(base: EstimateSearch, sizes: Sequence[int], repeat: int = 50):
+    for size in sizes:
+        start = time.perf_counter()
+        search = EstimateSearch(replicate(base.composites.rows, size), base.labour.rows,
+                                replicate(base.materials.rows, size), replicate(base.plant.rows, size))
+        print(f"{size} rows per table: indexed in {(time.perf_counter() - start) * 1000:.0f} ms")
+        for table, query, unit in BENCH_QUERIES:
+            method = getattr(search, f'search_{table}_for_estimate')
+            kwargs = {'unit': unit} if unit else {}
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                results = method(query, **kwargs)
+                timings.append(time.perf_counter() - start)
+            p50, p95 = np.percentile(timings, [50, 95]) * 1000
+            print(f"  {table:<10} {query!r:<26} {len(results):>3} hits  "
+                  f"p50 {p50:8.3f} ms  p95 {p95:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline estimate search over the local seed data')
+    parser.add_argument('table', nargs='?', choices=('composites', 'labour', 'materials', 'plant', 'lookup'))
+    parser.add_argument('query', nargs='*', help='Search text, or TYPE ID for lookup')
+    parser.add_argument('--unit', help='Preferred unit (composites, materials)')
+    parser.add_argument('--category', help='Category filter (composites)')
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--rates-dir', default=str(RATES_DIR),
+                        help='Directory holding group_*.json composite files')
+    parser.add_argument('--bench', type=int, nargs='+', metavar='N',
+                        help='Benchmark searches on N synthetic rows per table')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    search = EstimateSearch.from_seed_data(Path(args.rates_dir))
+    print(f"Loaded and indexed {len(search.composites)} composites, {len(search.labour)} labour, "
+          f"{len(search.materials)} materials, {len(search.plant)} plant in "
+          f"{(time.perf_counter() - start) * 1000:.0f} ms", file=sys.stderr)
+
+    if args.bench:
+        benchmark(search, args.bench)
+        return 0
+    if not args.table:
+        parser.error('a table (or --bench) is required')
+
+    if args.table == 'lookup':
+        if len(args.query) != 2:
+            parser.error('lookup takes TYPE ID')
+        results = search.lookup_rate_by_id(args.query[1], args.query[0])
+    elif args.table == 'composites':
+        results = search.search_composites_for_estimate(' '.join(args.query), args.unit, args.category, args.limit)
+    elif args.table == 'materials':
+        results = search.search_materials_for_estimate(' '.join(args.query), args.unit, args.limit)
+    elif args.table == 'plant':
+        results = search.search_plant_for_estimate(' '.join(args.query), args.limit)
+    else:
+        results = search.search_labour_rates_for_estimate(' '.join(args.query), args.limit)
+
+    json.dump(results, sys.stdout, indent=2, ensure_ascii=False)
+    print()
+    return 0 if results else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
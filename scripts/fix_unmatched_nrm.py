@@ -1,17 +1,25 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-Fix 78 unmatched NRM items in seed rate JSON files.
+Fix unmatched NRM items in seed rate JSON files.
 
-Group 0 (Facilitating) - 17 items with empty L2 codes
-Group 5 (Services) - 61 items with range codes (5.3-5.4, 5.5-5.7)
+Runs over every group_*.json file:
+- Items listed in GROUP_0_MAPPINGS get their manual L2/L4 mapping
+  (Group 0 facilitating items with empty L2 codes)
+- Items with range L2 codes (e.g. 5.3-5.4, 5.5-5.7) are resolved to a single
+  L2 code through RANGE_CODE_RULES, then to the best L4 code
+
+Matching rules are declarative tables compiled once into keyword matchers,
+and results are cached per (L2 code, normalised name).
 """
 
 import json
 import csv
 import sys
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from rate_classifier import KeywordScanner
 
 # Force UTF-8 encoding for output
 if sys.platform == 'win32':
@@ -20,8 +28,7 @@ if sys.platform == 'win32':
 # File paths
 BASE_DIR = Path(__file__).parent.parent
 CROSSWALK_FILE = BASE_DIR / "NRM" / "NRM1_L4_to_NRM2_Crosswalk.csv"
-GROUP_0_FILE = BASE_DIR / "au" / "seed-data" / "composite_rates" / "group_0_facilitating.json"
-GROUP_5_FILE = BASE_DIR / "au" / "seed-data" / "composite_rates" / "group_5_services.json"
+RATES_DIR = BASE_DIR / "au" / "seed-data" / "composite_rates"
 
 # Load crosswalk data
 def load_crosswalk() -> Dict[str, Dict]:
@@ -64,181 +71,248 @@ GROUP_0_MAPPINGS = {
     "GRP0-GROIMP-017": ("0.4", "0.4.2.1", "Soil stabilisation measures"),
 }
 
-# Manual mappings for Group 5 items with range codes
+# =============================================================================
+# RULE TABLES
+# =============================================================================
+
+# L2 resolution for Group 5 range codes, first matching rule wins.
+# Each rule is (conditions, (l2_code, reasoning)); every condition is a
+# keyword group and at least one keyword of each group must occur in the name.
+#   Items with "5.3-5.4" -> 5.4 (Water installations)
+#   Items with "5.5-5.7" -> 5.5 (HVAC), 5.6 (Space heating), or 5.7 (Electrical)
+GROUP_5_L2_RULES = [
+    # Water installations (originally 5.3-5.4)
+    ([["hot water", "water heater"]], ("5.4", "Hot water system")),
+    ([["water", "rainwater", "tempering"]], ("5.4", "Water installation")),
+    # HVAC/Heating/Ventilation (originally 5.5-5.7)
+    ([["ac", "air conditioning", "split system"]], ("5.6", "Air conditioning system")),
+    ([["ducted"], ["ac", "ductwork", "grille", "diffuser"]], ("5.6", "Ducted air conditioning")),
+    ([["vrf", "chiller", "cooling", "ahu", "fcu"]], ("5.6", "Central cooling system")),
+    ([["bms"], ["control"]], ("5.6", "BMS controls")),
+    ([["heating", "heater", "fireplace", "boiler"]], ("5.6", "Heating system")),
+    ([["exhaust", "fan", "ventilation", "hrv", "erv", "smoke", "stair press"]], ("5.7", "Ventilation system")),
+]
+GROUP_5_L2_DEFAULT = ("5.6", "Mechanical services")
+
+# Range L2 codes with a dedicated rule table
+RANGE_CODE_RULES = {
+    "5.3-5.4": (GROUP_5_L2_RULES, GROUP_5_L2_DEFAULT),
+    "5.5-5.7": (GROUP_5_L2_RULES, GROUP_5_L2_DEFAULT),
+}
+
+# Keyword groups linking item names to L4 descriptions: an L4 candidate
+# matches when the item name and its description share a keyword group
+L4_KEYWORD_GROUPS = {
+    "toxic": ["toxic", "hazardous"],
+    "demolition": ["demolition"],
+    "diversion": ["diversion"],
+    "excavation": ["excavation"],
+    "dewatering": ["dewatering"],
+    "stabilisation": ["stabilisation"],
+    "hot water": ["hot water"],
+    "water": ["water", "cold water"],
+    "heater": ["heater"],
+    "air conditioning": ["air conditioning", "cooling"],
+    "heating": ["heating"],
+    "ventilation": ["ventilation", "fan", "exhaust"],
+}
+
+
+def normalise_name(name: str) -> str:
+    """Normalise an item name for matching and cache keys."""
+    return name.lower().strip()
+
+
+class KeywordRuleMatcher:
+    """Ordered keyword rules compiled into a single scan per text."""
+
+    def __init__(self, rules: Sequence[Tuple[Sequence[Sequence[str]], object]], default=None):
+        self.rules = [([frozenset(group) for group in conditions], result) for conditions, result in rules]
+        self.default = default
+        self.scanner = KeywordScanner(kw for conditions, _ in self.rules for group in conditions for kw in group)
+        self.cache: Dict[str, object] = {}
+
+    def match(self, name: str):
+        """Return the result of the first rule whose conditions all hold."""
+        key = normalise_name(name)
+        if key in self.cache:
+            return self.cache[key]
+
+        hits = self.scanner.scan(key)
+        result = self.default
+        for conditions, rule_result in self.rules:
+            if all(group & hits for group in conditions):
+                result = rule_result
+                break
+        self.cache[key] = result
+        return result
+
+
+class L4Matcher:
+    """Resolve (L2 code, item name) to the best crosswalk L4 entry."""
+
+    def __init__(self, crosswalk_by_l2: Dict[str, List[Dict]], keyword_groups: Dict[str, List[str]] = L4_KEYWORD_GROUPS):
+        self.crosswalk_by_l2 = crosswalk_by_l2
+        self.groups = {name: frozenset(keywords) for name, keywords in keyword_groups.items()}
+        self.scanner = KeywordScanner(kw for keywords in self.groups.values() for kw in keywords)
+        self.candidate_groups: Dict[str, List[FrozenSet[str]]] = {}
+        self.cache: Dict[Tuple[str, str], Tuple[Optional[str], Optional[Dict]]] = {}
+
+    def _matched_groups(self, text: str) -> FrozenSet[str]:
+        hits = self.scanner.scan(text.lower())
+        return frozenset(name for name, keywords in self.groups.items() if keywords & hits)
+
+    def _groups_for_l2(self, l2_code: str) -> List[FrozenSet[str]]:
+        groups = self.candidate_groups.get(l2_code)
+        if groups is None:
+            groups = [self._matched_groups(c['nrm1_description']) for c in self.crosswalk_by_l2[l2_code]]
+            self.candidate_groups[l2_code] = groups
+        return groups
+
+    def match(self, l2_code: str, item_name: str) -> Tuple[Optional[str], Optional[Dict]]:
+        """Find the best L4 code match for a given L2 code and item name."""
+        if l2_code not in self.crosswalk_by_l2:
+            return None, None
+
+        key = (l2_code, normalise_name(item_name))
+        if key in self.cache:
+            return self.cache[key]
+
+        candidates = self.crosswalk_by_l2[l2_code]
+        name_groups = self._matched_groups(key[1])
+
+        # First candidate sharing a keyword group with the name, else the first
+        result = candidates[0]['nrm1_l4_code'], candidates[0]
+        if name_groups:
+            for candidate, groups in zip(candidates, self._groups_for_l2(l2_code)):
+                if groups & name_groups:
+                    result = candidate['nrm1_l4_code'], candidate
+                    break
+
+        self.cache[key] = result
+        return result
+
+
+_group_5_matcher = KeywordRuleMatcher(GROUP_5_L2_RULES, GROUP_5_L2_DEFAULT)
+_range_matchers = {code: KeywordRuleMatcher(rules, default) for code, (rules, default) in RANGE_CODE_RULES.items()}
+
+
 def get_group_5_l2_mapping(code: str, name: str) -> Tuple[str, str]:
-    """
-    Map Group 5 items to correct L2 code based on item name.
+    """Map Group 5 items to correct L2 code based on item name."""
+    return _group_5_matcher.match(name)
 
-    Items with "5.3-5.4" → Use 5.4 (Water installations)
-    Items with "5.5-5.7" → Use 5.5 (HVAC), 5.6 (Space heating), or 5.7 (Electrical)
-    """
-    name_lower = name.lower()
 
-    # Water installations (originally 5.3-5.4)
-    if "hot water" in name_lower or "water heater" in name_lower:
-        return ("5.4", "Hot water system")
-    elif "water" in name_lower or "rainwater" in name_lower or "tempering" in name_lower:
-        return ("5.4", "Water installation")
+def resolve_range_code(range_code: str, name: str) -> Tuple[str, str]:
+    """Resolve a range L2 code (e.g. "5.5-5.7") to a single L2 code."""
+    matcher = _range_matchers.get(range_code)
+    if matcher is not None:
+        return matcher.match(name)
+    # No rule table for this range - fall back to its lower bound
+    return range_code.split('-')[0].strip(), "Range lower bound"
 
-    # HVAC/Heating/Ventilation (originally 5.5-5.7)
-    elif "ac" in name_lower or "air conditioning" in name_lower or "split system" in name_lower:
-        return ("5.6", "Air conditioning system")
-    elif "ducted" in name_lower and ("ac" in name_lower or "ductwork" in name_lower or "grille" in name_lower or "diffuser" in name_lower):
-        return ("5.6", "Ducted air conditioning")
-    elif "vrf" in name_lower or "chiller" in name_lower or "cooling" in name_lower or "ahu" in name_lower or "fcu" in name_lower:
-        return ("5.6", "Central cooling system")
-    elif "bms" in name_lower and "control" in name_lower:
-        return ("5.6", "BMS controls")
-    elif "heating" in name_lower or "heater" in name_lower or "fireplace" in name_lower or "boiler" in name_lower:
-        return ("5.6", "Heating system")
-    elif "exhaust" in name_lower or "fan" in name_lower or "ventilation" in name_lower or "hrv" in name_lower or "erv" in name_lower or "smoke" in name_lower or "stair press" in name_lower:
-        return ("5.7", "Ventilation system")
-
-    # Default fallback
-    else:
-        return ("5.6", "Mechanical services")
-
-def find_best_l4_match(l2_code: str, item_name: str, crosswalk_by_l2: Dict) -> Tuple[str, Dict]:
-    """Find the best L4 code match for a given L2 code and item name."""
-    if l2_code not in crosswalk_by_l2:
-        return None, None
-
-    candidates = crosswalk_by_l2[l2_code]
-
-    # Simple keyword matching
-    name_lower = item_name.lower()
-    keywords_map = {
-        "toxic": ["toxic", "hazardous"],
-        "demolition": ["demolition"],
-        "diversion": ["diversion"],
-        "excavation": ["excavation"],
-        "dewatering": ["dewatering"],
-        "stabilisation": ["stabilisation"],
-        "hot water": ["hot water"],
-        "water": ["water", "cold water"],
-        "heater": ["heater"],
-        "air conditioning": ["air conditioning", "cooling"],
-        "heating": ["heating"],
-        "ventilation": ["ventilation", "fan", "exhaust"],
-    }
-
-    # Try to find exact match based on keywords
-    for candidate in candidates:
-        desc_lower = candidate['nrm1_description'].lower()
-        for keyword_group in keywords_map.values():
-            if any(kw in name_lower for kw in keyword_group):
-                if any(kw in desc_lower for kw in keyword_group):
-                    return candidate['nrm1_l4_code'], candidate
-
-    # If no keyword match, return first candidate
-    return candidates[0]['nrm1_l4_code'], candidates[0]
-
-def fix_group_0(crosswalk_by_l4: Dict, crosswalk_by_l2: Dict):
-    """Fix Group 0 facilitating items."""
-    print("=" * 80)
-    print("FIXING GROUP 0 (FACILITATING) - 17 items")
-    print("=" * 80)
 
-    with open(GROUP_0_FILE, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+def is_range_code(l2_code: str) -> bool:
+    return '-' in l2_code
 
-    fixed_count = 0
 
-    for rate in data['rates']:
-        code = rate['code']
-
-        if code in GROUP_0_MAPPINGS:
-            l2_code, l4_code, reasoning = GROUP_0_MAPPINGS[code]
-
-            if l4_code in crosswalk_by_l4:
-                crosswalk_entry = crosswalk_by_l4[l4_code]
-            else:
-                # Find best match
-                l4_code, crosswalk_entry = find_best_l4_match(l2_code, rate['name'], crosswalk_by_l2)
-
-            if crosswalk_entry:
-                rate['nrm1_l4_code'] = crosswalk_entry['nrm1_l4_code']
-                rate['nrm1_l3_code'] = crosswalk_entry['nrm1_l3_code']
-                rate['nrm1_l2_code'] = crosswalk_entry['nrm1_l2_code']
-                rate['nrm1_description'] = crosswalk_entry['nrm1_description']
-                rate['nrm2_primary_ws'] = crosswalk_entry['nrm2_primary_ws']
-                rate['nrm2_primary_ws_name'] = crosswalk_entry['nrm2_primary_ws_name']
-                rate['nrm2_primary_items'] = crosswalk_entry['nrm2_primary_items']
-                rate['nrm2_secondary_ws'] = crosswalk_entry['nrm2_secondary_ws']
-                rate['mapping_confidence'] = "Manual"
-
-                fixed_count += 1
-                print(f"[OK] {code}: {rate['name']}")
-                print(f"  L2: {l2_code} -> L4: {l4_code}")
-                print(f"  Reasoning: {reasoning}")
-                print()
-
-    # Write back
-    with open(GROUP_0_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-    print(f"Fixed {fixed_count} items in Group 0")
-    return fixed_count
+CROSSWALK_FIELDS = ('nrm1_l4_code', 'nrm1_l3_code', 'nrm1_l2_code', 'nrm1_description',
+                    'nrm2_primary_ws', 'nrm2_primary_ws_name', 'nrm2_primary_items', 'nrm2_secondary_ws')
+
+
+def apply_crosswalk_entry(rate: Dict, crosswalk_entry: Dict):
+    """Copy NRM1/NRM2 fields from a crosswalk row onto a rate."""
+    for field in CROSSWALK_FIELDS:
+        rate[field] = crosswalk_entry[field]
+    rate['mapping_confidence'] = "Manual"
+
+
+def has_crosswalk_entry(rate: Dict, crosswalk_entry: Dict) -> bool:
+    """True when the rate already carries every NRM field of the crosswalk row."""
+    return (rate.get('mapping_confidence') == "Manual"
+            and all(rate.get(field) == crosswalk_entry[field] for field in CROSSWALK_FIELDS))
 
-def fix_group_5(crosswalk_by_l4: Dict, crosswalk_by_l2: Dict):
-    """Fix Group 5 services items."""
-    print("\n" + "=" * 80)
-    print("FIXING GROUP 5 (SERVICES) - 61 items")
-    print("=" * 80)
 
-    with open(GROUP_5_FILE, 'r', encoding='utf-8') as f:
+def fix_rate(rate: Dict, crosswalk_by_l4: Dict, l4_matcher: L4Matcher) -> Optional[Tuple[str, str, str]]:
+    """
+    Fix a single rate in place.
+
+    Returns (from, to, reasoning) when the rate was fixed, None when it
+    needs no fix or already carries the target mapping.
+    """
+    code = rate['code']
+    l2_code = rate.get('nrm1_l2_code', '')
+
+    if code in GROUP_0_MAPPINGS:
+        target_l2, l4_code, reasoning = GROUP_0_MAPPINGS[code]
+        if l4_code in crosswalk_by_l4:
+            crosswalk_entry = crosswalk_by_l4[l4_code]
+        else:
+            # Find best match
+            l4_code, crosswalk_entry = l4_matcher.match(target_l2, rate['name'])
+        source = f"L2: {target_l2}"
+    elif is_range_code(l2_code):
+        target_l2, reasoning = resolve_range_code(l2_code, rate['name'])
+        l4_code, crosswalk_entry = l4_matcher.match(target_l2, rate['name'])
+        source = f"{l2_code} -> L2: {target_l2}"
+    else:
+        return None
+
+    if not crosswalk_entry or has_crosswalk_entry(rate, crosswalk_entry):
+        return None
+
+    apply_crosswalk_entry(rate, crosswalk_entry)
+    return source, l4_code, reasoning
+
+
+def fix_file(filepath: Path, crosswalk_by_l4: Dict, l4_matcher: L4Matcher, verbose: bool = True) -> int:
+    """Fix all unmatched items in one group file; rewrite it only if changed."""
+    with open(filepath, 'r', encoding='utf-8') as f:
         data = json.load(f)
 
     fixed_count = 0
-
     for rate in data['rates']:
-        l2_code = rate.get('nrm1_l2_code', '')
-
-        # Only fix items with range codes
-        if l2_code in ["5.3-5.4", "5.5-5.7"]:
-            # Get correct L2 mapping
-            correct_l2, reasoning = get_group_5_l2_mapping(rate['code'], rate['name'])
-
-            # Find best L4 match
-            l4_code, crosswalk_entry = find_best_l4_match(correct_l2, rate['name'], crosswalk_by_l2)
-
-            if crosswalk_entry:
-                rate['nrm1_l4_code'] = crosswalk_entry['nrm1_l4_code']
-                rate['nrm1_l3_code'] = crosswalk_entry['nrm1_l3_code']
-                rate['nrm1_l2_code'] = crosswalk_entry['nrm1_l2_code']
-                rate['nrm1_description'] = crosswalk_entry['nrm1_description']
-                rate['nrm2_primary_ws'] = crosswalk_entry['nrm2_primary_ws']
-                rate['nrm2_primary_ws_name'] = crosswalk_entry['nrm2_primary_ws_name']
-                rate['nrm2_primary_items'] = crosswalk_entry['nrm2_primary_items']
-                rate['nrm2_secondary_ws'] = crosswalk_entry['nrm2_secondary_ws']
-                rate['mapping_confidence'] = "Manual"
-
-                fixed_count += 1
-                print(f"[OK] {rate['code']}: {rate['name']}")
-                print(f"  {l2_code} -> L2: {correct_l2} -> L4: {l4_code}")
-                print(f"  Reasoning: {reasoning}")
-                print()
-
-    # Write back
-    with open(GROUP_5_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-    print(f"Fixed {fixed_count} items in Group 5")
+        fixed = fix_rate(rate, crosswalk_by_l4, l4_matcher)
+        if fixed is None:
+            continue
+
+        source, l4_code, reasoning = fixed
+        fixed_count += 1
+        if verbose:
+            print(f"[OK] {rate['code']}: {rate['name']}")
+            print(f"  {source} -> L4: {l4_code}")
+            print(f"  Reasoning: {reasoning}")
+            print()
+
+    if fixed_count:
+        # Write back
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
     return fixed_count
 
+
 def main():
     """Main function."""
+    quiet = '--quiet' in sys.argv[1:]
+
     print("Loading NRM crosswalk...")
     crosswalk_by_l4, crosswalk_by_l2 = load_crosswalk()
     print(f"Loaded {len(crosswalk_by_l4)} L4 codes, {len(crosswalk_by_l2)} L2 codes")
     print()
 
-    # Fix both groups
-    count_0 = fix_group_0(crosswalk_by_l4, crosswalk_by_l2)
-    count_5 = fix_group_5(crosswalk_by_l4, crosswalk_by_l2)
+    l4_matcher = L4Matcher(crosswalk_by_l2)
+
+    total = 0
+    for filepath in sorted(RATES_DIR.glob('group_*.json')):
+        print("=" * 80)
+        print(f"FIXING {filepath.name}")
+        print("=" * 80)
+        count = fix_file(filepath, crosswalk_by_l4, l4_matcher, verbose=not quiet)
+        print(f"Fixed {count} items in {filepath.name}\n")
+        total += count
 
-    print("\n" + "=" * 80)
-    print(f"TOTAL FIXED: {count_0 + count_5} items")
+    print("=" * 80)
+    print(f"TOTAL FIXED: {total} items")
     print("=" * 80)
 
 if __name__ == "__main__":
@@ -1,21 +1,34 @@
-"""Generate composite rates with labour, materials, and plant build-ups."""
+"""Generate composite rates with labour, materials, and plant build-ups.
+
+Usage:
+    python generate_rates.py                      # load staging file, write all groups
+    python generate_rates.py --stream             # constant-memory streaming mode
+    python generate_rates.py --stream --input rates.ndjson
+    python generate_rates.py --matrix --jobs 8    # all regions x spec levels, one library each
+"""
+import argparse
+import itertools
 import json
 import os
-from typing import Dict, List, Any
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Any, NamedTuple, Tuple
+
+from costing_kernel import DEFAULT_OHP_PERCENT, DEFAULT_WASTE_PERCENT, rollup_build_ups
+from rate_classifier import RateFeatures, get_classifier
+from rate_io import GroupFileWriter, IndexWriter, iter_staging_rates
 
 # Paths
 base_dir = r'C:\dev\contech\temp-contechdata\contechdata-rates'
 staging_file = os.path.join(base_dir, 'workspace', 'au', 'ingest', 'staging', 'rate_descriptions.json')
 output_dir = os.path.join(base_dir, 'au', 'seed-data', 'composite_rates')
+index_path = os.path.join(base_dir, 'au', 'seed-data', 'composite_rates_index.json')
+regions_file = os.path.join(base_dir, 'au', 'reference-data', 'regions.json')
+matrix_output_dir = os.path.join(base_dir, 'workspace', 'au', 'ingest', 'curated', 'composite_rates_matrix')
 
-os.makedirs(output_dir, exist_ok=True)
-
-# Load extracted rates
-with open(staging_file, 'r', encoding='utf-8') as f:
-    data = json.load(f)
-
-rates = data['rates']
-print(f'Loaded {len(rates)} rates')
+# Rates classified together per batch in streaming mode
+STREAM_BATCH_SIZE = 1000
 
 # Gang rates (from gangs.json)
 GANGS = {
@@ -27,174 +40,54 @@ GANGS = {
     '0+2': 110.0
 }
 
-# Trade mapping based on keywords
-def get_trade_and_gang(description: str, nrm_group: int) -> tuple:
-    desc_lower = description.lower()
-
-    # Electrical work
-    if any(kw in desc_lower for kw in ['electric', 'power', 'light', 'cable', 'socket', 'switch', 'wiring', 'circuit']):
-        return 'Electrician', '1+0', 84.0
-
-    # Plumbing work
-    if any(kw in desc_lower for kw in ['plumb', 'pipe', 'drain', 'water', 'sanitary', 'tap', 'valve', 'toilet', 'basin']):
-        return 'Plumber', '1+0.5', 92.0
-
-    # HVAC work
-    if any(kw in desc_lower for kw in ['hvac', 'ventil', 'air con', 'duct', 'heating', 'cooling', 'extract']):
-        return 'HVAC', '1+1', 95.0
-
-    # Brickwork/masonry
-    if any(kw in desc_lower for kw in ['brick', 'block', 'masonry', 'render', 'mortar']):
-        return 'Bricklayer', '1+1', 95.0
-
-    # Carpentry
-    if any(kw in desc_lower for kw in ['timber', 'wood', 'frame', 'joinery', 'door', 'window', 'stair', 'rail']):
-        return 'Carpenter', '1+0.5', 82.5
-
-    # Roofing
-    if any(kw in desc_lower for kw in ['roof', 'tile', 'gutter', 'flashing']):
-        return 'Roofer', '1+1', 95.0
-
-    # Plastering
-    if any(kw in desc_lower for kw in ['plaster', 'render', 'skim', 'ceiling']):
-        return 'Plasterer', '1+0.5', 82.5
-
-    # Tiling
-    if any(kw in desc_lower for kw in ['tile', 'ceramic', 'porcelain', 'mosaic']):
-        return 'Tiler', '1+0.5', 82.5
-
-    # Painting
-    if any(kw in desc_lower for kw in ['paint', 'decor', 'coating', 'finish']):
-        return 'Painter', '1+0', 66.0
-
-    # Concrete/groundworks
-    if any(kw in desc_lower for kw in ['concrete', 'excavat', 'foundation', 'footing', 'slab']):
-        return 'Labourer', '0+2', 110.0
-
-    # Demolition/hazmat
-    if any(kw in desc_lower for kw in ['demol', 'asbestos', 'hazard', 'remov']):
-        return 'Specialist', '1+1', 95.0
-
-    # Default by group
-    if nrm_group == 0:  # Facilitating
-        return 'Specialist', '1+1', 95.0
-    elif nrm_group == 1:  # Substructure
-        return 'Labourer', '0+2', 110.0
-    elif nrm_group == 5:  # Services
-        return 'Tradesperson', '1+0', 75.0
-    else:
-        return 'General', '1+0.5', 82.5
+# Spec level material multipliers (from spec_levels seed data)
+SPEC_LEVELS = {
+    'Basic': 0.85,
+    'Standard': 1.00,
+    'Premium': 1.35,
+    'Luxury': 1.70
+}
 
 
-def get_labour_hours(unit: str, description: str) -> float:
-    """Labour hours heuristics based on unit."""
-    unit_lower = unit.lower() if unit else 'm2'
-    desc_lower = description.lower()
+class Variant(NamedTuple):
+    """Region / spec level / base date a rate is generated for."""
+    region: str
+    region_factor: float
+    spec_level: str
+    spec_multiplier: float
+    base_date: str
+    region_code: str = 'SYD_METRO'
 
-    # Complex work
-    if any(kw in desc_lower for kw in ['complex', 'ornate', 'special', 'bespoke']):
-        multiplier = 1.5
-    else:
-        multiplier = 1.0
-
-    if 'm2' in unit_lower or 'm²' in unit_lower:
-        # Area-based work
-        if any(kw in desc_lower for kw in ['wall', 'brick', 'block', 'masonry']):
-            return 0.6 * multiplier
-        elif any(kw in desc_lower for kw in ['tile', 'floor', 'ceil']):
-            return 0.35 * multiplier
-        elif any(kw in desc_lower for kw in ['paint', 'coat']):
-            return 0.12 * multiplier
-        elif any(kw in desc_lower for kw in ['roof', 'clad']):
-            return 0.25 * multiplier
-        else:
-            return 0.3 * multiplier
-    elif 'm3' in unit_lower or 'm³' in unit_lower:
-        # Volume-based work (concrete, excavation)
-        return 1.5 * multiplier
-    elif unit_lower in ['m', 'lm']:
-        # Linear work
-        if any(kw in desc_lower for kw in ['pipe', 'cable', 'duct']):
-            return 0.15 * multiplier
-        else:
-            return 0.25 * multiplier
-    elif unit_lower in ['nr', 'ea', 'item', 'unit', 'leaf']:
-        # Each/number based
-        if any(kw in desc_lower for kw in ['simple', 'small']):
-            return 0.5 * multiplier
-        elif any(kw in desc_lower for kw in ['large', 'complex']):
-            return 3.0 * multiplier
-        else:
-            return 1.0 * multiplier
-    else:
-        return 0.5 * multiplier
-
-
-def get_material_cost(unit: str, description: str) -> float:
-    """Material cost heuristics."""
-    unit_lower = unit.lower() if unit else 'm2'
-    desc_lower = description.lower()
-
-    # High value materials
-    if any(kw in desc_lower for kw in ['marble', 'granite', 'stone', 'premium']):
-        base = 150.0
-    elif any(kw in desc_lower for kw in ['timber', 'hardwood']):
-        base = 80.0
-    elif any(kw in desc_lower for kw in ['steel', 'metal']):
-        base = 60.0
-    elif any(kw in desc_lower for kw in ['tile', 'porcelain']):
-        base = 55.0
-    elif any(kw in desc_lower for kw in ['brick', 'block']):
-        base = 40.0
-    elif any(kw in desc_lower for kw in ['concrete']):
-        base = 35.0
-    elif any(kw in desc_lower for kw in ['plaster', 'paint']):
-        base = 15.0
-    elif any(kw in desc_lower for kw in ['insulation']):
-        base = 20.0
-    elif any(kw in desc_lower for kw in ['electric', 'cable']):
-        base = 25.0
-    elif any(kw in desc_lower for kw in ['pipe', 'plumb']):
-        base = 30.0
-    else:
-        base = 25.0
+    def directory(self) -> str:
+        """Output sub-directory of the variant's library in matrix mode."""
+        return os.path.join(self.region_code, self.spec_level, self.base_date)
 
-    # Adjust for unit type
-    if 'm3' in unit_lower or 'm³' in unit_lower:
-        return base * 5
-    elif unit_lower in ['nr', 'ea', 'item', 'unit']:
-        return base * 0.8
-    else:
-        return base
-
-
-def get_plant_cost(unit: str, description: str, nrm_group: int) -> float:
-    """Plant cost heuristics."""
-    desc_lower = description.lower()
-
-    # Groups with significant plant
-    if nrm_group in [0, 1, 8]:  # Facilitating, Substructure, External
-        base = 15.0
-    elif any(kw in desc_lower for kw in ['excavat', 'demol', 'concrete']):
-        base = 20.0
-    elif any(kw in desc_lower for kw in ['scaffold', 'height', 'lift']):
-        base = 10.0
-    elif any(kw in desc_lower for kw in ['crane', 'hoist']):
-        base = 25.0
-    else:
-        base = 3.0
 
-    return base
+BASELINE_VARIANT = Variant('Sydney Metro', 1.0, 'Standard', 1.0, 'Jan-2025')
 
 
-def build_rate(rate: Dict) -> Dict:
-    """Build rate with all components."""
-    trade, gang, gang_rate = get_trade_and_gang(rate['description'], rate['nrm_group'])
-    hrs = get_labour_hours(rate['unit'], rate['description'])
-    mat_cost = get_material_cost(rate['unit'], rate['description'])
-    plant_cost = get_plant_cost(rate['unit'], rate['description'], rate['nrm_group'])
+def compute_costs(features: List[RateFeatures], variant: Variant = BASELINE_VARIANT) -> List[Dict]:
+    """Roll up costs for a batch of classified rates in one vectorised pass."""
+    columns = rollup_build_ups(
+        hours=[f.labour_hours for f in features],
+        gang_rate=[f.gang_rate * variant.region_factor for f in features],
+        material=[f.material_cost * variant.spec_multiplier * variant.region_factor for f in features],
+        plant=[f.plant_cost * variant.region_factor for f in features],
+        waste_percent=DEFAULT_WASTE_PERCENT,
+        ohp_percent=DEFAULT_OHP_PERCENT,
+    )
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*(columns[n].tolist() for n in names))]
+
 
-    labour_cost = hrs * gang_rate
+def build_rate(rate: Dict, features: RateFeatures = None, variant: Variant = BASELINE_VARIANT,
+               costs: Dict = None) -> Dict:
+    """Build rate with all components."""
+    if features is None:
+        features = get_classifier().classify(rate['description'], rate['unit'], rate['nrm_group'])
+    if costs is None:
+        costs = compute_costs([features], variant)[0]
+    nrm2_code = rate['nrm2_codes'][0] if rate['nrm2_codes'] else 'WS1'
 
     # Build output
     return {
@@ -204,45 +97,45 @@ def build_rate(rate: Dict) -> Dict:
         'unit': rate['unit'],
         'nrm1_code': rate['nrm1_code'],
         'nrm2_codes': ', '.join(rate['nrm2_codes']) if rate['nrm2_codes'] else '',
-        'spec_level': 'Standard',
-        'base_date': 'Jan-2025',
-        'region': 'Sydney Metro',
+        'spec_level': variant.spec_level,
+        'base_date': variant.base_date,
+        'region': variant.region,
         'labour': [{
-            'nrm2_code': rate['nrm2_codes'][0] if rate['nrm2_codes'] else 'WS1',
+            'nrm2_code': nrm2_code,
             'task_description': rate['description'][:50],
-            'gang': gang,
-            'output': round(1/hrs, 2) if hrs > 0 else 1.0,
+            'gang': features.gang,
+            'output': costs['output'],
             'output_unit': rate['unit'] + '/hr',
-            'hrs_per_unit': round(hrs, 4),
-            'rate_per_hour': gang_rate,
-            'cost_per_unit': round(labour_cost, 2),
+            'hrs_per_unit': costs['hrs_per_unit'],
+            'rate_per_hour': costs['rate_per_hour'],
+            'cost_per_unit': costs['labour_total'],
             'source': 'Heuristic'
         }],
         'materials': [{
-            'nrm2_code': rate['nrm2_codes'][0] if rate['nrm2_codes'] else 'WS1',
+            'nrm2_code': nrm2_code,
             'description': 'Materials allowance',
             'unit': rate['unit'],
             'quantity': 1.0,
-            'unit_rate': round(mat_cost, 2),
-            'cost': round(mat_cost, 2),
+            'unit_rate': costs['materials_total'],
+            'cost': costs['materials_total'],
             'supplier': 'TBC'
         }],
         'plant': [{
-            'nrm2_code': rate['nrm2_codes'][0] if rate['nrm2_codes'] else 'WS1',
+            'nrm2_code': nrm2_code,
             'description': 'Plant allowance',
             'unit': rate['unit'],
             'quantity': 1.0,
-            'unit_rate': round(plant_cost, 2),
-            'cost': round(plant_cost, 2),
+            'unit_rate': costs['plant_total'],
+            'cost': costs['plant_total'],
             'notes': None
         }],
-        'labour_total': round(labour_cost, 2),
-        'materials_total': round(mat_cost, 2),
-        'plant_total': round(plant_cost, 2),
-        'waste_percent': 5,
-        'nett_total': round((labour_cost + mat_cost + plant_cost) * 1.05, 2),
-        'ohp_percent': 15,
-        'total_rate': round((labour_cost + mat_cost + plant_cost) * 1.05 * 1.15, 2)
+        'labour_total': costs['labour_total'],
+        'materials_total': costs['materials_total'],
+        'plant_total': costs['plant_total'],
+        'waste_percent': DEFAULT_WASTE_PERCENT,
+        'nett_total': costs['nett_total'],
+        'ohp_percent': DEFAULT_OHP_PERCENT,
+        'total_rate': costs['total_rate']
     }
 
 
@@ -257,49 +150,294 @@ GROUP_NAMES = {
     8: 'external'
 }
 
-# Process and write files
-group_data = {}
-for rate in rates:
-    g = rate['nrm_group']
-    if g not in group_data:
-        group_data[g] = []
-    group_data[g].append(build_rate(rate))
-
-# Write group files
-index = {'groups': {}, 'total': 0}
-for g, group_rates in group_data.items():
-    filename = f'group_{g}_{GROUP_NAMES.get(g, "unknown")}.json'
-    filepath = os.path.join(output_dir, filename)
-
-    output = {
-        'meta': {
-            'nrm_group': g,
-            'group_name': GROUP_NAMES.get(g, 'unknown'),
-            'count': len(group_rates),
-            'generated': '2026-01-03',
-            'source': 'Composite_Rate_Descriptions.xlsx'
-        },
-        'rates': group_rates
-    }
 
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+def group_filename(g: int) -> str:
+    return f'group_{g}_{GROUP_NAMES.get(g, "unknown")}.json'
+
 
-    index['groups'][str(g)] = {
-        'name': GROUP_NAMES.get(g, 'unknown'),
-        'file': filename,
-        'count': len(group_rates),
-        'codes': [r['code'] for r in group_rates]
+def group_meta(g: int, count: int) -> Dict:
+    return {
+        'nrm_group': g,
+        'group_name': GROUP_NAMES.get(g, 'unknown'),
+        'count': count,
+        'generated': '2026-01-03',
+        'source': 'Composite_Rate_Descriptions.xlsx'
     }
-    index['total'] += len(group_rates)
-    print(f'Wrote {filename}: {len(group_rates)} rates')
 
-# Write index file
-index_path = os.path.join(base_dir, 'au', 'seed-data', 'composite_rates_index.json')
-with open(index_path, 'w', encoding='utf-8') as f:
-    json.dump(index, f, indent=2, ensure_ascii=False)
 
-print(f'\nWrote composite_rates_index.json: {index["total"]} total rates')
-print('\nDone! Generated rates by group:')
-for g in sorted(group_data.keys()):
-    print(f'  Group {g} ({GROUP_NAMES.get(g)}): {len(group_data[g])} rates')
+def build_rates(rates: Iterable[Dict]) -> Iterator[Tuple[int, Dict]]:
+    """Classify and build rates in fixed-size batches, yielding (group, rate)."""
+    classifier = get_classifier()
+    rates = iter(rates)
+    while True:
+        batch = list(itertools.islice(rates, STREAM_BATCH_SIZE))
+        if not batch:
+            return
+        features = classifier.classify_many(
+            (rate['description'], rate['unit'], rate['nrm_group']) for rate in batch
+        )
+        costs = compute_costs(features)
+        for rate, rate_features, rate_costs in zip(batch, features, costs):
+            yield rate['nrm_group'], build_rate(rate, rate_features, costs=rate_costs)
+
+
+def generate(staging_path: str) -> Dict[int, int]:
+    """Load the whole staging file, build every group in memory and write it."""
+    with open(staging_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    rates = data['rates']
+    print(f'Loaded {len(rates)} rates')
+
+    group_data = {}
+    for g, built in build_rates(rates):
+        if g not in group_data:
+            group_data[g] = []
+        group_data[g].append(built)
+
+    # Write group files
+    index = {'groups': {}, 'total': 0}
+    for g, group_rates in group_data.items():
+        filename = group_filename(g)
+        filepath = os.path.join(output_dir, filename)
+
+        output = {
+            'meta': group_meta(g, len(group_rates)),
+            'rates': group_rates
+        }
+
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2, ensure_ascii=False)
+
+        index['groups'][str(g)] = {
+            'name': GROUP_NAMES.get(g, 'unknown'),
+            'file': filename,
+            'count': len(group_rates),
+            'codes': [r['code'] for r in group_rates]
+        }
+        index['total'] += len(group_rates)
+        print(f'Wrote {filename}: {len(group_rates)} rates')
+
+    # Write index file
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+
+    return {g: len(group_rates) for g, group_rates in group_data.items()}
+
+
+def _commit(writers: Dict[int, GroupFileWriter], index: IndexWriter):
+    """Replace the group files and index once every rate has been written."""
+    for g, writer in writers.items():
+        writer.close()
+        print(f'Wrote {group_filename(g)}: {writer.count} rates')
+    index.close()
+
+
+def _abort(writers: Dict[int, GroupFileWriter], index: IndexWriter):
+    """Discard partial output so existing group files and index are left as they were."""
+    for writer in writers.values():
+        writer.abort()
+    index.abort()
+
+
+def generate_streaming(staging_path: str) -> Dict[int, int]:
+    """
+    Stream staging rates straight into per-group writers.
+
+    Only one batch of rates is held in memory at a time, so peak memory is
+    independent of the staging file size. Output is byte-identical to
+    generate(). Group files and the index are only replaced once the whole
+    stream has been built; on error they are left as they were.
+    """
+    writers: Dict[int, GroupFileWriter] = {}
+    index = IndexWriter(index_path)
+
+    try:
+        for g, built in build_rates(iter_staging_rates(staging_path)):
+            writer = writers.get(g)
+            if writer is None:
+                filename = group_filename(g)
+                writer = GroupFileWriter(os.path.join(output_dir, filename), group_meta(g, 0))
+                writers[g] = writer
+                index.add_group(str(g), GROUP_NAMES.get(g, 'unknown'), filename)
+            writer.write(built)
+            index.add_code(str(g), built['code'])
+    except BaseException:
+        _abort(writers, index)
+        raise
+    _commit(writers, index)
+
+    return {g: writer.count for g, writer in writers.items()}
+
+
+def load_variants(region_codes: List[str], spec_levels: List[str], base_dates: List[str]) -> List[Variant]:
+    """Expand regions x spec levels x base dates into variants (region-major order)."""
+    with open(regions_file, 'r', encoding='utf-8') as f:
+        regions = json.load(f)['regions']
+
+    if region_codes:
+        by_code = {r['code']: r for r in regions}
+        unknown = [c for c in region_codes if c not in by_code]
+        if unknown:
+            raise ValueError(f'Unknown region codes: {", ".join(unknown)}')
+        regions = [by_code[c] for c in region_codes]
+
+    unknown = [s for s in spec_levels if s not in SPEC_LEVELS]
+    if unknown:
+        raise ValueError(f'Unknown spec levels: {", ".join(unknown)}')
+
+    return [
+        Variant(r['name'], float(r['factor']), spec, SPEC_LEVELS[spec], base_date, r['code'])
+        for r in regions
+        for spec in spec_levels
+        for base_date in base_dates
+    ]
+
+
+def build_shard(rates: List[Dict], variants: List[Variant]) -> Tuple[List[Dict], int, float]:
+    """Worker: build one (NRM group, region) shard. Returns rates, pid and busy seconds."""
+    start = time.perf_counter()
+    features = get_classifier().classify_many(
+        (rate['description'], rate['unit'], rate['nrm_group']) for rate in rates
+    )
+    built = []
+    for variant in variants:
+        costs = compute_costs(features, variant)
+        built.extend(
+            build_rate(rate, rate_features, variant, rate_costs)
+            for rate, rate_features, rate_costs in zip(rates, features, costs)
+        )
+    return built, os.getpid(), time.perf_counter() - start
+
+
+def generate_matrix(staging_path: str, out_dir: str, variants: List[Variant], jobs: int = None) -> Dict[int, int]:
+    """
+    Build every rate for every variant on a process pool.
+
+    Each variant is a complete library of its own, written to
+    out_dir/<region code>/<spec level>/<base date>/ with its own
+    composite_rates_index.json, so rate codes stay unique per library and
+    RateLookup works on any variant directory unchanged.
+
+    Work is sharded by (NRM group, region). Shards are consumed in submission
+    order, so output is identical regardless of worker count or scheduling.
+    Nothing is replaced until every shard has been written; on error or
+    interrupt existing output is left as it was.
+
+    Returns:
+        {group: rates written across all variants}
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    by_group: Dict[int, List[Dict]] = {}
+    for rate in iter_staging_rates(staging_path):
+        by_group.setdefault(rate['nrm_group'], []).append(rate)
+
+    by_region: Dict[str, List[Variant]] = {}
+    for variant in variants:
+        by_region.setdefault(variant.region, []).append(variant)
+
+    shards = [(g, region) for g in by_group for region in by_region]
+    print(f'Matrix: {sum(len(r) for r in by_group.values())} rates x {len(variants)} variants '
+          f'in {len(shards)} shards')
+
+    worker_rates = defaultdict(int)
+    worker_time = defaultdict(float)
+    writers: Dict[Tuple[Variant, int], GroupFileWriter] = {}
+    indexes: Dict[Variant, IndexWriter] = {}
+    start = time.perf_counter()
+
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = pool.map(
+                build_shard,
+                [by_group[g] for g, _ in shards],
+                [by_region[region] for _, region in shards],
+            )
+            for (g, region), (built, pid, elapsed) in zip(shards, results):
+                size = len(by_group[g])
+                for k, variant in enumerate(by_region[region]):
+                    variant_dir = os.path.join(out_dir, variant.directory())
+                    index = indexes.get(variant)
+                    if index is None:
+                        os.makedirs(variant_dir, exist_ok=True)
+                        index = indexes[variant] = IndexWriter(os.path.join(variant_dir, 'composite_rates_index.json'))
+                    writer = writers.get((variant, g))
+                    if writer is None:
+                        filename = group_filename(g)
+                        writer = GroupFileWriter(os.path.join(variant_dir, filename), group_meta(g, 0))
+                        writers[(variant, g)] = writer
+                        index.add_group(str(g), GROUP_NAMES.get(g, 'unknown'), filename)
+                    for rate in built[k * size:(k + 1) * size]:
+                        writer.write(rate)
+                        index.add_code(str(g), rate['code'])
+                worker_rates[pid] += len(built)
+                worker_time[pid] += elapsed
+    except BaseException:
+        for writer in writers.values():
+            writer.abort()
+        for index in indexes.values():
+            index.abort()
+        raise
+
+    counts: Dict[int, int] = defaultdict(int)
+    variant_counts: Dict[Variant, int] = defaultdict(int)
+    for (variant, g), writer in writers.items():
+        writer.close()
+        counts[g] += writer.count
+        variant_counts[variant] += writer.count
+    for index in indexes.values():
+        index.close()
+    print(f'Wrote {len(indexes)} variant libraries under {out_dir}:')
+    for variant, index in indexes.items():
+        print(f'  {index.path}: {variant_counts[variant]} rates')
+
+    wall = time.perf_counter() - start
+    print('\nThroughput by worker:')
+    for pid in sorted(worker_rates):
+        rate = worker_rates[pid] / worker_time[pid] if worker_time[pid] > 0 else 0.0
+        print(f'  Worker {pid}: {worker_rates[pid]} rates in {worker_time[pid]:.2f}s ({rate:,.0f} rates/sec)')
+    total = sum(worker_rates.values())
+    print(f'  Overall: {total} rates in {wall:.2f}s ({total / wall if wall > 0 else 0.0:,.0f} rates/sec)')
+
+    return dict(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--input', default=staging_file,
+                        help='Staging rates (rate_descriptions.json or .ndjson/.jsonl)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream rates into group files with constant memory')
+    parser.add_argument('--matrix', action='store_true',
+                        help='Generate every region x spec level x base date on a process pool')
+    parser.add_argument('--regions', nargs='*', default=[],
+                        help='Region codes from regions.json (default: all)')
+    parser.add_argument('--spec-levels', nargs='*', default=list(SPEC_LEVELS),
+                        help='Spec levels to generate (default: all)')
+    parser.add_argument('--base-dates', nargs='*', default=[BASELINE_VARIANT.base_date],
+                        help='Base date labels to generate')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='Worker processes for --matrix (default: CPU count)')
+    parser.add_argument('--output', default=matrix_output_dir,
+                        help='Output directory for --matrix')
+    args = parser.parse_args()
+
+    if args.matrix:
+        variants = load_variants(args.regions, args.spec_levels, args.base_dates)
+        counts = generate_matrix(args.input, args.output, variants, args.jobs)
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+        if args.stream:
+            counts = generate_streaming(args.input)
+        else:
+            counts = generate(args.input)
+        print(f'\nWrote composite_rates_index.json: {sum(counts.values())} total rates')
+
+    print('\nDone! Generated rates by group' + (' (all variants):' if args.matrix else ':'))
+    for g in sorted(counts.keys()):
+        print(f'  Group {g} ({GROUP_NAMES.get(g)}): {counts[g]} rates')
+
+
+if __name__ == '__main__':
+    main()
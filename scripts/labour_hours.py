@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Batch labour-hours calculator mirroring calculate_labour_hours_batch.
+
+The SQL function loops over its items in PL/pgSQL and calls
+calculate_adjusted_labour_hours once per item. Here the items of a whole
+estimate are resolved to productivity rows and condition factors once and
+priced in a single vectorised pass:
+
+    base_hours   = quantity / (output * gang_efficiency * gang / standard_gang) * gang
+    total_hours  = max(base_hours * condition_factor * scale_factor
+                       + setup_hours + packup_hours, minimum_hours)
+
+``output`` (units per gang-hour) and the standard gang (skilled + general
+labour) come from the productivity metrics export; hours are labour
+(person) hours. Condition factors come from condition_factors.json: each
+item's ``conditions`` maps a category (location, height, weather,
+complexity) to a factor code, code suffix or name, and only factors that
+apply to labour are used. ``scale_factor`` is the quantity category factor,
+chosen from the item's quantity against one gang-day of output unless the
+conditions name a quantity category.
+
+The export holds no setup, packup or minimum hours, so the DEFAULT_*
+allowances below apply unless an item sets ``setup_hours``,
+``packup_hours`` or ``minimum_hours``. An item may also set ``gang_size``;
+the SQL batch always uses the standard gang.
+
+    python labour_hours.py items.json            # [{"productivity_id": ..., "quantity": ...}]
+    python labour_hours.py --bench 2000
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from condition_factors import CONDITION_FACTORS_FILE, ConditionTable, load_condition_factors
+
+BASE_DIR = Path(__file__).parent.parent
+PRODUCTIVITY_CSV = BASE_DIR / 'heuristics-source' / 'supabase-exports' / 'productivity_metrics-20260103.csv'
+
+HOURS_PER_DAY = 8.0
+
+# Crew-hour allowances per item, scaled by gang size
+DEFAULT_SETUP_HOURS = 0.5
+DEFAULT_PACKUP_HOURS = 0.25
+# Labour hours charged at least per item
+DEFAULT_MINIMUM_HOURS = 4.0
+
+# Output lost per person away from the standard gang, as a fraction
+GANG_EFFICIENCY_LOSS = 0.05
+MIN_GANG_EFFICIENCY = 0.7
+
+# Quantity against one gang-day of output -> quantity factor code
+SMALL_QUANTITY_RATIO = 0.25
+LARGE_QUANTITY_RATIO = 2.0
+QUANTITY_SMALL = 'CF_QUANTITY_SMALL_QTY_<25%_OF_NORM'
+QUANTITY_NORMAL = 'CF_QUANTITY_NORMAL_QUANTITY'
+QUANTITY_LARGE = 'CF_QUANTITY_LARGE_QTY_GT_200%_OF_NORM'
+
+RESULT_FIELDS = ('item_index', 'productivity_id', 'base_hours', 'setup_hours', 'packup_hours',
+                 'total_hours', 'condition_factor', 'gang_efficiency', 'scale_factor',
+                 'minimum_applied', 'calculation_notes')
+
+
+def _number(value, default: float = 0.0) -> float:
+    try:
+        return float(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        return default
+
+
+def load_productivity(path: Path = PRODUCTIVITY_CSV) -> List[Dict]:
+    """Productivity rows with numeric output and standard gang size."""
+    rows = []
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            rows.append({
+                'id': row['id'],
+                'activity_code': row.get('activity_code'),
+                'activity_description': row.get('activity_description'),
+                'trade_group': row.get('trade_group'),
+                'unit': row.get('unit'),
+                'output': _number(row.get('output')),
+                'gang_size': _number(row.get('skilled_labour')) + _number(row.get('general_labour')),
+            })
+    return rows
+
+
+class LabourHoursCalculator:
+    """Vectorised calculate_labour_hours_batch over in-memory productivity rows."""
+
+    def __init__(self, productivity: Sequence[Mapping], condition_factors: Sequence[Mapping]):
+        self.productivity = list(productivity)
+        self.rows = {row['id']: i for i, row in enumerate(self.productivity)}
+        self.output = np.array([row['output'] for row in self.productivity], dtype=float)
+        self.gang = np.array([row['gang_size'] or 1.0 for row in self.productivity], dtype=float)
+        # Quantity factors feed scale_factor, every other category condition_factor
+        self.conditions = ConditionTable([f for f in condition_factors if f['category'] != 'quantity'],
+                                         resource_types=('Labour',))
+        self.quantity = ConditionTable([f for f in condition_factors if f['category'] == 'quantity'],
+                                       resource_types=('Labour',))
+        self._condition_cache: Dict[Tuple, Tuple[int, Optional[int], List[str]]] = {}
+
+    @classmethod
+    def from_seed_data(cls) -> 'LabourHoursCalculator':
+        return cls(load_productivity(), load_condition_factors())
+
+    def _resolve_conditions(self, conditions: Mapping) -> Tuple[int, Optional[int], List[str]]:
+        """(condition combination, quantity combination or None, notes) of a conditions object."""
+        key = tuple(sorted((str(k), str(v)) for k, v in conditions.items()))
+        cached = self._condition_cache.get(key)
+        if cached is None:
+            notes = []
+            other = {k: v for k, v in conditions.items() if k != 'quantity'}
+            combo = self.conditions.combination(other, unknown=notes)
+            quantity = None
+            if 'quantity' in conditions:
+                quantity = self.quantity.combination({'quantity': conditions['quantity']}, unknown=notes) or None
+            cached = (combo, quantity, [f'ignored: {note}' for note in notes])
+            self._condition_cache[key] = cached
+        return cached
+
+    def _quantity_combo(self, code: str) -> int:
+        return self.quantity.combination({'quantity': code})
+
+    def calculate(self, items: Sequence[Mapping], notes: bool = True) -> Dict[str, np.ndarray]:
+        """
+        Price items; returns result columns (see RESULT_FIELDS).
+
+        Items without a known productivity_id are skipped, keeping the
+        item_index of the others, as the SQL batch does.
+        """
+        index, rows, quantity = [], [], []
+        combos, quantity_combos, cond_notes = [], [], []
+        gang, setup, packup, minimum = [], [], [], []
+        for i, item in enumerate(items):
+            row = self.rows.get(item.get('productivity_id'))
+            if row is None:
+                continue
+            combo, quantity_combo, item_notes = self._resolve_conditions(item.get('conditions') or {})
+            index.append(i)
+            rows.append(row)
+            quantity.append(_number(item.get('quantity'), 1.0))
+            combos.append(combo)
+            quantity_combos.append(-1 if quantity_combo is None else quantity_combo)
+            cond_notes.append(item_notes)
+            gang.append(_number(item.get('gang_size'), np.nan))
+            setup.append(_number(item.get('setup_hours'), np.nan))
+            packup.append(_number(item.get('packup_hours'), np.nan))
+            minimum.append(_number(item.get('minimum_hours'), DEFAULT_MINIMUM_HOURS))
+
+        rows = np.array(rows, dtype=np.int64)
+        quantity = np.array(quantity, dtype=float)
+        standard = self.gang[rows]
+        output = self.output[rows]
+        gang = np.array(gang, dtype=float)
+        gang = np.where(np.isnan(gang), standard, gang)
+
+        gang_efficiency = np.maximum(1.0 - GANG_EFFICIENCY_LOSS * np.abs(gang - standard), MIN_GANG_EFFICIENCY)
+        gang_output = output * gang_efficiency * gang / standard
+        with np.errstate(divide='ignore', invalid='ignore'):
+            base_hours = np.where(gang_output > 0, quantity / gang_output * gang, 0.0)
+            ratio = np.where(output > 0, quantity / (output * HOURS_PER_DAY), 1.0)
+
+        quantity_factor = self.quantity.table[:, 0]
+        auto_scale = np.select([ratio < SMALL_QUANTITY_RATIO, ratio > LARGE_QUANTITY_RATIO],
+                               [quantity_factor[self._quantity_combo(QUANTITY_SMALL)],
+                                quantity_factor[self._quantity_combo(QUANTITY_LARGE)]],
+                               quantity_factor[self._quantity_combo(QUANTITY_NORMAL)])
+        quantity_combos = np.array(quantity_combos, dtype=np.int64)
+        scale_factor = np.where(quantity_combos < 0, auto_scale, quantity_factor[quantity_combos])
+        condition_factor = self.conditions.multipliers(np.array(combos, dtype=np.int64), 'Labour')
+
+        setup = np.array(setup, dtype=float)
+        packup = np.array(packup, dtype=float)
+        setup_hours = np.where(np.isnan(setup), DEFAULT_SETUP_HOURS * gang, setup)
+        packup_hours = np.where(np.isnan(packup), DEFAULT_PACKUP_HOURS * gang, packup)
+        minimum = np.array(minimum, dtype=float)
+
+        total_hours = base_hours * condition_factor * scale_factor + setup_hours + packup_hours
+        minimum_applied = total_hours < minimum
+        total_hours = np.where(minimum_applied, minimum, total_hours)
+
+        result = {
+            'item_index': np.array(index, dtype=np.int64),
+            'productivity_id': [self.productivity[r]['id'] for r in rows],
+            'base_hours': base_hours,
+            'setup_hours': setup_hours,
+            'packup_hours': packup_hours,
+            'total_hours': total_hours,
+            'condition_factor': condition_factor,
+            'gang_efficiency': gang_efficiency,
+            'scale_factor': scale_factor,
+            'minimum_applied': minimum_applied,
+        }
+        result['calculation_notes'] = self._notes(result, rows, quantity, gang, minimum, cond_notes) if notes else None
+        return result
+
+    def _notes(self, result, rows, quantity, gang, minimum, cond_notes) -> List[str]:
+        notes = []
+        for i, row in enumerate(rows):
+            prod = self.productivity[row]
+            parts = [f"{quantity[i]:g} @ {prod['output']:g} {prod['unit']} x {gang[i]:g} gang"]
+            if result['condition_factor'][i] != 1.0:
+                parts.append(f"conditions x{result['condition_factor'][i]:.4g}")
+            if result['scale_factor'][i] != 1.0:
+                parts.append(f"quantity x{result['scale_factor'][i]:.4g}")
+            if result['minimum_applied'][i]:
+                parts.append(f'minimum {minimum[i]:g} h applied')
+            parts.extend(cond_notes[i])
+            notes.append('; '.join(parts))
+        return notes
+
+    def calculate_rows(self, items: Sequence[Mapping]) -> List[Dict]:
+        """Result rows as dicts, like the SQL function's result set."""
+        result = self.calculate(items)
+        rows = []
+        for i in range(len(result['item_index'])):
+            row = {}
+            for field in RESULT_FIELDS:
+                value = result[field][i]
+                row[field] = value.item() if isinstance(value, np.generic) else value
+            rows.append(row)
+        return rows
+
+
+def benchmark(calculator: LabourHoursCalculator, size: int, repeat: int = 50):
+    rng = np.random.default_rng(0)
+    ids = [row['id'] for row in calculator.productivity]
+    condition_sets = [{}, {'location': 'restricted_access'}, {'height': '35m_70m', 'weather': 'external_exposed'},
+                      {'complexity': 'moderate_detail', 'location': 'difficult_access'}]
+    items = [{'productivity_id': ids[rng.integers(len(ids))],
+              'quantity': float(rng.uniform(1, 500)),
+              'conditions': condition_sets[rng.integers(len(condition_sets))]} for _ in range(size)]
+    for notes in (False, True):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            calculator.calculate(items, notes=notes)
+            timings.append(time.perf_counter() - start)
+        p50, p95 = np.percentile(timings, [50, 95]) * 1000
+        print(f"{size} items{' with notes' if notes else ''}: p50 {p50:.3f} ms  p95 {p95:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch labour-hours calculation')
+    parser.add_argument('items', nargs='?', help='JSON file with an array of items ("-" for stdin)')
+    parser.add_argument('--productivity', default=str(PRODUCTIVITY_CSV), help='Productivity metrics CSV export')
+    parser.add_argument('--condition-factors', default=str(CONDITION_FACTORS_FILE))
+    parser.add_argument('--bench', type=int, metavar='N', help='Benchmark a batch of N random items')
+    args = parser.parse_args()
+
+    calculator = LabourHoursCalculator(load_productivity(Path(args.productivity)),
+                                       load_condition_factors(Path(args.condition_factors)))
+    if args.bench:
+        benchmark(calculator, args.bench)
+        return 0
+    if not args.items:
+        parser.error('an items file (or --bench) is required')
+
+    if args.items == '-':
+        items = json.load(sys.stdin)
+    else:
+        with open(args.items, 'r', encoding='utf-8') as f:
+            items = json.load(f)
+    json.dump(calculator.calculate_rows(items), sys.stdout, indent=2, ensure_ascii=False)
+    print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,15 +6,17 @@ Transform 777 seed rates to use resource_id links instead of inline values.
 import json
 import os
 import re
+from collections import Counter
 from datetime import datetime
 
+from resource_catalogue import ResourceCatalogue
+
 # Paths
 BASE_DIR = r'C:\dev\contech\temp-contechdata\contechdata-rates'
 INTL_DIR = r'C:\dev\contech\temp-contechdata\international\au'
 RATES_DIR = os.path.join(BASE_DIR, 'au', 'seed-data', 'composite_rates')
 OUTPUT_DIR = os.path.join(BASE_DIR, 'workspace', 'au', 'metadata', 'validations')
-
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+REVERSE_INDEX_PATH = os.path.join(BASE_DIR, 'au', 'seed-data', 'resource_dependents_index.json')
 
 # =============================================================================
 # LOAD RESOURCE LIBRARIES
@@ -28,21 +30,8 @@ def load_labour_resources():
     return {r['resource_id']: r for r in data['rates']}
 
 def load_material_resources():
-    """Load material resource IDs from individual files"""
-    resources = {}
-    res_dir = os.path.join(INTL_DIR, 'resources')
-    for f in os.listdir(res_dir):
-        if f.startswith('MAT_AU_') and f.endswith('.json'):
-            path = os.path.join(res_dir, f)
-            try:
-                with open(path, 'r', encoding='utf-8') as fp:
-                    data = json.load(fp)
-                    # Get resource_id from filename or data
-                    res_id = f.replace('.json', '')
-                    resources[res_id] = data
-            except:
-                pass
-    return resources
+    """Open the lazy material resource catalogue (MAT_AU_*.json)"""
+    return ResourceCatalogue(os.path.join(INTL_DIR, 'resources'), prefix='MAT_AU_')
 
 def get_plant_resources():
     """Define plant resource IDs based on plant mapping CSV"""
@@ -66,6 +55,69 @@ def get_plant_resources():
         'PLT_AU_SKIP_BIN': {'name': 'Skip Bin', 'rate': 150},
     }
 
+# =============================================================================
+# PATTERN BANK
+# =============================================================================
+
+class PatternBank:
+    """
+    Ordered (pattern, resource_id) list compiled into one alternation regex.
+
+    Each pattern becomes a named group inside a lookahead, so a single scan
+    reports the highest-priority pattern matching at every position; the
+    lowest-index hit overall is the first pattern that matches anywhere,
+    exactly as testing the patterns one by one with re.search. Detections
+    are memoised per normalised description and every detection bumps a
+    per-pattern hit counter.
+    """
+
+    def __init__(self, name, patterns):
+        self.name = name
+        self.patterns = list(patterns)
+        self._groups = {f'{resource_id}__{i}': i for i, (_, resource_id) in enumerate(self.patterns)}
+        alternation = '|'.join(
+            f'(?P<{group}>{self.patterns[i][0]})' for group, i in self._groups.items()
+        )
+        self._regex = re.compile(f'(?=(?:{alternation}))') if self.patterns else None
+        self._cache = {}
+        self.hits = Counter()
+        self.misses = 0
+
+    @staticmethod
+    def normalise(description):
+        return description.lower().strip()
+
+    def _first_index(self, text):
+        best = None
+        if self._regex is not None:
+            groups = self._groups
+            for m in self._regex.finditer(text):
+                i = groups[m.lastgroup]
+                if best is None or i < best:
+                    best = i
+                    if best == 0:
+                        break
+        return best
+
+    def detect(self, description):
+        """Return the resource_id of the first matching pattern, or None."""
+        text = self.normalise(description)
+        if text in self._cache:
+            index = self._cache[text]
+        else:
+            index = self._first_index(text)
+            self._cache[text] = index
+
+        if index is None:
+            self.misses += 1
+            return None
+        self.hits[index] += 1
+        return self.patterns[index][1]
+
+    def hit_counts(self):
+        """Return [(pattern, resource_id, hits)] in pattern order."""
+        return [(pattern, resource_id, self.hits[i]) for i, (pattern, resource_id) in enumerate(self.patterns)]
+
 # =============================================================================
 # TRADE DETECTION
 # =============================================================================
@@ -95,13 +147,13 @@ TRADE_KEYWORDS = [
     (r'excavat|dig|trench|earth', 'LAB_AU_CIVIL'),
 ]
 
+TRADE_BANK = PatternBank('Trade', TRADE_KEYWORDS)
+
 def detect_trade(description, nrm1_code=None):
     """Detect trade from description keywords"""
-    desc_lower = description.lower()
-
-    for pattern, trade in TRADE_KEYWORDS:
-        if re.search(pattern, desc_lower):
-            return trade
+    trade = TRADE_BANK.detect(description)
+    if trade:
+        return trade
 
     # Fallback based on NRM1 group
     if nrm1_code:
@@ -178,59 +230,64 @@ PLANT_KEYWORDS = [
     (r'skip|bin|waste', 'PLT_AU_SKIP_BIN'),
 ]
 
+PLANT_BANK = PatternBank('Plant', PLANT_KEYWORDS)
+
 def detect_plant(description):
     """Detect required plant from description"""
-    desc_lower = description.lower()
-
-    for pattern, plant in PLANT_KEYWORDS:
-        if re.search(pattern, desc_lower):
-            return plant
-
-    return None
+    return PLANT_BANK.detect(description)
 
 # =============================================================================
 # MATERIAL MAPPING
 # =============================================================================
 
+MATERIAL_PATTERNS = [
+    (r'brick', 'MAT_AU_BRICKS'),
+    (r'concrete|cement', 'MAT_AU_CONCRETE'),
+    (r'plasterboard|gyprock|drywall', 'MAT_AU_PLASTERBOARD'),
+    (r'timber|frame|stud', 'MAT_AU_FRAMING'),
+    (r'tile', 'MAT_AU_FLOOR_TILES'),
+    (r'carpet', 'MAT_AU_CARPET'),
+    (r'paint', 'MAT_AU_PAINT'),
+    (r'insul|batt', 'MAT_AU_ACOUSTIC_BATTS'),
+    (r'membrane|waterproof', 'MAT_AU_WATERPROOF_MEMBRANE'),
+    (r'door', 'MAT_AU_DOOR'),
+    (r'window', 'MAT_AU_WINDOW'),
+    (r'pipe|drain', 'MAT_AU_DRAINAGE'),
+    (r'cable|wire', 'MAT_AU_ELEC_CABLE'),
+    (r'conduit', 'MAT_AU_CONDUIT'),
+    (r'flashin', 'MAT_AU_FLASHINGS'),
+    (r'cornice', 'MAT_AU_CORNICE'),
+    (r'cladding', 'MAT_AU_CLADDING'),
+    (r'fence', 'MAT_AU_FENCE'),
+    (r'decking', 'MAT_AU_DECKING'),
+    (r'basin|sink', 'MAT_AU_BASIN'),
+    (r'bath|tub', 'MAT_AU_BATH'),
+]
+
+# Material banks keyed by the set of available resource IDs
+_material_banks = {}
+
+def get_material_bank(material_resources):
+    """
+    Return the material pattern bank for the available resources.
+
+    Patterns whose resource is not in the library can never be returned, so
+    they are left out of the bank; the first remaining match is the result.
+    """
+    available = tuple(mat_id for _, mat_id in MATERIAL_PATTERNS if mat_id in material_resources)
+    bank = _material_banks.get(available)
+    if bank is None:
+        available_ids = set(available)
+        bank = PatternBank('Material', [(p, m) for p, m in MATERIAL_PATTERNS if m in available_ids])
+        _material_banks[available] = bank
+    return bank
+
 def find_material_match(description, nrm2_codes, material_resources):
     """
     Try to match material description to a resource_id.
     Returns resource_id if found, None otherwise.
     """
-    desc_lower = description.lower()
-
-    # Check for specific materials
-    material_patterns = [
-        (r'brick', 'MAT_AU_BRICKS'),
-        (r'concrete|cement', 'MAT_AU_CONCRETE'),
-        (r'plasterboard|gyprock|drywall', 'MAT_AU_PLASTERBOARD'),
-        (r'timber|frame|stud', 'MAT_AU_FRAMING'),
-        (r'tile', 'MAT_AU_FLOOR_TILES'),
-        (r'carpet', 'MAT_AU_CARPET'),
-        (r'paint', 'MAT_AU_PAINT'),
-        (r'insul|batt', 'MAT_AU_ACOUSTIC_BATTS'),
-        (r'membrane|waterproof', 'MAT_AU_WATERPROOF_MEMBRANE'),
-        (r'door', 'MAT_AU_DOOR'),
-        (r'window', 'MAT_AU_WINDOW'),
-        (r'pipe|drain', 'MAT_AU_DRAINAGE'),
-        (r'cable|wire', 'MAT_AU_ELEC_CABLE'),
-        (r'conduit', 'MAT_AU_CONDUIT'),
-        (r'flashin', 'MAT_AU_FLASHINGS'),
-        (r'cornice', 'MAT_AU_CORNICE'),
-        (r'cladding', 'MAT_AU_CLADDING'),
-        (r'fence', 'MAT_AU_FENCE'),
-        (r'decking', 'MAT_AU_DECKING'),
-        (r'basin|sink', 'MAT_AU_BASIN'),
-        (r'bath|tub', 'MAT_AU_BATH'),
-    ]
-
-    for pattern, mat_id in material_patterns:
-        if re.search(pattern, desc_lower):
-            # Check if resource exists
-            if mat_id in material_resources:
-                return mat_id
-
-    return None
+    return get_material_bank(material_resources).detect(description)
 
 # =============================================================================
 # TRANSFORM RATE
@@ -321,21 +378,126 @@ def transform_rate(rate, labour_resources, material_resources, plant_resources):
 
     return new_rate
 
+# =============================================================================
+# REVERSE DEPENDENCY INDEX
+# =============================================================================
+
+class ReverseIndex:
+    """
+    Map each resource_id to the composites and component slots using it.
+
+    Stored next to composite_rates_index.json so a single price change can
+    be re-priced by touching only the composites and group files it affects.
+    """
+
+    def __init__(self):
+        self.dependents = {}
+        self.files = {}
+
+    def add_rate(self, group_file, rate):
+        code = rate.get('code')
+        self.files[code] = group_file
+        for slot, items in rate.get('components', {}).items():
+            for i, item in enumerate(items):
+                resource_id = item.get('resource_id')
+                if resource_id:
+                    self.dependents.setdefault(resource_id, []).append([code, slot, i])
+
+    def affected(self, resource_ids):
+        """Return {group_file: set(codes)} of composites using any of resource_ids."""
+        by_file = {}
+        for resource_id in resource_ids:
+            for code, _, _ in self.dependents.get(resource_id, []):
+                by_file.setdefault(self.files[code], set()).add(code)
+        return by_file
+
+    @classmethod
+    def from_rates_dir(cls, rates_dir):
+        index = cls()
+        for group_file in sorted(f for f in os.listdir(rates_dir) if f.startswith('group_') and f.endswith('.json')):
+            with open(os.path.join(rates_dir, group_file), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for rate in data.get('rates', []):
+                index.add_rate(group_file, rate)
+        return index
+
+    def write(self, path):
+        """
+        Write the index to path unless it already holds the same content.
+
+        ``meta.generated`` records when the content last changed, so
+        re-running over an unchanged library leaves the file untouched.
+        Returns True when the file was written.
+        """
+        data = {
+            'meta': {
+                'generated': datetime.now().strftime('%Y-%m-%d'),
+                'composites': len(self.files),
+                'resources': len(self.dependents),
+            },
+            'files': self.files,
+            'dependents': dict(sorted(self.dependents.items())),
+        }
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                existing = json.load(f)
+        except (OSError, ValueError):
+            existing = None
+        if existing is not None:
+            existing.get('meta', {}).pop('generated', None)
+            current = dict(data, meta={k: v for k, v in data['meta'].items() if k != 'generated'})
+            if existing == current:
+                return False
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return True
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index = cls()
+        index.files = data['files']
+        index.dependents = data['dependents']
+        return index
+
 # =============================================================================
 # MAIN EXECUTION
 # =============================================================================
 
+def resource_error_rows(material_resources):
+    """
+    Markdown list of resource files that could not be read or parsed.
+
+    Only the records that rates were actually linked to are read.
+    """
+    for _, resource_id, hits in get_material_bank(material_resources).hit_counts():
+        if hits:
+            material_resources.get(resource_id)
+    return ''.join(f"- {e['resource_id']}: {e['error']}\n" for e in material_resources.errors)
+
+def pattern_hit_rows(material_resources):
+    """Markdown table rows with per-pattern hit counters for tuning."""
+    rows = ''
+    for bank in (TRADE_BANK, PLANT_BANK, get_material_bank(material_resources)):
+        for pattern, resource_id, hits in bank.hit_counts():
+            rows += f"| {bank.name} | `{pattern}` | {resource_id} | {hits} |\n"
+        rows += f"| {bank.name} | (no match) | - | {bank.misses} |\n"
+    return rows
+
 def main():
     print("Wave 6: Resource Library Linking")
     print("=" * 50)
 
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
     # Load resources
     print("\nLoading resource libraries...")
     labour_resources = load_labour_resources()
     print(f"  Labour: {len(labour_resources)} resources")
 
     material_resources = load_material_resources()
-    print(f"  Materials: {len(material_resources)} resources")
+    print(f"  Materials: {len(material_resources)} resources (manifest from {material_resources.manifest_source})")
 
     plant_resources = get_plant_resources()
     print(f"  Plant: {len(plant_resources)} resources")
@@ -349,6 +511,9 @@ def main():
         'by_group': {}
     }
 
+    # Reverse dependency index, built as rates are linked
+    reverse_index = ReverseIndex()
+
     # Process each group file
     group_files = sorted([f for f in os.listdir(RATES_DIR) if f.startswith('group_') and f.endswith('.json')])
 
@@ -370,6 +535,7 @@ def main():
         for rate in data.get('rates', []):
             new_rate = transform_rate(rate, labour_resources, material_resources, plant_resources)
             new_rates.append(new_rate)
+            reverse_index.add_rate(group_file, new_rate)
 
             # Count stats
             group_stats['count'] += 1
@@ -400,6 +566,11 @@ def main():
         stats['plant_linked'] += group_stats['plant_linked']
         stats['by_group'][group_file] = group_stats
 
+    if reverse_index.write(REVERSE_INDEX_PATH):
+        print(f"\nReverse index written to: {REVERSE_INDEX_PATH} ({len(reverse_index.dependents)} resources)")
+    else:
+        print(f"\nReverse index unchanged: {REVERSE_INDEX_PATH}")
+
     # Generate QA report
     print("\n" + "=" * 50)
     print("Generating QA report...")
@@ -458,6 +629,15 @@ The following keyword patterns were used to detect trades:
 | hvac, air con | LAB_AU_HVAC |
 | default | LAB_AU_TRADES |
 
+## Resource Load Errors
+
+{resource_error_rows(material_resources) or 'None'}
+
+## Pattern Hit Counts
+
+| Bank | Pattern | Resource ID | Hits |
+|------|---------|-------------|------|
+{pattern_hit_rows(material_resources)}
 ## Notes
 
 - Labour: All rates have at least one linked labour resource
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Parametric quantity derivation from the quantity_heuristics export.
+
+quantity_heuristics-20260103-v3.csv holds one heuristic per key: INPUT
+keys (GFA_TOTAL, STOREYS, BEDROOM_COUNT, ...), numeric constants, and
+arithmetic expressions over other keys such as
+
+    PERIMETER = sqrt(FOOTPRINT_AREA * 4) * SHAPE_FACTOR
+
+Expressions are parsed once into Python ASTs restricted to arithmetic and
+a few functions (sqrt, ceil, floor, max, min, abs, round) and evaluated in
+dependency order over numpy arrays, so one evaluation derives the
+quantities of every variant in a sweep. LOOKUP, enum and range
+classification rows are not quantities and are skipped. WIND_FACTOR and
+DENSITY_FACTOR resolve to FRAME_WIND_FACTOR_<wind class> and
+DENSITY_FACTOR_<partition density>.
+
+Template specifications map to the INPUT keys (SPEC_INPUTS) and results
+to the build sets' derived_base_quantities (BASE_QUANTITIES). To price a
+variant, each scope item of the template's build set is tied to the base
+quantity its ``derivation`` starts from, and is scaled by
+heuristic(variant) / heuristic(build set). A build set's own
+specification therefore reproduces its quantities exactly:
+
+    python quantity_engine.py derive au-res-3bed-house-150
+    python quantity_engine.py sweep au-res-3bed-house-150 --gfa 100 300 25 --storeys 1 2 --region NT
+    python quantity_engine.py --bench 10000
+"""
+import argparse
+import ast
+import csv
+import math
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from costing_kernel import py_round
+from estimate_search import repair_text
+from template_estimates import (ALLOWANCE_UNITS, BUILD_SETS_FILE, MEASURED_UNITS, RATES_DIR, TEMPLATE_MATRIX,
+                                UNRESOLVED, TemplateExpander)
+
+BASE_DIR = Path(__file__).parent.parent
+HEURISTICS_CSV = BASE_DIR / 'heuristics-source' / 'supabase-exports' / 'quantity_heuristics-20260103-v3.csv'
+
+# Template specification field -> heuristic INPUT key
+SPEC_INPUTS = {
+    'gfa_m2': 'GFA_TOTAL',
+    'storeys': 'STOREYS',
+    'bedrooms': 'BEDROOM_COUNT',
+    'bathrooms': 'BATHROOM_COUNT',
+    'ensuites': 'ENSUITE_COUNT',
+    'ceiling_height_m': 'CEILING_HEIGHT_HAB',
+}
+# Used when neither the specification nor the export gives a value
+INPUT_DEFAULTS = {'STOREYS': 1.0, 'BEDROOM_COUNT': 0.0, 'BATHROOM_COUNT': 1.0, 'ENSUITE_COUNT': 0.0}
+
+# derived_base_quantities field -> heuristic key
+BASE_QUANTITIES = {
+    'perimeter_m': 'PERIMETER',
+    'wall_area_m2': 'EXTERNAL_WALL_AREA_GROSS',
+    'roof_area_m2': 'ROOF_AREA',
+    'window_area_m2': 'WINDOW_AREA_DEFAULT',
+    'ceiling_height_m': 'CEILING_HEIGHT_HAB',
+    'internal_partition_area_m2': 'INTERNAL_PARTITION_1SIDE',
+    'wet_area_m2': 'WATERPROOF_FLOOR_AREA',
+}
+
+# Scope item derivation prefixes -> heuristic key driving the quantity;
+# longer names first so Internal_Wall_Area is not read as Wall_Area
+DERIVATION_DRIVERS = (
+    ('internal_wall_area', 'INTERNAL_PARTITION_1SIDE'),
+    ('wall_area', 'EXTERNAL_WALL_AREA_GROSS'),
+    ('roof_area', 'ROOF_AREA'),
+    ('window_area', 'WINDOW_AREA_DEFAULT'),
+    ('wet_area', 'WATERPROOF_FLOOR_AREA'),
+    ('power_points', 'POWER_POINTS'),
+    ('light_points', 'LIGHT_POINTS'),
+    ('perimeter', 'PERIMETER'),
+    ('gfa', 'GFA_TOTAL'),
+)
+
+_FUNCTIONS = {
+    'sqrt': np.sqrt,
+    'ceil': np.ceil,
+    'floor': np.floor,
+    'abs': np.abs,
+    'round': np.round,
+    'max': lambda *args: np.maximum.reduce(np.broadcast_arrays(*args)),
+    'min': lambda *args: np.minimum.reduce(np.broadcast_arrays(*args)),
+}
+_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load, ast.Constant,
+          ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd)
+
+
+def load_heuristics(path: Path = HEURISTICS_CSV) -> List[Dict]:
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return [dict(row, unit=repair_text(row.get('unit') or ''))
+                for row in csv.DictReader(f) if row.get('is_active', 'True') != 'False']
+
+
+def compile_expression(expression: str) -> Optional[Tuple[object, Set[str]]]:
+    """(code, referenced keys) for an arithmetic expression, None otherwise."""
+    try:
+        tree = ast.parse(expression.strip(), mode='eval')
+    except SyntaxError:
+        return None
+    names = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _NODES):
+            return None
+        if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name) and node.func.id in _FUNCTIONS):
+            return None
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            return None
+        if isinstance(node, ast.Name) and node.id not in _FUNCTIONS:
+            names.add(node.id)
+    return compile(tree, '<heuristic>', 'eval'), names
+
+
+# =============================================================================
+# MODEL
+# =============================================================================
+
+class QuantityModel:
+    """Heuristic expressions compiled and ordered for array evaluation."""
+
+    def __init__(self, heuristics: Sequence[Mapping]):
+        self.units: Dict[str, str] = {}
+        self.inputs: List[str] = []
+        self.constants: Dict[str, float] = {}
+        self.enums: Dict[str, str] = {}
+        self.skipped: List[str] = []
+        expressions: Dict[str, Tuple[object, Set[str]]] = {}
+
+        for row in heuristics:
+            key, expression = row['key'], (row.get('expression') or '').strip()
+            self.units[key] = row.get('unit', '')
+            if expression == 'INPUT':
+                self.inputs.append(key)
+                continue
+            if self.units[key] == 'enum':
+                self.enums[key] = expression
+                continue
+            compiled = compile_expression(expression)
+            if compiled is None:
+                self.skipped.append(key)
+            elif compiled[1]:
+                expressions[key] = compiled
+            else:
+                self.constants[key] = float(eval(compiled[0], {'__builtins__': {}}, _FUNCTIONS))
+
+        self.order = self._order(expressions)
+        self.expressions = expressions
+        self.default_wind_class = self.enums.get('WIND_CLASS', self.enums.get('WIND_CLASS_DEFAULT', 'N2'))
+
+    def _order(self, expressions: Mapping[str, Tuple[object, Set[str]]]) -> List[str]:
+        """Expression keys in dependency order; cycles raise ValueError."""
+        order, state = [], {}
+
+        def visit(key, path):
+            if state.get(key) == 'done' or key not in expressions:
+                return
+            if state.get(key) == 'active':
+                raise ValueError(f'Cyclic heuristics: {" -> ".join(path + [key])}')
+            state[key] = 'active'
+            for name in sorted(expressions[key][1]):
+                visit(name, path + [key])
+            state[key] = 'done'
+            order.append(key)
+
+        for key in expressions:
+            visit(key, [])
+        return order
+
+    def evaluate(self, inputs: Mapping[str, np.ndarray], wind_class: Sequence[str] = None,
+                 density: Sequence[str] = None) -> Dict[str, np.ndarray]:
+        """
+        Every derivable key for a batch of variants. inputs maps INPUT keys
+        to arrays of one value per variant; wind_class and density are per
+        variant labels (default: the exported WIND_CLASS and TYPICAL).
+        """
+        size = len(next(iter(inputs.values()))) if inputs else 1
+        values: Dict[str, np.ndarray] = {k: np.full(size, v) for k, v in self.constants.items()}
+        for key in self.inputs:
+            if key in inputs:
+                values[key] = np.asarray(inputs[key], dtype=float)
+            elif key in INPUT_DEFAULTS:
+                values[key] = np.full(size, INPUT_DEFAULTS[key])
+        for key, value in inputs.items():
+            values.setdefault(key, np.asarray(value, dtype=float))
+        for key, default in INPUT_DEFAULTS.items():
+            values.setdefault(key, np.full(size, default))
+
+        wind_class = wind_class or [self.default_wind_class] * size
+        values['WIND_FACTOR'] = self._choose('FRAME_WIND_FACTOR', wind_class)
+        values['DENSITY_FACTOR'] = self._choose('DENSITY_FACTOR', density or ['TYPICAL'] * size)
+
+        for key in self.order:
+            code, names = self.expressions[key]
+            if names <= values.keys():
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    values[key] = np.broadcast_to(eval(code, {'__builtins__': {}}, {**_FUNCTIONS, **values}),
+                                                  (size,)).astype(float)
+        return values
+
+    def _choose(self, prefix: str, labels: Sequence[str]) -> np.ndarray:
+        labels = [str(label).upper() for label in labels]
+        unknown = {label for label in labels if f'{prefix}_{label}' not in self.constants}
+        if unknown:
+            raise KeyError(f'No {prefix} for: {", ".join(sorted(unknown))}')
+        return np.array([self.constants[f'{prefix}_{label}'] for label in labels], dtype=float)
+
+    def spec_inputs(self, specs: Sequence[Mapping]) -> Dict[str, np.ndarray]:
+        """INPUT arrays for template specifications (missing fields use defaults)."""
+        inputs = {}
+        for field, key in SPEC_INPUTS.items():
+            default = self.constants.get(key, INPUT_DEFAULTS.get(key, np.nan))
+            inputs[key] = np.array([spec.get(field) if spec.get(field) is not None else default for spec in specs],
+                                   dtype=float)
+        return inputs
+
+    def derive(self, specs: Sequence[Mapping]) -> Dict[str, np.ndarray]:
+        return self.evaluate(self.spec_inputs(specs),
+                             [spec.get('wind_class') or self.default_wind_class for spec in specs])
+
+    def base_quantities(self, spec: Mapping) -> Dict[str, float]:
+        """derived_base_quantities for one specification."""
+        values = self.derive([spec])
+        return {field: round(float(values[key][0]), 2) for field, key in BASE_QUANTITIES.items() if key in values}
+
+
+# =============================================================================
+# PRICING
+# =============================================================================
+
+def derivation_driver(derivation: Optional[str]) -> Optional[str]:
+    """Heuristic key a scope item's quantity is derived from, if any."""
+    text = (derivation or '').lower()
+    match = re.match(r'[\s(]*([a-z_]+)', text)
+    if not match:
+        return None
+    for prefix, key in DERIVATION_DRIVERS:
+        if match.group(1).startswith(prefix):
+            return key
+    return None
+
+
+class ParametricPricer:
+    """Price specification variants of a template from its build set scope."""
+
+    def __init__(self, expander: TemplateExpander, model: QuantityModel, template_id: str):
+        self.expander = expander
+        self.model = model
+        self.template = expander.templates.get(template_id)
+        if self.template is None:
+            raise KeyError(f'Unknown template: {template_id}')
+        self.build_set, _ = expander.build_set_for(self.template)
+        if self.build_set is None:
+            raise KeyError(f'No build set for template: {template_id}')
+
+        items = self.build_set['scope_items']
+        resolved = [expander.resolve_item(item) for item in items]
+        self.lines = [line for _, line in resolved]
+        self.units = [line['unit'] for line in self.lines]
+        self.rows = np.array([row for row, _ in resolved], dtype=np.int64)
+        self.quantities = np.array([line['qty'] for line in self.lines], dtype=float)
+        self.unresolved = [line for line in self.lines if line['status'] == UNRESOLVED]
+        self.drivers = [derivation_driver(item.get('derivation')) for item in items]
+        self.measured = np.array([u in MEASURED_UNITS for u in self.units])
+        self.fixed = np.array([u in ALLOWANCE_UNITS or d is None for u, d in zip(self.units, self.drivers)])
+
+        spec = dict(self.build_set['specifications'],
+                    ceiling_height_m=self.build_set.get('derived_base_quantities', {}).get('ceiling_height_m'))
+        self.base_spec = spec
+        self.base_values = model.derive([spec])
+
+    def variant_specs(self, **sweeps: Sequence) -> List[Dict]:
+        """Cartesian product of swept specification fields over the template's own."""
+        fields = list(sweeps)
+        grids = np.meshgrid(*[np.asarray(sweeps[f]) for f in fields], indexing='ij') if fields else []
+        size = grids[0].size if fields else 1
+        base = self.template.get('specifications', {})
+        return [dict(base, **{f: grids[k].flat[i].item() for k, f in enumerate(fields)}) for i in range(size)]
+
+    def quantity_matrix(self, specs: Sequence[Mapping]) -> np.ndarray:
+        """(variants x scope items) quantities."""
+        values = self.model.derive(specs)
+        ratios = np.ones((len(specs), len(self.drivers)))
+        for j, driver in enumerate(self.drivers):
+            if not self.fixed[j] and driver in values and driver in self.base_values:
+                base = self.base_values[driver][0]
+                ratios[:, j] = values[driver] / base if base else 1.0
+        raw = self.quantities[None, :] * ratios
+        counts = np.maximum(1.0, np.round(raw))
+        return np.where(self.fixed, self.quantities, np.where(self.measured, py_round(raw, 2), counts))
+
+    def price(self, specs: Sequence[Mapping], region: str) -> Dict[str, np.ndarray]:
+        """
+        Per-variant priced totals (and the quantity matrix) in region. The
+        totals are complete only when ``unresolved`` is empty.
+        """
+        record = self.expander.regions[region]
+        rates = np.where(self.rows >= 0, self.expander.region_rates(self.rows, [record])[:, 0], 0.0)
+        quantities = self.quantity_matrix(specs)
+        amounts = py_round(quantities * rates[None, :], 2)
+        return {'priced_total': amounts.sum(axis=1), 'quantities': quantities, 'unresolved': self.unresolved}
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def _range(values: Optional[Sequence[float]]) -> Optional[np.ndarray]:
+    if not values:
+        return None
+    if len(values) == 3:
+        start, stop, step = values
+        return np.arange(start, stop + step / 2, step)
+    return np.asarray(values, dtype=float)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parametric quantities from the quantity heuristics export')
+    parser.add_argument('command', nargs='?', choices=('derive', 'sweep'))
+    parser.add_argument('template', nargs='?', help='Template id')
+    parser.add_argument('--gfa', type=float, nargs='+', metavar='M2',
+                        help='GFA values, or START STOP STEP, for "sweep"')
+    parser.add_argument('--storeys', type=float, nargs='+', help='Storey counts for "sweep"')
+    parser.add_argument('--bedrooms', type=float, nargs='+', help='Bedroom counts for "sweep"')
+    parser.add_argument('--region', help='Region code or name (default: baseline)')
+    parser.add_argument('--heuristics', default=str(HEURISTICS_CSV), help='quantity_heuristics CSV export')
+    parser.add_argument('--templates', default=str(TEMPLATE_MATRIX), help='template-matrix.json path')
+    parser.add_argument('--build-sets', default=str(BUILD_SETS_FILE), help='Build sets JSON path')
+    parser.add_argument('--rates-dir', default=str(RATES_DIR),
+                        help='Directory holding group_*.json composite files')
+    parser.add_argument('--bench', type=int, metavar='N', help='Benchmark deriving and pricing N variants')
+    args = parser.parse_intermixed_args()
+
+    model = QuantityModel(load_heuristics(Path(args.heuristics)))
+    expander = TemplateExpander.from_files(Path(args.templates), Path(args.build_sets), Path(args.rates_dir))
+    region = args.region or expander.regions.baseline['code']
+
+    if args.bench:
+        pricer = ParametricPricer(expander, model, args.template or 'au-res-3bed-house-150')
+        side = int(math.ceil(math.sqrt(args.bench)))
+        specs = pricer.variant_specs(gfa_m2=np.linspace(80, 400, side), storeys=np.linspace(1, 3, side).round())
+        specs = specs[:args.bench]
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            totals = pricer.price(specs, region)['priced_total']
+            timings.append(time.perf_counter() - start)
+        elapsed = float(np.median(timings))
+        print(f"{len(specs)} variants derived and priced in {elapsed * 1000:.1f} ms "
+              f"({len(specs) / elapsed:,.0f} variants/s); totals {totals.min():,.0f} - {totals.max():,.0f}")
+        return 0
+    if not args.command or not args.template:
+        parser.error('give a command and a template id, or --bench')
+
+    try:
+        if args.command == 'derive':
+            template = expander.templates.get(args.template)
+            if template is None:
+                raise KeyError(f'Unknown template: {args.template}')
+            derived = model.base_quantities(template.get('specifications', {}))
+            build_set, _ = expander.build_set_for(template)
+            hard_coded = (build_set or {}).get('derived_base_quantities', {})
+            print(f"{args.template}" + (f" (build set {build_set['template_id']})" if build_set else ''))
+            for field, value in derived.items():
+                reference = f"  build set {hard_coded[field]:g}" if field in hard_coded else ''
+                print(f"  {field:<28} {value:>10,.2f}{reference}")
+            return 0
+
+        pricer = ParametricPricer(expander, model, args.template)
+        sweeps = {field: values for field, values in (('gfa_m2', _range(args.gfa)), ('storeys', _range(args.storeys)),
+                                                      ('bedrooms', _range(args.bedrooms))) if values is not None}
+        specs = pricer.variant_specs(**sweeps)
+        start = time.perf_counter()
+        totals = pricer.price(specs, region)['priced_total']
+        elapsed = time.perf_counter() - start
+        for spec, total in zip(specs, totals):
+            label = '  '.join(f"{field}={spec[field]:g}" for field in sweeps)
+            print(f"  {label:<40} {total:>14,.2f}  ({total / spec['gfa_m2']:,.0f}/m²)")
+        print(f"{len(specs)} variants in {elapsed * 1000:.2f} ms ({region})")
+        if pricer.unresolved:
+            print(f"Priced totals exclude {len(pricer.unresolved)} unresolved scope items: "
+                  + '; '.join(line['description'] for line in pricer.unresolved))
+        return 0
+    except KeyError as e:
+        print(f"ERROR: {e.args[0]}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""Compiled keyword classifier for composite rate heuristics.
+
+All keyword tables used by generate_rates.py (trade/gang, labour hours,
+material and plant allowances) are compiled once into a single regex.
+Each description is lowercased and scanned once; the resulting keyword
+hit set is resolved against every table with the original first-match
+precedence.
+"""
+import re
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+# =============================================================================
+# RULE TABLES (order matters - first matching rule wins)
+# =============================================================================
+
+# (keywords, (trade, gang, gang_rate))
+TRADE_RULES = [
+    (['electric', 'power', 'light', 'cable', 'socket', 'switch', 'wiring', 'circuit'], ('Electrician', '1+0', 84.0)),
+    (['plumb', 'pipe', 'drain', 'water', 'sanitary', 'tap', 'valve', 'toilet', 'basin'], ('Plumber', '1+0.5', 92.0)),
+    (['hvac', 'ventil', 'air con', 'duct', 'heating', 'cooling', 'extract'], ('HVAC', '1+1', 95.0)),
+    (['brick', 'block', 'masonry', 'render', 'mortar'], ('Bricklayer', '1+1', 95.0)),
+    (['timber', 'wood', 'frame', 'joinery', 'door', 'window', 'stair', 'rail'], ('Carpenter', '1+0.5', 82.5)),
+    (['roof', 'tile', 'gutter', 'flashing'], ('Roofer', '1+1', 95.0)),
+    (['plaster', 'render', 'skim', 'ceiling'], ('Plasterer', '1+0.5', 82.5)),
+    (['tile', 'ceramic', 'porcelain', 'mosaic'], ('Tiler', '1+0.5', 82.5)),
+    (['paint', 'decor', 'coating', 'finish'], ('Painter', '1+0', 66.0)),
+    (['concrete', 'excavat', 'foundation', 'footing', 'slab'], ('Labourer', '0+2', 110.0)),
+    (['demol', 'asbestos', 'hazard', 'remov'], ('Specialist', '1+1', 95.0)),
+]
+
+# Fallback trade by NRM group when no keyword matches
+TRADE_DEFAULTS = {
+    0: ('Specialist', '1+1', 95.0),    # Facilitating
+    1: ('Labourer', '0+2', 110.0),     # Substructure
+    5: ('Tradesperson', '1+0', 75.0),  # Services
+}
+TRADE_FALLBACK = ('General', '1+0.5', 82.5)
+
+COMPLEXITY_KEYWORDS = ['complex', 'ornate', 'special', 'bespoke']
+COMPLEXITY_MULTIPLIER = 1.5
+
+# Labour hours per unit, by unit class
+AREA_HOURS_RULES = [
+    (['wall', 'brick', 'block', 'masonry'], 0.6),
+    (['tile', 'floor', 'ceil'], 0.35),
+    (['paint', 'coat'], 0.12),
+    (['roof', 'clad'], 0.25),
+]
+AREA_HOURS_DEFAULT = 0.3
+VOLUME_HOURS = 1.5
+LINEAR_HOURS_RULES = [
+    (['pipe', 'cable', 'duct'], 0.15),
+]
+LINEAR_HOURS_DEFAULT = 0.25
+EACH_HOURS_RULES = [
+    (['simple', 'small'], 0.5),
+    (['large', 'complex'], 3.0),
+]
+EACH_HOURS_DEFAULT = 1.0
+OTHER_HOURS = 0.5
+
+# Material base cost per unit
+MATERIAL_RULES = [
+    (['marble', 'granite', 'stone', 'premium'], 150.0),
+    (['timber', 'hardwood'], 80.0),
+    (['steel', 'metal'], 60.0),
+    (['tile', 'porcelain'], 55.0),
+    (['brick', 'block'], 40.0),
+    (['concrete'], 35.0),
+    (['plaster', 'paint'], 15.0),
+    (['insulation'], 20.0),
+    (['electric', 'cable'], 25.0),
+    (['pipe', 'plumb'], 30.0),
+]
+MATERIAL_DEFAULT = 25.0
+MATERIAL_VOLUME_MULTIPLIER = 5
+MATERIAL_EACH_MULTIPLIER = 0.8
+
+# Plant base cost per unit
+PLANT_GROUPS = {0, 1, 8}  # Facilitating, Substructure, External
+PLANT_GROUP_COST = 15.0
+PLANT_RULES = [
+    (['excavat', 'demol', 'concrete'], 20.0),
+    (['scaffold', 'height', 'lift'], 10.0),
+    (['crane', 'hoist'], 25.0),
+]
+PLANT_DEFAULT = 3.0
+
+LINEAR_UNITS = {'m', 'lm'}
+EACH_UNITS_LABOUR = {'nr', 'ea', 'item', 'unit', 'leaf'}
+EACH_UNITS_MATERIAL = {'nr', 'ea', 'item', 'unit'}
+
+# Unit classes
+UNIT_AREA = 'area'
+UNIT_VOLUME = 'volume'
+UNIT_LINEAR = 'linear'
+UNIT_EACH = 'each'
+UNIT_OTHER = 'other'
+
+
+class RateFeatures(NamedTuple):
+    """Heuristic feature record for a single rate description."""
+    trade: str
+    gang: str
+    gang_rate: float
+    labour_hours: float
+    material_cost: float
+    plant_cost: float
+
+
+class KeywordScanner:
+    """
+    Find every keyword occurring as a substring of a text in one regex scan.
+
+    A longest-first alternation inside a lookahead reports the longest
+    keyword starting at every position. Any shorter keyword matching at the
+    same position is a prefix of it, so hits are expanded to prefixes.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        keywords = set(keywords)
+        ordered = sorted(keywords, key=lambda k: (-len(k), k))
+        self._pattern = re.compile('(?=(' + '|'.join(re.escape(k) for k in ordered) + '))')
+        self._prefixes: Dict[str, FrozenSet[str]] = {
+            kw: frozenset(k for k in keywords if kw.startswith(k)) for kw in keywords
+        }
+
+    def scan(self, text: str) -> FrozenSet[str]:
+        """Return every keyword that occurs in an already-lowercased text."""
+        hits = set()
+        prefixes = self._prefixes
+        for m in self._pattern.finditer(text):
+            hits |= prefixes[m.group(1)]
+        return frozenset(hits)
+
+
+def _compile_table(rules: Sequence[Tuple[List[str], object]]) -> Dict[str, int]:
+    """Map each keyword to the index of the first rule that lists it."""
+    index = {}
+    for i, (keywords, _) in enumerate(rules):
+        for kw in keywords:
+            index.setdefault(kw, i)
+    return index
+
+
+class RateClassifier:
+    """Single-pass keyword classifier for the generate_rates heuristics."""
+
+    TABLES = {
+        'trade': TRADE_RULES,
+        'complexity': [(COMPLEXITY_KEYWORDS, COMPLEXITY_MULTIPLIER)],
+        'area_hours': AREA_HOURS_RULES,
+        'linear_hours': LINEAR_HOURS_RULES,
+        'each_hours': EACH_HOURS_RULES,
+        'material': MATERIAL_RULES,
+        'plant': PLANT_RULES,
+    }
+
+    def __init__(self):
+        self._tables = {name: (rules, _compile_table(rules)) for name, rules in self.TABLES.items()}
+
+        self._scanner = KeywordScanner(
+            kw for rules in self.TABLES.values() for kws, _ in rules for kw in kws
+        )
+        self._unit_cache: Dict[Optional[str], Tuple[str, str]] = {}
+
+    def scan(self, description: str) -> FrozenSet[str]:
+        """Return every keyword that occurs as a substring of the description."""
+        return self._scanner.scan(description.lower())
+
+    def _first(self, table: str, hits: FrozenSet[str], default):
+        """Resolve the first matching rule of a table for a hit set."""
+        rules, index = self._tables[table]
+        best = None
+        for kw in hits:
+            i = index.get(kw)
+            if i is not None and (best is None or i < best):
+                best = i
+        return default if best is None else rules[best][1]
+
+    def _unit_class(self, unit: Optional[str]) -> Tuple[str, str]:
+        """Classify a unit for the labour and material heuristics."""
+        cached = self._unit_cache.get(unit)
+        if cached is not None:
+            return cached
+
+        unit_lower = unit.lower() if unit else 'm2'
+        if 'm2' in unit_lower or 'm²' in unit_lower:
+            labour = UNIT_AREA
+        elif 'm3' in unit_lower or 'm³' in unit_lower:
+            labour = UNIT_VOLUME
+        elif unit_lower in LINEAR_UNITS:
+            labour = UNIT_LINEAR
+        elif unit_lower in EACH_UNITS_LABOUR:
+            labour = UNIT_EACH
+        else:
+            labour = UNIT_OTHER
+
+        if 'm3' in unit_lower or 'm³' in unit_lower:
+            material = UNIT_VOLUME
+        elif unit_lower in EACH_UNITS_MATERIAL:
+            material = UNIT_EACH
+        else:
+            material = UNIT_OTHER
+
+        result = (labour, material)
+        self._unit_cache[unit] = result
+        return result
+
+    def classify_hits(self, hits: FrozenSet[str], unit: Optional[str], nrm_group: int) -> RateFeatures:
+        """Build a feature record from a precomputed keyword hit set."""
+        trade, gang, gang_rate = self._first(
+            'trade', hits, TRADE_DEFAULTS.get(nrm_group, TRADE_FALLBACK))
+
+        labour_class, material_class = self._unit_class(unit)
+        multiplier = self._first('complexity', hits, 1.0)
+        if labour_class == UNIT_AREA:
+            hours = self._first('area_hours', hits, AREA_HOURS_DEFAULT)
+        elif labour_class == UNIT_VOLUME:
+            hours = VOLUME_HOURS
+        elif labour_class == UNIT_LINEAR:
+            hours = self._first('linear_hours', hits, LINEAR_HOURS_DEFAULT)
+        elif labour_class == UNIT_EACH:
+            hours = self._first('each_hours', hits, EACH_HOURS_DEFAULT)
+        else:
+            hours = OTHER_HOURS
+
+        material = self._first('material', hits, MATERIAL_DEFAULT)
+        if material_class == UNIT_VOLUME:
+            material = material * MATERIAL_VOLUME_MULTIPLIER
+        elif material_class == UNIT_EACH:
+            material = material * MATERIAL_EACH_MULTIPLIER
+
+        if nrm_group in PLANT_GROUPS:
+            plant = PLANT_GROUP_COST
+        else:
+            plant = self._first('plant', hits, PLANT_DEFAULT)
+
+        return RateFeatures(trade, gang, gang_rate, hours * multiplier, material, plant)
+
+    def classify(self, description: str, unit: Optional[str], nrm_group: int) -> RateFeatures:
+        """Classify a single rate description."""
+        return self.classify_hits(self.scan(description), unit, nrm_group)
+
+    def classify_many(self, items: Iterable[Tuple[str, Optional[str], int]]) -> List[RateFeatures]:
+        """
+        Classify (description, unit, nrm_group) tuples in one pass.
+
+        Each distinct description is scanned once, and each distinct
+        (description, unit, nrm_group) combination is resolved once, so
+        region/spec-level variants of the same rate are effectively free.
+        """
+        hit_cache: Dict[str, FrozenSet[str]] = {}
+        result_cache: Dict[Tuple[str, Optional[str], int], RateFeatures] = {}
+        results = []
+        for item in items:
+            features = result_cache.get(item)
+            if features is None:
+                description, unit, nrm_group = item
+                hits = hit_cache.get(description)
+                if hits is None:
+                    hits = self.scan(description)
+                    hit_cache[description] = hits
+                features = self.classify_hits(hits, unit, nrm_group)
+                result_cache[item] = features
+            results.append(features)
+        return results
+
+
+_default_classifier: Optional[RateClassifier] = None
+
+
+def get_classifier() -> RateClassifier:
+    """Return the shared, lazily compiled classifier."""
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = RateClassifier()
+    return _default_classifier
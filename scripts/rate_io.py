@@ -0,0 +1,233 @@
+"""Streaming readers and writers for staging and composite rate files.
+
+The writers produce byte-for-byte the same layout as
+``json.dump(..., indent=2, ensure_ascii=False)`` of the full group/index
+documents, but only ever hold one rate in memory. Rates and codes are
+spooled to temporary files and stitched behind the header on close, since
+the header carries the final count. Nothing reaches the target path until
+``close()``; ``abort()`` discards the spooled data instead, so a failed
+run leaves existing files untouched.
+"""
+import io
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Iterator, Tuple
+
+CHUNK_SIZE = 64 * 1024
+_WHITESPACE = ' \t\r\n'
+
+
+def _dumps(value: Any, level: int) -> str:
+    """Serialise a value as json.dump(indent=2) would at a nesting level."""
+    text = json.dumps(value, indent=2, ensure_ascii=False)
+    return text.replace('\n', '\n' + '  ' * level)
+
+
+class _JSONStream:
+    """Incremental JSON tokenizer over a text file."""
+
+    def __init__(self, fp, chunk_size: int = CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _read(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._read():
+                raise ValueError('Unexpected end of JSON input')
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f'Expected {char!r} but found {found!r}')
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._read():
+                    raise
+                continue
+            # A scalar ending exactly at the buffer edge may be truncated
+            if end == len(self.buf) and self._read():
+                continue
+            self.pos = end
+            return obj
+
+
+def _iter_array_items(stream: _JSONStream, key: str) -> Iterator[Tuple[int, Any]]:
+    """Yield (buffer position, item) for a top-level object's array member."""
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        name = stream.value()
+        stream.expect(':')
+        if name == key:
+            stream.expect('[')
+            if stream.peek() == ']':
+                return
+            while True:
+                stream.peek()
+                yield stream.pos, stream.value()
+                if stream.peek() == ']':
+                    return
+                stream.expect(',')
+        stream.value()
+        if stream.peek() == '}':
+            return
+        stream.expect(',')
+
+
+def iter_json_array(path: str, key: str = 'rates') -> Iterator[Dict]:
+    """Yield items of a top-level object's array member one at a time."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for _, item in _iter_array_items(_JSONStream(f), key):
+            yield item
+
+
+def iter_json_array_spans(path: str, key: str = 'rates') -> Iterator[Tuple[int, int, Dict]]:
+    """
+    Yield (byte offset, byte length, item) for each item of an array member.
+
+    The file is decoded in one buffer so stream positions are absolute;
+    character positions are converted to UTF-8 byte offsets incrementally.
+    """
+    with open(path, 'rb') as f:
+        text = f.read().decode('utf-8')
+    stream = _JSONStream(io.StringIO(text), chunk_size=len(text) + 1)
+    char_pos = byte_pos = 0
+    for start, item in _iter_array_items(stream, key):
+        byte_pos += len(text[char_pos:start].encode('utf-8'))
+        length = len(text[start:stream.pos].encode('utf-8'))
+        yield byte_pos, length, item
+        char_pos = stream.pos
+        byte_pos += length
+
+
+def iter_staging_rates(path: str) -> Iterator[Dict]:
+    """Yield staging rates from a rate_descriptions.json or NDJSON file."""
+    if path.endswith(('.ndjson', '.jsonl')):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        yield from iter_json_array(path, 'rates')
+
+
+def _unlink(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class GroupFileWriter:
+    """Incrementally write a ``{"meta": ..., "rates": [...]}`` group file."""
+
+    def __init__(self, path: str, meta: Dict):
+        self.path = path
+        self.meta = dict(meta)
+        self.count = 0
+        self._body = tempfile.TemporaryFile('w+', encoding='utf-8')
+
+    def write(self, rate: Dict):
+        self._body.write(',\n    ' if self.count else '\n    ')
+        self._body.write(_dumps(rate, 2))
+        self.count += 1
+
+    def close(self):
+        """Write the final file with ``meta['count']`` set to the rate count."""
+        self.meta['count'] = self.count
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as out:
+            out.write('{\n  "meta": ' + _dumps(self.meta, 1) + ',\n  "rates": [')
+            if self.count:
+                self._body.seek(0)
+                shutil.copyfileobj(self._body, out)
+                out.write('\n  ]\n}')
+            else:
+                out.write(']\n}')
+        self._body.close()
+        os.replace(tmp_path, self.path)
+
+    def abort(self):
+        """Discard the spooled rates and any partial output; the target file is untouched."""
+        self._body.close()
+        _unlink(self.path + '.tmp')
+
+
+class IndexWriter:
+    """Accumulate composite_rates_index.json group entries on the fly."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.total = 0
+        self._groups: Dict[str, Dict] = {}
+        self._codes: Dict[str, Any] = {}
+
+    def add_group(self, key: str, name: str, filename: str):
+        self._groups[key] = {'name': name, 'file': filename, 'count': 0}
+        self._codes[key] = tempfile.TemporaryFile('w+', encoding='utf-8')
+
+    def add_code(self, key: str, code: str):
+        entry = self._groups[key]
+        codes = self._codes[key]
+        codes.write(',\n        ' if entry['count'] else '\n        ')
+        codes.write(_dumps(code, 4))
+        entry['count'] += 1
+        self.total += 1
+
+    def close(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as out:
+            out.write('{\n  "groups": {')
+            for i, (key, entry) in enumerate(self._groups.items()):
+                out.write(',\n    ' if i else '\n    ')
+                out.write(_dumps(key, 2) + ': {\n')
+                for field in ('name', 'file', 'count'):
+                    out.write(f'      "{field}": ' + _dumps(entry[field], 3) + ',\n')
+                out.write('      "codes": [')
+                codes = self._codes[key]
+                if entry['count']:
+                    codes.seek(0)
+                    shutil.copyfileobj(codes, out)
+                    out.write('\n      ]\n    }')
+                else:
+                    out.write(']\n    }')
+                codes.close()
+            out.write('\n  }' if self._groups else '}')
+            out.write(',\n  "total": ' + _dumps(self.total, 1) + '\n}')
+        os.replace(tmp_path, self.path)
+
+    def abort(self):
+        """Discard the spooled codes and any partial output; the target file is untouched."""
+        for codes in self._codes.values():
+            codes.close()
+        _unlink(self.path + '.tmp')
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Random-access composite rate lookup by code.
+
+composite_rates_index.json lists the codes in each group file. ``index``
+extends every group entry with the file size and a ``spans`` list of
+[byte offset, byte length] pairs, parallel to ``codes``, so a single rate can
+be read by seeking to its slice instead of parsing the whole group file:
+
+    python rate_lookup.py index                  # add/refresh spans
+    python rate_lookup.py get GRP5-... GRP2-...  # print rates as JSON
+
+Group files are rewritten by several pipeline steps after generation, so
+spans are refreshed with ``index`` once the library is final. A group whose
+size no longer matches its index entry (or has no spans yet) is re-scanned
+in memory on first use, so lookups stay correct on a stale index.
+"""
+import argparse
+import json
+import re
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rate_io import iter_json_array_spans
+
+BASE_DIR = Path(__file__).parent.parent
+RATES_DIR = BASE_DIR / 'au' / 'seed-data' / 'composite_rates'
+INDEX_FILE = BASE_DIR / 'au' / 'seed-data' / 'composite_rates_index.json'
+
+DEFAULT_CACHE_SIZE = 1024
+
+# A pretty-printed [offset, length] pair, collapsed onto one line on write
+_SPAN_RE = re.compile(r'\[\s+(\d+),\s+(\d+)\s+\]')
+
+
+def scan_group_spans(path: Path) -> Tuple[List[str], List[List[int]]]:
+    """Return (codes, [[offset, length], ...]) for the rates of a group file."""
+    codes = []
+    spans = []
+    for offset, length, rate in iter_json_array_spans(str(path), 'rates'):
+        codes.append(rate.get('code'))
+        spans.append([offset, length])
+    return codes, spans
+
+
+def index_spans(index_path: Path, rates_dir: Path) -> Dict:
+    """Refresh codes, counts, file sizes and spans of every indexed group."""
+    with open(index_path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+
+    total = 0
+    for entry in index['groups'].values():
+        path = Path(rates_dir) / entry['file']
+        codes, spans = scan_group_spans(path)
+        entry['count'] = len(codes)
+        entry['codes'] = codes
+        entry['size'] = path.stat().st_size
+        entry['spans'] = spans
+        total += len(codes)
+    index['total'] = total
+
+    with open(index_path, 'w', encoding='utf-8') as f:
+        f.write(dumps_index(index))
+    return index
+
+
+def dumps_index(index: Dict) -> str:
+    """Serialise the index as json.dump(indent=2) would, with one span per line."""
+    text = json.dumps(index, indent=2, ensure_ascii=False)
+    return _SPAN_RE.sub(r'[\1, \2]', text)
+
+
+class RateLookup:
+    """
+    Fetch rates by code by reading only their byte slices.
+
+    Parsed rates are kept in an LRU cache of ``cache_size`` entries. Cached
+    rates are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, index_path: Path = INDEX_FILE, rates_dir: Path = RATES_DIR,
+                 cache_size: int = DEFAULT_CACHE_SIZE):
+        self.rates_dir = Path(rates_dir)
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[str, Dict]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+
+        # code -> group file; spans are resolved per group on first use
+        self._files: Dict[str, str] = {}
+        self._groups: Dict[str, Dict] = {}
+        for entry in index['groups'].values():
+            self._groups[entry['file']] = entry
+            for code in entry.get('codes', []):
+                self._files[code] = entry['file']
+        self._spans: Dict[str, Dict[str, Tuple[int, int]]] = {}
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._files
+
+    def _group_spans(self, filename: str, refresh: bool = False) -> Dict[str, Tuple[int, int]]:
+        spans = self._spans.get(filename)
+        if spans is not None and not refresh:
+            return spans
+
+        entry = self._groups[filename]
+        path = self.rates_dir / filename
+        if refresh or 'spans' not in entry or entry.get('size') != path.stat().st_size:
+            codes, span_list = scan_group_spans(path)
+            entry.update(codes=codes, spans=span_list, size=path.stat().st_size)
+            self._invalidate(filename)
+            for code in codes:
+                self._files[code] = filename
+        spans = {code: tuple(span) for code, span in zip(entry['codes'], entry['spans'])}
+        self._spans[filename] = spans
+        return spans
+
+    def _invalidate(self, filename: str):
+        for code in [c for c in self._cache if self._files.get(c) == filename]:
+            del self._cache[code]
+
+    def _remember(self, code: str, rate: Dict):
+        self._cache[code] = rate
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _read_group(self, filename: str, codes: List[str]) -> Dict[str, Dict]:
+        """Read the slices of codes from one group file in offset order."""
+        for attempt in (False, True):
+            spans = self._group_spans(filename, refresh=attempt)
+            wanted = sorted((spans[c], c) for c in codes if c in spans)
+            found = {}
+            with open(self.rates_dir / filename, 'rb') as f:
+                for (offset, length), code in wanted:
+                    f.seek(offset)
+                    try:
+                        rate = json.loads(f.read(length).decode('utf-8'))
+                    except ValueError:
+                        break
+                    if not isinstance(rate, dict) or rate.get('code') != code:
+                        break
+                    found[code] = rate
+                else:
+                    return found
+            # A slice did not hold the expected rate: the file changed in place
+        return found
+
+    def get_rates(self, codes: Iterable[str]) -> Dict[str, Dict]:
+        """Return {code: rate} for the known codes, one file open per group."""
+        result = {}
+        missing: Dict[str, List[str]] = {}
+        for code in codes:
+            rate = self._cache.get(code)
+            if rate is not None:
+                self._cache.move_to_end(code)
+                self.hits += 1
+                result[code] = rate
+            elif code in self._files and code not in result:
+                missing.setdefault(self._files[code], []).append(code)
+
+        for filename, group_codes in missing.items():
+            for code, rate in self._read_group(filename, group_codes).items():
+                self.misses += 1
+                self._remember(code, rate)
+                result[code] = rate
+        return result
+
+    def get_rate(self, code: str) -> Optional[Dict]:
+        """Return a single rate, or None if the code is not indexed."""
+        return self.get_rates([code]).get(code)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Random-access composite rate lookup')
+    parser.add_argument('command', choices=('index', 'get'))
+    parser.add_argument('codes', nargs='*', help='Rate codes to fetch')
+    parser.add_argument('--index', default=str(INDEX_FILE), help='composite_rates_index.json path')
+    parser.add_argument('--rates-dir', default=str(RATES_DIR),
+                        help='Directory holding group_*.json composite files')
+    args = parser.parse_args()
+
+    if args.command == 'index':
+        index = index_spans(Path(args.index), Path(args.rates_dir))
+        print(f"Indexed {index['total']} rates in {len(index['groups'])} groups: {args.index}")
+        return 0
+
+    lookup = RateLookup(Path(args.index), Path(args.rates_dir))
+    rates = lookup.get_rates(args.codes)
+    for code in args.codes:
+        if code not in rates:
+            print(f"ERROR: Unknown rate code: {code}", file=sys.stderr)
+    json.dump([rates[c] for c in args.codes if c in rates], sys.stdout, indent=2, ensure_ascii=False)
+    print()
+    return 0 if len(rates) == len(set(args.codes)) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""In-process query engine over the composite rate library.
+
+The library is loaded once and indexed on the fields estimate tools filter
+by. Single-valued text fields (NRM codes, unit, region, ...) get a hash
+index: a value id per row plus a sorted posting array per value. Resource
+references in components get a multi-valued index, and numeric fields such
+as total_rate a sorted index for range queries.
+
+Filters compose with ``&``, ``|`` and ``~``. An AND evaluates its most
+selective child through its index and checks the others against that
+candidate set only, so cost follows the result size, not the library size:
+
+    engine = RateQueryEngine.from_rates_dir(RATES_DIR)
+    engine.query(Eq('unit', 'm²') & Under('nrm1_l4_code', '3.2')
+                 & Has('labour_resource', 'LAB_AU_TILER')
+                 & Range('total_rate', 50, 200))
+
+Front ends:
+    python rate_query.py --unit m² --nrm 3.2 --labour LAB_AU_TILER
+    python rate_query.py --serve 8765    # GET /rates?unit=m²&nrm=3.2&max_total=200
+    python rate_query.py --bench 100000
+"""
+import abc
+import argparse
+import json
+import sys
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+RATES_DIR = BASE_DIR / 'au' / 'seed-data' / 'composite_rates'
+
+HASH_FIELDS = (
+    'code', 'unit', 'region', 'spec_level', 'mapping_confidence',
+    'nrm1_l2_code', 'nrm1_l3_code', 'nrm1_l4_code', 'nrm2_primary_ws',
+)
+NUMERIC_FIELDS = ('total_rate', 'nett_total', 'labour_total', 'materials_total', 'plant_total')
+
+
+def _component_resources(slots: Sequence[str]) -> Callable[[Dict], List[str]]:
+    def extract(rate: Dict) -> List[str]:
+        components = rate.get('components') or {}
+        return [item['resource_id'] for slot in slots
+                for item in components.get(slot, []) if item.get('resource_id')]
+    return extract
+
+
+MULTI_FIELDS = {
+    'labour_resource': _component_resources(('labour',)),
+    'resource': _component_resources(('labour', 'materials', 'plant')),
+}
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+# =============================================================================
+# INDEXES
+# =============================================================================
+
+class HashIndex:
+    """Single-valued field: value id per row and a posting array per value."""
+
+    def __init__(self, values: Sequence[Optional[str]]):
+        self.values = sorted({v for v in values if v is not None})
+        self.ids = {v: i for i, v in enumerate(self.values)}
+        self.column = np.array([self.ids.get(v, -1) for v in values], dtype=np.int64)
+
+        order = np.argsort(self.column, kind='stable')
+        bounds = np.searchsorted(self.column[order], np.arange(len(self.values) + 1))
+        self.postings = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.values))]
+
+    def value_ids(self, values: Iterable[str]) -> List[int]:
+        return [self.ids[v] for v in values if v in self.ids]
+
+    def under_ids(self, code: str) -> List[int]:
+        """Ids of values equal to code or below it in a dotted hierarchy."""
+        ids = [self.ids[code]] if code in self.ids else []
+        prefix = code + '.'
+        i = bisect_left(self.values, prefix)
+        while i < len(self.values) and self.values[i].startswith(prefix):
+            ids.append(i)
+            i += 1
+        return ids
+
+    def rows(self, value_ids: Sequence[int]) -> np.ndarray:
+        if not value_ids:
+            return _EMPTY
+        if len(value_ids) == 1:
+            return self.postings[value_ids[0]]
+        return np.sort(np.concatenate([self.postings[i] for i in value_ids]))
+
+    def count(self, value_ids: Sequence[int]) -> int:
+        return sum(len(self.postings[i]) for i in value_ids)
+
+    def keep(self, rows: np.ndarray, value_ids: Sequence[int]) -> np.ndarray:
+        column = self.column[rows]
+        if len(value_ids) == 1:
+            return rows[column == value_ids[0]]
+        return rows[np.isin(column, value_ids)]
+
+
+class MultiIndex:
+    """Multi-valued field: posting array per value, row masks built on demand."""
+
+    def __init__(self, row_values: Sequence[Sequence[str]]):
+        self.size = len(row_values)
+        postings: Dict[str, List[int]] = {}
+        for row, values in enumerate(row_values):
+            for value in dict.fromkeys(values):
+                postings.setdefault(value, []).append(row)
+        self.postings = {v: np.asarray(rows, dtype=np.int64) for v, rows in postings.items()}
+        self._masks: Dict[str, np.ndarray] = {}
+
+    def rows(self, values: Sequence[str]) -> np.ndarray:
+        arrays = [self.postings[v] for v in values if v in self.postings]
+        if not arrays:
+            return _EMPTY
+        if len(arrays) == 1:
+            return arrays[0]
+        return np.unique(np.concatenate(arrays))
+
+    def count(self, values: Sequence[str]) -> int:
+        return sum(len(self.postings.get(v, _EMPTY)) for v in values)
+
+    def mask(self, value: str) -> np.ndarray:
+        mask = self._masks.get(value)
+        if mask is None:
+            mask = np.zeros(self.size, dtype=bool)
+            mask[self.postings.get(value, _EMPTY)] = True
+            self._masks[value] = mask
+        return mask
+
+    def keep(self, rows: np.ndarray, values: Sequence[str]) -> np.ndarray:
+        keep = np.zeros(len(rows), dtype=bool)
+        for value in values:
+            keep |= self.mask(value)[rows]
+        return rows[keep]
+
+
+class SortedIndex:
+    """Numeric field sorted once for range queries (missing values last)."""
+
+    def __init__(self, values: Sequence[Optional[float]]):
+        self.column = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        self.order = np.argsort(self.column, kind='stable')
+        self.sorted = self.column[self.order]
+
+    def bounds(self, lo: Optional[float], hi: Optional[float]):
+        start = 0 if lo is None else int(np.searchsorted(self.sorted, lo, side='left'))
+        stop = int(np.searchsorted(self.sorted, np.inf if hi is None else hi, side='right'))
+        return start, stop
+
+    def rows(self, lo, hi) -> np.ndarray:
+        start, stop = self.bounds(lo, hi)
+        return np.sort(self.order[start:stop])
+
+    def count(self, lo, hi) -> int:
+        start, stop = self.bounds(lo, hi)
+        return stop - start
+
+    def keep(self, rows: np.ndarray, lo, hi) -> np.ndarray:
+        values = self.column[rows]
+        keep = ~np.isnan(values)
+        if lo is not None:
+            keep &= values >= lo
+        if hi is not None:
+            keep &= values <= hi
+        return rows[keep]
+
+
+# =============================================================================
+# FILTERS
+# =============================================================================
+
+class Filter(abc.ABC):
+    """Composable predicate over indexed rate rows (sorted row id arrays)."""
+
+    @abc.abstractmethod
+    def rows(self, engine: 'RateQueryEngine') -> np.ndarray:
+        """Sorted row ids matching the filter."""
+
+    def count(self, engine: 'RateQueryEngine') -> int:
+        """Upper bound on the number of matching rows (cheap)."""
+        return len(engine)
+
+    def keep(self, engine: 'RateQueryEngine', rows: np.ndarray) -> np.ndarray:
+        return np.intersect1d(rows, self.rows(engine), assume_unique=True)
+
+    def __and__(self, other: 'Filter') -> 'Filter':
+        return And(self, other)
+
+    def __or__(self, other: 'Filter') -> 'Filter':
+        return Or(self, other)
+
+    def __invert__(self) -> 'Filter':
+        return Not(self)
+
+
+class Eq(Filter):
+    """Field equals any of the given values (hash or multi-valued index)."""
+
+    def __init__(self, field: str, *values: str):
+        self.field = field
+        self.values = values
+
+    def _resolve(self, engine):
+        index = engine.index(self.field)
+        if isinstance(index, HashIndex):
+            return index, index.value_ids(self.values)
+        return index, list(self.values)
+
+    def rows(self, engine):
+        index, keys = self._resolve(engine)
+        return index.rows(keys)
+
+    def count(self, engine):
+        index, keys = self._resolve(engine)
+        return index.count(keys)
+
+    def keep(self, engine, rows):
+        index, keys = self._resolve(engine)
+        return index.keep(rows, keys) if keys else _EMPTY
+
+
+class Has(Eq):
+    """Multi-valued field (e.g. labour_resource) contains any of the values."""
+
+
+class Under(Eq):
+    """Dotted code equals or sits below the given code (e.g. NRM 3.2 -> 3.2.1.4)."""
+
+    def __init__(self, field: str, code: str):
+        super().__init__(field, code)
+        self.code = code
+
+    def _resolve(self, engine):
+        index = engine.index(self.field)
+        return index, index.under_ids(self.code)
+
+
+class Range(Filter):
+    """Numeric field within [lo, hi]; either bound may be None."""
+
+    def __init__(self, field: str, lo: Optional[float] = None, hi: Optional[float] = None):
+        self.field = field
+        self.lo = lo
+        self.hi = hi
+
+    def rows(self, engine):
+        return engine.index(self.field).rows(self.lo, self.hi)
+
+    def count(self, engine):
+        return engine.index(self.field).count(self.lo, self.hi)
+
+    def keep(self, engine, rows):
+        return engine.index(self.field).keep(rows, self.lo, self.hi)
+
+
+class And(Filter):
+    def __init__(self, *filters: Filter):
+        self.filters = filters
+
+    def _plan(self, engine):
+        return sorted(self.filters, key=lambda f: f.count(engine))
+
+    def rows(self, engine):
+        if not self.filters:
+            return engine.all_rows
+        first, *rest = self._plan(engine)
+        rows = first.rows(engine)
+        for f in rest:
+            if not len(rows):
+                break
+            rows = f.keep(engine, rows)
+        return rows
+
+    def count(self, engine):
+        return min((f.count(engine) for f in self.filters), default=len(engine))
+
+    def keep(self, engine, rows):
+        for f in self._plan(engine):
+            if not len(rows):
+                break
+            rows = f.keep(engine, rows)
+        return rows
+
+
+class Or(Filter):
+    def __init__(self, *filters: Filter):
+        self.filters = filters
+
+    def rows(self, engine):
+        arrays = [f.rows(engine) for f in self.filters]
+        return np.unique(np.concatenate(arrays)) if arrays else _EMPTY
+
+    def count(self, engine):
+        return min(len(engine), sum(f.count(engine) for f in self.filters))
+
+    def keep(self, engine, rows):
+        keep = np.zeros(len(rows), dtype=bool)
+        for f in self.filters:
+            keep |= np.isin(rows, f.keep(engine, rows), assume_unique=True)
+        return rows[keep]
+
+
+class Not(Filter):
+    def __init__(self, inner: Filter):
+        self.inner = inner
+
+    def rows(self, engine):
+        return self.keep(engine, engine.all_rows)
+
+    def keep(self, engine, rows):
+        return rows[~np.isin(rows, self.inner.keep(engine, rows), assume_unique=True)]
+
+
+# =============================================================================
+# ENGINE
+# =============================================================================
+
+class RateQueryEngine:
+    """Rates loaded once with secondary indexes for filtered queries."""
+
+    def __init__(self, rates: Sequence[Dict]):
+        self.rates = list(rates)
+        self.all_rows = np.arange(len(self.rates), dtype=np.int64)
+        self._indexes = {}
+        for field in HASH_FIELDS:
+            self._indexes[field] = HashIndex([self._text(r.get(field)) for r in self.rates])
+        for field, extract in MULTI_FIELDS.items():
+            self._indexes[field] = MultiIndex([extract(r) for r in self.rates])
+        for field in NUMERIC_FIELDS:
+            self._indexes[field] = SortedIndex([self._number(r.get(field)) for r in self.rates])
+
+    @staticmethod
+    def _text(value) -> Optional[str]:
+        return None if value is None or value == '' else str(value)
+
+    @staticmethod
+    def _number(value) -> Optional[float]:
+        return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+    @classmethod
+    def from_rates_dir(cls, rates_dir: Path) -> 'RateQueryEngine':
+        rates = []
+        for path in sorted(Path(rates_dir).glob('group_*.json')):
+            with open(path, 'r', encoding='utf-8') as f:
+                rates.extend(json.load(f).get('rates', []))
+        return cls(rates)
+
+    def __len__(self) -> int:
+        return len(self.rates)
+
+    def index(self, field: str):
+        try:
+            return self._indexes[field]
+        except KeyError:
+            raise KeyError(f'No index on {field!r}; indexed: {", ".join(self._indexes)}') from None
+
+    def select(self, where: Optional[Filter] = None, order_by: Optional[str] = None,
+               descending: bool = False, limit: Optional[int] = None) -> np.ndarray:
+        """Return matching row ids, optionally ordered by a numeric field."""
+        rows = self.all_rows if where is None else where.rows(self)
+        if order_by is not None:
+            values = self.index(order_by).column[rows]
+            order = np.argsort(-values if descending else values, kind='stable')
+            rows = rows[order]
+        if limit is not None:
+            rows = rows[:limit]
+        return rows
+
+    def query(self, where: Optional[Filter] = None, **kwargs) -> List[Dict]:
+        """Return matching rates (shared objects; treat as read-only)."""
+        rates = self.rates
+        return [rates[i] for i in self.select(where, **kwargs).tolist()]
+
+
+def build_filter(unit: Optional[str] = None, nrm: Optional[str] = None, nrm2_ws: Optional[str] = None,
+                 region: Optional[str] = None, confidence: Optional[str] = None,
+                 labour: Optional[str] = None, resource: Optional[str] = None,
+                 min_total: Optional[float] = None, max_total: Optional[float] = None) -> Optional[Filter]:
+    """Build an AND filter from simple front-end parameters."""
+    filters = []
+    if unit:
+        filters.append(Eq('unit', unit))
+    if nrm:
+        filters.append(Under('nrm1_l4_code', nrm))
+    if nrm2_ws:
+        filters.append(Eq('nrm2_primary_ws', nrm2_ws))
+    if region:
+        filters.append(Eq('region', region))
+    if confidence:
+        filters.append(Eq('mapping_confidence', confidence))
+    if labour:
+        filters.append(Has('labour_resource', labour))
+    if resource:
+        filters.append(Has('resource', resource))
+    if min_total is not None or max_total is not None:
+        filters.append(Range('total_rate', min_total, max_total))
+    return And(*filters) if filters else None
+
+
+FRONT_END_PARAMS = ('unit', 'nrm', 'nrm2_ws', 'region', 'confidence', 'labour', 'resource')
+FRONT_END_NUMBERS = ('min_total', 'max_total')
+
+
+# =============================================================================
+# FRONT ENDS
+# =============================================================================
+
+def serve(engine: RateQueryEngine, port: int, host: str = '127.0.0.1'):
+    """Serve GET /rates?unit=..&nrm=..&labour=..&min_total=..&max_total=..&limit=.. as JSON."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != '/rates':
+                self.send_error(404, 'Use /rates')
+                return
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                kwargs = {k: params[k] for k in FRONT_END_PARAMS if k in params}
+                kwargs.update({k: float(params[k]) for k in FRONT_END_NUMBERS if k in params})
+                limit = int(params['limit']) if 'limit' in params else None
+                start = time.perf_counter()
+                rates = engine.query(build_filter(**kwargs), order_by='total_rate', limit=limit)
+                elapsed = time.perf_counter() - start
+            except (KeyError, ValueError) as e:
+                self.send_error(400, str(e))
+                return
+            body = json.dumps({'count': len(rates), 'elapsed_ms': round(elapsed * 1000, 3), 'rates': rates},
+                              ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"Serving {len(engine)} rates on http://{host}:{port}/rates")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def replicate(rates: Sequence[Dict], size: int) -> List[Dict]:
+    """Synthetic library of `size` rates for benchmarking (codes made unique)."""
+    out = []
+    copy = 0
+    while len(out) < size:
+        for rate in rates:
+            if len(out) == size:
+                break
+            out.append(dict(rate, code=f"{rate.get('code')}-{copy}", total_rate=rate.get('total_rate', 0) + copy % 97))
+        copy += 1
+    return out
+
+
+def benchmark(rates: Sequence[Dict], size: int, repeat: int = 200):
+    start = time.perf_counter()
+    engine = RateQueryEngine(replicate(rates, size))
+    print(f"Indexed {len(engine)} rates in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    queries = {
+        'unit=m²': Eq('unit', 'm²'),
+        'nrm 2 & labour carpenter': Under('nrm1_l4_code', '2') & Has('labour_resource', 'LAB_AU_CARPENTER'),
+        'm² & nrm 3.2 & tiler & total 50-200': build_filter(unit='m²', nrm='3.2', labour='LAB_AU_TILER',
+                                                           min_total=50, max_total=200),
+        'total 100-110': Range('total_rate', 100, 110),
+        'region & ~confidence High': Eq('region', 'Sydney Metro') & ~Eq('mapping_confidence', 'High')
+                                     & Range('total_rate', None, 60),
+    }
+    for name, where in queries.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            rows = engine.select(where)
+        elapsed = (time.perf_counter() - start) / repeat
+        print(f"  {name:<40} {len(rows):>7} rows  {elapsed * 1000:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the composite rate library')
+    parser.add_argument('--rates-dir', default=str(RATES_DIR),
+                        help='Directory holding group_*.json composite files')
+    parser.add_argument('--unit', help='Exact unit, e.g. m²')
+    parser.add_argument('--nrm', help='NRM1 code; matches the code and everything below it')
+    parser.add_argument('--nrm2-ws', help='NRM2 primary work section')
+    parser.add_argument('--region')
+    parser.add_argument('--confidence', help='Mapping confidence (High/Medium/Low)')
+    parser.add_argument('--labour', help='Labour resource_id, e.g. LAB_AU_TILER')
+    parser.add_argument('--resource', help='Any component resource_id')
+    parser.add_argument('--min-total', type=float)
+    parser.add_argument('--max-total', type=float)
+    parser.add_argument('--limit', type=int)
+    parser.add_argument('--json', action='store_true', help='Print matching rates as JSON')
+    parser.add_argument('--serve', type=int, metavar='PORT', help='Serve queries over local HTTP')
+    parser.add_argument('--bench', type=int, metavar='N', help='Benchmark queries on N synthetic rates')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    engine = RateQueryEngine.from_rates_dir(Path(args.rates_dir))
+    print(f"Loaded and indexed {len(engine)} rates in {(time.perf_counter() - start) * 1000:.0f} ms",
+          file=sys.stderr)
+
+    if args.bench:
+        benchmark(engine.rates, args.bench)
+        return 0
+    if args.serve:
+        serve(engine, args.serve)
+        return 0
+
+    where = build_filter(args.unit, args.nrm, args.nrm2_ws, args.region, args.confidence,
+                         args.labour, args.resource, args.min_total, args.max_total)
+    start = time.perf_counter()
+    rates = engine.query(where, order_by='total_rate', limit=args.limit)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        json.dump(rates, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        for rate in rates:
+            print(f"{rate.get('code'):<20} {rate.get('unit', ''):<6} {rate.get('total_rate', 0):>10.2f}  "
+                  f"{rate.get('nrm1_l4_code', ''):<10} {rate.get('name', '')}")
+    print(f"{len(rates)} rates in {elapsed * 1000:.3f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,572 @@
+#!/usr/bin/env python3
+"""Compact binary snapshot of the composite rate library.
+
+The group_*.json files stay the review format; a snapshot is a derived,
+memory-mappable copy for tools that only need to read the library:
+
+    python rate_snapshot.py build             # group_*.json -> snapshot
+    python rate_snapshot.py export out/       # snapshot -> group_*.json
+    python rate_snapshot.py verify            # round-trip and compare bytes
+
+File layout (little-endian):
+
+    MAGIC (8 bytes) | header length (uint64) | JSON header | arrays
+
+Every array is 8-byte aligned and described in the header by dtype, offset
+and count, so it can be viewed in place with ``np.frombuffer`` over an
+``mmap``. Strings (keys, text values, JSON fallbacks) are interned into one
+UTF-8 blob with an offsets array. Rates are stored column by column: one
+array per field (string ids, int64 or float64), plus a per-rate layout id
+that records which fields a rate has and in which order. Components are a
+second table with one row per component item. A code-sorted row permutation
+serves as the code -> offset table.
+
+Opening maps the file and parses only the header, ``get_rate`` decodes a
+single row and ``column`` is a zero-copy NumPy view. Bulk reads
+(``documents``, ``export``) decode the string table once and convert each
+column in one pass before assembling the dicts, which is faster than
+``json.load`` of the group files; ``verify`` prints both timings.
+"""
+import argparse
+import json
+import mmap
+import os
+import sys
+import tempfile
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent.parent
+RATES_DIR = BASE_DIR / 'au' / 'seed-data' / 'composite_rates'
+SNAPSHOT_FILE = BASE_DIR / 'au' / 'seed-data' / 'composite_rates.snapshot'
+
+MAGIC = b'CRSNAP01'
+FORMAT_VERSION = 1
+ALIGNMENT = 8
+
+# Column kinds
+KIND_STR = 'str'
+KIND_INT = 'int'
+KIND_FLOAT = 'float'
+KIND_JSON = 'json'
+KIND_COMPONENTS = 'components'
+
+COLUMN_DTYPES = {
+    KIND_STR: '<u4',
+    KIND_INT: '<i8',
+    KIND_FLOAT: '<f8',
+    KIND_JSON: '<u4',
+}
+
+COMPONENTS_FIELD = 'components'
+
+
+# =============================================================================
+# WRITING
+# =============================================================================
+
+class _StringTable:
+    """Intern strings into ids; serialised as a UTF-8 blob plus offsets."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+
+    def add(self, text: str) -> int:
+        string_id = self.ids.get(text)
+        if string_id is None:
+            string_id = len(self.ids)
+            self.ids[text] = string_id
+        return string_id
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        encoded = [text.encode('utf-8') for text in self.ids]
+        offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        blob = np.frombuffer(b''.join(encoded), dtype='u1')
+        return blob, offsets
+
+
+def _scalar_kind(values: Sequence[Any]) -> str:
+    types = {type(v) for v in values}
+    if types == {str}:
+        return KIND_STR
+    if types == {int} and all(-2**63 <= v < 2**63 for v in values):
+        return KIND_INT
+    if types == {float}:
+        return KIND_FLOAT
+    return KIND_JSON
+
+
+def _is_component_map(value: Any) -> bool:
+    """True for {slot: [ {scalar fields}, ... ]} as written by link_resources."""
+    return isinstance(value, dict) and all(
+        isinstance(items, list) and all(
+            isinstance(item, dict) and all(not isinstance(v, (dict, list)) for v in item.values())
+            for item in items)
+        for items in value.values())
+
+
+class _TableBuilder:
+    """Encode a list of flat records into layouts and typed columns."""
+
+    def __init__(self, name: str, records: Sequence[Dict], strings: _StringTable,
+                 nested: Sequence[str] = ()):
+        self.name = name
+        self.records = records
+        self.strings = strings
+
+        self.fields: List[str] = []
+        field_index: Dict[str, int] = {}
+        for record in records:
+            for key in record:
+                if key not in field_index:
+                    field_index[key] = len(self.fields)
+                    self.fields.append(key)
+
+        layout_ids: Dict[Tuple[int, ...], int] = {}
+        self.layouts: List[List[int]] = []
+        self.layout_column = np.zeros(len(records), dtype='<u2')
+        for row, record in enumerate(records):
+            layout = tuple(field_index[key] for key in record)
+            layout_id = layout_ids.get(layout)
+            if layout_id is None:
+                layout_id = len(self.layouts)
+                layout_ids[layout] = layout_id
+                self.layouts.append(list(layout))
+            self.layout_column[row] = layout_id
+
+        self.kinds: List[str] = []
+        for name in self.fields:
+            values = [r[name] for r in records if name in r]
+            if name in nested and all(_is_component_map(v) for v in values):
+                self.kinds.append(KIND_COMPONENTS)
+            else:
+                self.kinds.append(_scalar_kind(values))
+
+    def column(self, name: str, kind: str) -> np.ndarray:
+        column = np.zeros(len(self.records), dtype=COLUMN_DTYPES[kind])
+        for row, record in enumerate(self.records):
+            if name in record:
+                value = record[name]
+                if kind == KIND_STR:
+                    value = self.strings.add(value)
+                elif kind == KIND_JSON:
+                    value = self.strings.add(json.dumps(value, ensure_ascii=False))
+                column[row] = value
+        return column
+
+    def schema(self) -> Dict:
+        return {
+            'fields': [{'name': n, 'kind': k} for n, k in zip(self.fields, self.kinds)],
+            'layouts': self.layouts,
+            'rows': len(self.records),
+        }
+
+
+def _encode_components(name: str, records: Sequence[Dict], strings: _StringTable,
+                       arrays: Dict[str, np.ndarray]) -> Dict:
+    """Flatten {slot: [items]} maps into an item table with a per-rate row range."""
+    slots: List[str] = []
+    slot_index: Dict[str, int] = {}
+    slot_layout_ids: Dict[Tuple[int, ...], int] = {}
+    slot_layouts: List[List[int]] = []
+
+    items: List[Dict] = []
+    item_slots: List[int] = []
+    starts = np.zeros(len(records) + 1, dtype='<u4')
+    layout_column = np.zeros(len(records), dtype='<u2')
+
+    for row, record in enumerate(records):
+        components = record.get(COMPONENTS_FIELD, {})
+        layout = []
+        for slot, slot_items in components.items():
+            if slot not in slot_index:
+                slot_index[slot] = len(slots)
+                slots.append(slot)
+            layout.append(slot_index[slot])
+            for item in slot_items:
+                items.append(item)
+                item_slots.append(slot_index[slot])
+        layout = tuple(layout)
+        if layout not in slot_layout_ids:
+            slot_layout_ids[layout] = len(slot_layouts)
+            slot_layouts.append(list(layout))
+        layout_column[row] = slot_layout_ids[layout]
+        starts[row + 1] = len(items)
+
+    prefix = f'{name}.{COMPONENTS_FIELD}'
+    arrays[f'{prefix}.start'] = starts
+    arrays[f'{prefix}.slot_layout'] = layout_column
+    arrays[f'{prefix}.items.slot'] = np.asarray(item_slots, dtype='u1')
+
+    table = _TableBuilder(f'{prefix}.items', items, strings)
+    _add_table(table, arrays)
+    return {'slots': slots, 'slot_layouts': slot_layouts, 'items': table.schema()}
+
+
+def _add_table(table: _TableBuilder, arrays: Dict[str, np.ndarray]) -> Dict:
+    arrays[f'{table.name}.layout'] = table.layout_column
+    schema = table.schema()
+    for field, name, kind in zip(schema['fields'], table.fields, table.kinds):
+        if kind == KIND_COMPONENTS:
+            field['components'] = _encode_components(table.name, table.records, table.strings, arrays)
+        else:
+            arrays[f'{table.name}.{name}'] = table.column(name, kind)
+    return schema
+
+
+def _umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def build_snapshot(rates_dir: Path, output: Path) -> Dict:
+    """Encode every group_*.json under rates_dir into a snapshot file."""
+    strings = _StringTable()
+    groups = []
+    rates: List[Dict] = []
+    for path in sorted(Path(rates_dir).glob('group_*.json')):
+        with open(path, 'r', encoding='utf-8') as f:
+            doc = json.load(f)
+        start = len(rates)
+        rates.extend(doc.get('rates', []))
+        groups.append({
+            'file': path.name,
+            # Document skeleton with key order; rates are restored from the tables
+            'document': json.dumps({k: (None if k == 'rates' else v) for k, v in doc.items()},
+                                   ensure_ascii=False),
+            'start': start,
+            'stop': len(rates),
+        })
+
+    arrays: Dict[str, np.ndarray] = {}
+    table = _TableBuilder('rates', rates, strings, nested=(COMPONENTS_FIELD,))
+    rates_schema = _add_table(table, arrays)
+
+    codes = [r.get('code') for r in rates]
+    if all(isinstance(c, str) for c in codes):
+        arrays['rates.code_order'] = np.asarray(sorted(range(len(codes)), key=codes.__getitem__), dtype='<u4')
+
+    blob, offsets = strings.arrays()
+    arrays['strings.blob'] = blob
+    arrays['strings.offsets'] = offsets
+
+    header = {
+        'version': FORMAT_VERSION,
+        'groups': groups,
+        'tables': {'rates': rates_schema},
+        'arrays': {},
+    }
+    offset = 0
+    for name, array in arrays.items():
+        header['arrays'][name] = {'dtype': array.dtype.str, 'offset': offset, 'count': int(array.size)}
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    header_bytes = json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    header_bytes += b' ' * (-len(header_bytes) % ALIGNMENT)
+
+    output = Path(output)
+    fd, tmp_path = tempfile.mkstemp(dir=output.parent, prefix=f'.{output.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(np.uint64(len(header_bytes)).astype('<u8').tobytes())
+            f.write(header_bytes)
+            for array in arrays.values():
+                data = array.tobytes()
+                f.write(data)
+                f.write(b'\0' * (-len(data) % ALIGNMENT))
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates files as 0600; keep the existing permissions, or
+        # give a new snapshot the umask default like open() would
+        os.chmod(tmp_path, os.stat(output).st_mode & 0o777 if output.exists() else 0o666 & ~_umask())
+        os.replace(tmp_path, output)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return header
+
+
+# =============================================================================
+# READING
+# =============================================================================
+
+class _TableReader:
+    """Decode records of one table from its layouts and columns."""
+
+    def __init__(self, snapshot: 'RateSnapshot', name: str, schema: Dict):
+        self.snapshot = snapshot
+        self.name = name
+        self.fields = [(f['name'], f['kind'], f.get('components')) for f in schema['fields']]
+        self.layouts = [[self.fields[i] for i in layout] for layout in schema['layouts']]
+        self.rows = schema['rows']
+        self.layout_column = snapshot.array(f'{name}.layout')
+        self.columns = {
+            n: snapshot.array(f'{name}.{n}') for n, kind, _ in self.fields if kind != KIND_COMPONENTS
+        }
+        self._components = {
+            n: _ComponentsReader(snapshot, f'{name}.{n}', spec)
+            for n, kind, spec in self.fields if kind == KIND_COMPONENTS
+        }
+
+    def _value(self, kind: str, raw):
+        if kind == KIND_STR:
+            return self.snapshot.string(raw)
+        if kind == KIND_JSON:
+            return json.loads(self.snapshot.string(raw))
+        return raw
+
+    def record(self, row: int) -> Dict:
+        """Decode a single record."""
+        record = {}
+        for name, kind, _ in self.layouts[int(self.layout_column[row])]:
+            if kind == KIND_COMPONENTS:
+                record[name] = self._components[name].record(row)
+            else:
+                record[name] = self._value(kind, self.columns[name][row].item())
+        return record
+
+    def _values(self, name: str, kind: str, start: int, stop: int) -> List:
+        """Python values of one column over a row range."""
+        raw = self.columns[name][start:stop].tolist()
+        if kind == KIND_STR:
+            return list(map(self.snapshot.strings().__getitem__, raw))
+        if kind == KIND_JSON:
+            strings = self.snapshot.strings()
+            return [json.loads(strings[i]) for i in raw]
+        return raw
+
+    def records(self, start: int = 0, stop: Optional[int] = None) -> List[Dict]:
+        """Decode a row range column by column, then assemble the records."""
+        stop = self.rows if stop is None else stop
+        values = {}
+        for name, kind, _ in self.fields:
+            if kind == KIND_COMPONENTS:
+                values[name] = self._components[name].records(start, stop)
+            else:
+                values[name] = self._values(name, kind, start, stop)
+        layouts = [[(name, values[name]) for name, _, _ in layout] for layout in self.layouts]
+        return [{name: column[i] for name, column in layouts[layout]}
+                for i, layout in enumerate(self.layout_column[start:stop].tolist())]
+
+
+class _ComponentsReader:
+    """Rebuild {slot: [items]} maps from the flattened item table."""
+
+    def __init__(self, snapshot: 'RateSnapshot', prefix: str, spec: Dict):
+        self.slots = spec['slots']
+        self.slot_layouts = [[self.slots[i] for i in layout] for layout in spec['slot_layouts']]
+        self.starts = snapshot.array(f'{prefix}.start')
+        self.layout_column = snapshot.array(f'{prefix}.slot_layout')
+        self.item_slots = snapshot.array(f'{prefix}.items.slot')
+        self.items = _TableReader(snapshot, f'{prefix}.items', spec['items'])
+
+    def record(self, row: int) -> Dict:
+        components = {slot: [] for slot in self.slot_layouts[int(self.layout_column[row])]}
+        for i in range(int(self.starts[row]), int(self.starts[row + 1])):
+            components[self.slots[self.item_slots[i]]].append(self.items.record(i))
+        return components
+
+    def records(self, start: int, stop: int) -> List[Dict]:
+        starts = self.starts[start:stop + 1].tolist()
+        items = self.items.records(starts[0], starts[-1])
+        item_slots = self.item_slots[starts[0]:starts[-1]].tolist()
+        result = []
+        for row, layout in enumerate(self.layout_column[start:stop].tolist()):
+            components = {slot: [] for slot in self.slot_layouts[layout]}
+            for i in range(starts[row] - starts[0], starts[row + 1] - starts[0]):
+                components[self.slots[item_slots[i]]].append(items[i])
+            result.append(components)
+        return result
+
+
+class RateSnapshot:
+    """Memory-mapped, read-only view of a snapshot file."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{self.path} is not a composite rate snapshot')
+        header_len = int(np.frombuffer(self._mmap, dtype='<u8', count=1, offset=len(MAGIC))[0])
+        header_start = len(MAGIC) + 8
+        self.header = json.loads(bytes(self._mmap[header_start:header_start + header_len]))
+        if self.header.get('version') != FORMAT_VERSION:
+            raise ValueError(f'Unsupported snapshot version: {self.header.get("version")}')
+        self._data_start = header_start + header_len
+        self._arrays: Dict[str, np.ndarray] = {}
+
+        self._blob = self.array('strings.blob')
+        self._offsets = self.array('strings.offsets')
+        self._strings: Dict[int, str] = {}
+        self._all_strings: Optional[List[str]] = None
+        self.groups = self.header['groups']
+        self.rates = _TableReader(self, 'rates', self.header['tables']['rates'])
+        self._code_order = None
+        if 'rates.code_order' in self.header['arrays']:
+            self._code_order = self.array('rates.code_order')
+
+    def array(self, name: str) -> np.ndarray:
+        """Zero-copy view of a stored array."""
+        array = self._arrays.get(name)
+        if array is None:
+            spec = self.header['arrays'][name]
+            array = np.frombuffer(self._mmap, dtype=spec['dtype'], count=spec['count'],
+                                  offset=self._data_start + spec['offset'])
+            self._arrays[name] = array
+        return array
+
+    def strings(self) -> List[str]:
+        """Every interned string, decoded once for bulk reads."""
+        if self._all_strings is None:
+            blob = self._blob.tobytes()
+            offsets = self._offsets.tolist()
+            self._all_strings = [blob[a:b].decode('utf-8') for a, b in zip(offsets, offsets[1:])]
+        return self._all_strings
+
+    def string(self, string_id: int) -> str:
+        text = self._strings.get(string_id)
+        if text is None:
+            start, stop = int(self._offsets[string_id]), int(self._offsets[string_id + 1])
+            text = self._blob[start:stop].tobytes().decode('utf-8')
+            self._strings[string_id] = text
+        return text
+
+    def __len__(self) -> int:
+        return self.rates.rows
+
+    def column(self, field: str) -> np.ndarray:
+        """Numeric column of the rates table (e.g. total_rate) as a NumPy view."""
+        kinds = {name: kind for name, kind, _ in self.rates.fields}
+        if kinds.get(field) not in (KIND_INT, KIND_FLOAT):
+            raise KeyError(f'{field} is not a numeric rate column')
+        return self.rates.columns[field]
+
+    def row_of(self, code: str) -> Optional[int]:
+        """Row of a rate code via the code-sorted permutation (binary search)."""
+        if self._code_order is None:
+            return None
+        codes = self.rates.columns['code']
+        order = self._code_order
+        i = bisect_left(range(len(order)), code, key=lambda k: self.string(int(codes[order[k]])))
+        if i < len(order) and self.string(int(codes[order[i]])) == code:
+            return int(order[i])
+        return None
+
+    def get_rate(self, code: str) -> Optional[Dict]:
+        row = self.row_of(code)
+        return None if row is None else self.rates.record(row)
+
+    def documents(self) -> Iterator[Tuple[str, Dict]]:
+        """Yield (group file name, document) in the original JSON shape."""
+        for group in self.groups:
+            doc = json.loads(group['document'])
+            doc['rates'] = self.rates.records(group['start'], group['stop'])
+            yield group['file'], doc
+
+    def close(self):
+        """Drop array views and unmap the file (deferred while views are still held)."""
+        self._arrays.clear()
+        self.rates = None
+        self._blob = self._offsets = self._code_order = self._all_strings = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+
+def export_json(snapshot: RateSnapshot, output_dir: Path) -> List[Path]:
+    """Write the snapshot back out as group_*.json files."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for filename, doc in snapshot.documents():
+        path = output_dir / filename
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(doc, f, indent=2, ensure_ascii=False)
+        written.append(path)
+    return written
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+def verify(rates_dir: Path, snapshot_path: Path) -> int:
+    """Export the snapshot to a temp dir and compare it with the JSON files."""
+    start = time.perf_counter()
+    sources = {}
+    for path in sorted(Path(rates_dir).glob('group_*.json')):
+        with open(path, 'r', encoding='utf-8') as f:
+            sources[path.name] = json.load(f)
+    json_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    snapshot = RateSnapshot(snapshot_path)
+    open_time = time.perf_counter() - start
+    start = time.perf_counter()
+    documents = dict(snapshot.documents())
+    decode_time = time.perf_counter() - start
+
+    mismatches = [name for name in sources if documents.get(name) != sources[name]]
+    mismatches += [name for name in documents if name not in sources]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in export_json(snapshot, Path(tmp)):
+            if (Path(rates_dir) / path.name).read_bytes() != path.read_bytes():
+                print(f"  Byte difference (data equal): {path.name}" if path.name not in mismatches
+                      else f"  Data mismatch: {path.name}")
+    snapshot.close()
+
+    json_size = sum((Path(rates_dir) / name).stat().st_size for name in sources)
+    print(f"JSON:     {json_size:>10,} bytes, parsed in {json_time * 1000:.1f} ms")
+    print(f"Snapshot: {snapshot_path.stat().st_size:>10,} bytes, opened in {open_time * 1000:.2f} ms, "
+          f"fully decoded in {decode_time * 1000:.1f} ms")
+    if mismatches:
+        print(f"FAILED: {len(mismatches)} group files differ: {', '.join(mismatches)}")
+        return 1
+    print(f"OK: {len(documents)} group files round-trip losslessly")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build, export and verify composite rate snapshots')
+    parser.add_argument('command', choices=('build', 'export', 'verify'))
+    parser.add_argument('output_dir', nargs='?', help='Destination directory for export')
+    parser.add_argument('--rates-dir', default=str(RATES_DIR),
+                        help='Directory holding group_*.json composite files')
+    parser.add_argument('--snapshot', default=str(SNAPSHOT_FILE),
+                        help='Snapshot file path')
+    args = parser.parse_args()
+
+    rates_dir = Path(args.rates_dir)
+    snapshot_path = Path(args.snapshot)
+
+    if args.command == 'build':
+        header = build_snapshot(rates_dir, snapshot_path)
+        rows = header['tables']['rates']['rows']
+        print(f"Wrote {snapshot_path} ({rows} rates, {len(header['groups'])} groups, "
+              f"{snapshot_path.stat().st_size:,} bytes)")
+        return 0
+
+    if args.command == 'export':
+        if not args.output_dir:
+            parser.error('export needs an output directory')
+        snapshot = RateSnapshot(snapshot_path)
+        written = export_json(snapshot, Path(args.output_dir))
+        snapshot.close()
+        print(f"Wrote {len(written)} group files to {args.output_dir}")
+        return 0
+
+    return verify(rates_dir, snapshot_path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
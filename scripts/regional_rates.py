@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Regional views of the composite rate library.
+
+Composites are authored once, at the baseline region (Sydney Metro), and
+au/reference-data/regions.json holds a cost factor per region. Instead of
+keeping a copy of every group file per region, a region's rate is projected
+from the baseline when it is read: money fields are scaled by
+
+    target region factor / factor of the region the rate was authored in
+
+and rounded to cents. Projections are cached per (region, code) in a
+bounded LRU, and baseline rates are read by byte span through RateLookup,
+so memory and disk hold one copy of the library:
+
+    view = RegionalView()
+    view.get_rate('NT', 'GRP2-TIMFRA-014')
+
+Quantities, hours and resource references are unchanged; resource-linked
+components carry no price of their own and are re-priced per region by
+reprice_composites.py. ``materialise`` writes full per-region group files
+(one directory per region) for bulk loading into Supabase:
+
+    python regional_rates.py regions
+    python regional_rates.py get --region NT GRP2-TIMFRA-014
+    python regional_rates.py materialise --region NT --region ADL_METRO
+    python regional_rates.py materialise --region all
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from rate_io import GroupFileWriter, IndexWriter, iter_json_array
+from rate_lookup import INDEX_FILE, RATES_DIR, RateLookup
+
+BASE_DIR = Path(__file__).parent.parent
+REGIONS_FILE = BASE_DIR / 'au' / 'reference-data' / 'regions.json'
+MATERIALISE_DIR = BASE_DIR / 'au' / 'seed-data' / 'regional'
+
+DEFAULT_CACHE_SIZE = 4096
+
+# Rate and component fields holding money amounts
+TOTAL_FIELDS = ('labour_total', 'materials_total', 'plant_total', 'nett_total', 'total_rate')
+ITEM_PRICE_FIELDS = ('rate', 'unit_rate', 'cost', 'cost_per_unit', 'rate_per_hour')
+SLOTS = ('labour', 'materials', 'plant')
+
+
+def load_regions(path: Path = REGIONS_FILE) -> List[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['regions']
+
+
+class Regions:
+    """Region records resolvable by code or name (case-insensitive)."""
+
+    def __init__(self, regions: Iterable[Dict]):
+        self.regions = list(regions)
+        self._by_key = {}
+        for region in self.regions:
+            self._by_key[region['code'].lower()] = region
+            self._by_key[region['name'].lower()] = region
+        self.baseline = next((r for r in self.regions if r.get('is_baseline')), self.regions[0])
+
+    def __getitem__(self, key: str) -> Dict:
+        try:
+            return self._by_key[str(key).lower()]
+        except KeyError:
+            raise KeyError(f'Unknown region: {key}') from None
+
+    def resolve(self, keys: Iterable[str]) -> List[Dict]:
+        """Region records for keys; 'all' selects every region."""
+        keys = list(keys)
+        if any(str(k).lower() == 'all' for k in keys):
+            return list(self.regions)
+        return [self[k] for k in keys]
+
+    def source(self, rate: Dict) -> Dict:
+        """Region a rate was authored in (baseline if missing or unknown)."""
+        return self._by_key.get(str(rate.get('region', '')).lower(), self.baseline)
+
+
+def _scale_item(item: Dict, ratio: float) -> Dict:
+    if not any(item.get(field) is not None for field in ITEM_PRICE_FIELDS):
+        return item
+    scaled = dict(item)
+    for field in ITEM_PRICE_FIELDS:
+        if isinstance(scaled.get(field), (int, float)):
+            scaled[field] = round(scaled[field] * ratio, 2)
+    return scaled
+
+
+def project_rate(rate: Dict, region: Dict, regions: Regions) -> Dict:
+    """
+    Return rate as priced in region.
+
+    Unchanged nested structures are shared with the baseline rate, so the
+    result must be treated as read-only.
+    """
+    ratio = float(region['factor']) / float(regions.source(rate)['factor'])
+    if ratio == 1.0 and rate.get('region') == region['name']:
+        return rate
+
+    projected = dict(rate, region=region['name'])
+    for field in TOTAL_FIELDS:
+        if isinstance(rate.get(field), (int, float)):
+            projected[field] = round(rate[field] * ratio, 2)
+    components = rate.get('components')
+    if isinstance(components, dict):
+        projected['components'] = {slot: [_scale_item(item, ratio) for item in items]
+                                   for slot, items in components.items()}
+    for slot in SLOTS:
+        if isinstance(rate.get(slot), list):
+            projected[slot] = [_scale_item(item, ratio) for item in rate[slot]]
+    return projected
+
+
+class RegionalView:
+    """Lazily projected, cached per-region rates over one baseline library."""
+
+    def __init__(self, lookup: Optional[RateLookup] = None, regions: Optional[Regions] = None,
+                 cache_size: int = DEFAULT_CACHE_SIZE):
+        self.lookup = lookup or RateLookup()
+        self.regions = regions or Regions(load_regions())
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[Tuple[str, str], Dict]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_rates(self, region: str, codes: Iterable[str]) -> Dict[str, Dict]:
+        """Return {code: rate in region} for the known codes."""
+        record = self.regions[region]
+        result = {}
+        missing = []
+        for code in codes:
+            key = (record['code'], code)
+            rate = self._cache.get(key)
+            if rate is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                result[code] = rate
+            else:
+                missing.append(code)
+
+        for code, rate in self.lookup.get_rates(missing).items():
+            projected = project_rate(rate, record, self.regions)
+            self.misses += 1
+            self._cache[(record['code'], code)] = projected
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            result[code] = projected
+        return result
+
+    def get_rate(self, region: str, code: str) -> Optional[Dict]:
+        """Return one rate in region, or None if the code is not indexed."""
+        return self.get_rates(region, [code]).get(code)
+
+
+def iter_group_files(rates_dir: Path, index_path: Path = INDEX_FILE) -> Iterator[Tuple[str, Dict, Path]]:
+    """(group key, group index entry, path) in index order."""
+    with open(index_path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    for key, entry in index['groups'].items():
+        yield key, entry, Path(rates_dir) / entry['file']
+
+
+def _group_meta(path: Path, chunk: int = 4096) -> Dict:
+    """The group file's meta object, read without parsing the rates array."""
+    with open(path, 'r', encoding='utf-8') as f:
+        head = ''
+        while True:
+            data = f.read(chunk)
+            head += data
+            start = head.find('"meta"')
+            if start >= 0 and '{' in head[start:]:
+                try:
+                    meta, _ = json.JSONDecoder().raw_decode(head[head.index('{', start):])
+                    return meta
+                except ValueError:
+                    pass
+            if not data:
+                return {}
+
+
+def materialise(regions: List[Dict], all_regions: Regions, rates_dir: Path = RATES_DIR,
+                out_dir: Path = MATERIALISE_DIR, index_path: Path = INDEX_FILE) -> Dict[str, int]:
+    """
+    Write every group file of each region under out_dir/<REGION_CODE>/.
+
+    Rates are streamed group by group and written as they are projected,
+    so memory holds one rate per region at a time. Nothing is replaced
+    until every region has been written; on error the existing files are
+    left as they were.
+    """
+    writers: List[GroupFileWriter] = []
+    indexes: List[IndexWriter] = []
+    counts = {}
+    try:
+        for region in regions:
+            region_dir = Path(out_dir) / region['code']
+            os.makedirs(region_dir, exist_ok=True)
+            index = IndexWriter(str(region_dir / 'composite_rates_index.json'))
+            indexes.append(index)
+            total = 0
+            for key, entry, path in iter_group_files(rates_dir, index_path):
+                meta = dict(_group_meta(path), region=region['name'], region_code=region['code'],
+                            region_factor=region['factor'])
+                writer = GroupFileWriter(str(region_dir / entry['file']), meta)
+                writers.append(writer)
+                index.add_group(key, entry.get('name', ''), entry['file'])
+                for rate in iter_json_array(str(path), 'rates'):
+                    writer.write(project_rate(rate, region, all_regions))
+                    index.add_code(key, rate.get('code'))
+                total += writer.count
+            counts[region['code']] = total
+    except BaseException:
+        for writer in writers + indexes:
+            writer.abort()
+        raise
+    for writer in writers + indexes:
+        writer.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Regional views of the composite rate library')
+    parser.add_argument('command', choices=('regions', 'get', 'materialise'))
+    parser.add_argument('codes', nargs='*', help='Rate codes for "get"')
+    parser.add_argument('--region', action='append', default=[],
+                        help='Region code or name (repeatable; "all" for materialise)')
+    parser.add_argument('--regions-file', default=str(REGIONS_FILE), help='regions.json path')
+    parser.add_argument('--rates-dir', default=str(RATES_DIR),
+                        help='Directory holding group_*.json composite files')
+    parser.add_argument('--index', default=str(INDEX_FILE), help='composite_rates_index.json path')
+    parser.add_argument('--output', default=str(MATERIALISE_DIR), help='Output directory for materialise')
+    args = parser.parse_intermixed_args()
+
+    regions = Regions(load_regions(Path(args.regions_file)))
+    try:
+        selected = regions.resolve(args.region)
+    except KeyError as e:
+        print(f"ERROR: {e.args[0]}", file=sys.stderr)
+        return 1
+
+    if args.command == 'regions':
+        for region in regions.regions:
+            marker = '  (baseline)' if region is regions.baseline else ''
+            print(f"{region['code']:<14} {region['factor']:>5.2f}  {region['name']}{marker}")
+        return 0
+
+    if args.command == 'materialise':
+        if not selected:
+            parser.error('materialise needs at least one --region')
+        start = time.perf_counter()
+        counts = materialise(selected, regions, Path(args.rates_dir), Path(args.output), Path(args.index))
+        for code, count in counts.items():
+            print(f"Wrote {count} rates: {Path(args.output) / code}")
+        print(f"Materialised {len(counts)} regions in {time.perf_counter() - start:.2f}s")
+        return 0
+
+    if len(selected) != 1:
+        parser.error('get needs exactly one --region')
+    view = RegionalView(RateLookup(Path(args.index), Path(args.rates_dir)), regions)
+    rates = view.get_rates(selected[0]['code'], args.codes)
+    for code in args.codes:
+        if code not in rates:
+            print(f"ERROR: Unknown rate code: {code}", file=sys.stderr)
+    json.dump([rates[c] for c in args.codes if c in rates], sys.stdout, indent=2, ensure_ascii=False)
+    print()
+    return 0 if len(rates) == len(set(args.codes)) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Re-price resource-linked composite rates in bulk.
+
+After link_resources.py, composite components reference LAB/MAT/PLT
+resources by resource_id and qty, while labour_total, materials_total and
+total_rate still carry the old heuristic values. This script resolves every
+referenced resource_id against a price table once, holds component
+quantities as a sparse (composites x resources) matrix per slot, and
+re-derives the totals for the whole library with one sparse product:
+
+    slot_total = inline_cost + Q_slot @ prices
+
+Inline allowances (description + rate, no resource_id) contribute a constant
+per composite. Waste applies to materials via material_waste_factor and OHP
+via ohp_percent, as in update_waste_factors.py. Composites referencing a
+resource without a price keep their existing totals and are reported.
+
+With --incremental, the reverse index written by link_resources.py
+(resource_dependents_index.json) selects only the composites and group
+files that use the changed resources, so a price update costs time in
+proportion to its blast radius rather than the library size.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set
+
+import numpy as np
+
+from costing_kernel import py_round, rollup_waste_update
+from link_resources import INTL_DIR, ReverseIndex, get_plant_resources
+from resource_catalogue import ResourceCatalogue
+
+BASE_DIR = Path(__file__).parent.parent
+RATES_DIR = BASE_DIR / 'au' / 'seed-data' / 'composite_rates'
+LABOUR_RATES_FILE = os.path.join(INTL_DIR, 'resources', 'labour-rates.json')
+MATERIALS_DIR = os.path.join(INTL_DIR, 'resources')
+REVERSE_INDEX_FILE = RATES_DIR.parent / 'resource_dependents_index.json'
+
+SLOTS = ('labour', 'materials', 'plant')
+TOTAL_FIELDS = ('labour_total', 'materials_total', 'plant_total', 'nett_total', 'total_rate')
+
+# Record fields holding a unit price, in order of preference
+PRICE_FIELDS = ('total_rate', 'rate', 'unit_rate', 'price')
+
+DEFAULT_WASTE_FACTOR = 1.05
+DEFAULT_OHP_PERCENT = 15
+
+
+def resource_price(record: Optional[Mapping]) -> Optional[float]:
+    """Return the unit price of a resource record, or None."""
+    if not record:
+        return None
+    for field in PRICE_FIELDS:
+        value = record.get(field)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+    return None
+
+
+def load_labour_rates(path: str) -> Dict[str, Dict]:
+    """Load labour-rates.json keyed by resource_id ({} if missing)."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        print(f"  WARNING: labour rates not found: {path}", file=sys.stderr)
+        return {}
+    return {r['resource_id']: r for r in data['rates']}
+
+
+class PriceTable:
+    """
+    Unit prices by resource_id, resolved from resource libraries.
+
+    Sources are searched in order; overrides take precedence over all of
+    them. Library records are only read for the IDs that are resolved.
+    """
+
+    def __init__(self, sources: Sequence[Mapping[str, Mapping]] = (),
+                 overrides: Optional[Mapping[str, float]] = None):
+        self.sources = list(sources)
+        self.overrides = dict(overrides or {})
+
+    def price(self, resource_id: str) -> Optional[float]:
+        if resource_id in self.overrides:
+            return float(self.overrides[resource_id])
+        for source in self.sources:
+            if resource_id in source:
+                return resource_price(source.get(resource_id))
+        return None
+
+    def resolve(self, resource_ids: Sequence[str]) -> np.ndarray:
+        """Price vector for resource_ids, NaN where no price is known."""
+        prices = np.full(len(resource_ids), np.nan)
+        for j, resource_id in enumerate(resource_ids):
+            price = self.price(resource_id)
+            if price is not None:
+                prices[j] = price
+        return prices
+
+
+class SlotMatrix:
+    """Sparse (composites x resources) quantity matrix in coordinate form."""
+
+    def __init__(self, n_rows: int, rows: List[int], cols: List[int], qty: List[float]):
+        self.n_rows = n_rows
+        self.rows = np.asarray(rows, dtype=np.intp)
+        self.cols = np.asarray(cols, dtype=np.intp)
+        self.qty = np.asarray(qty, dtype=np.float64)
+
+    def dot(self, prices: np.ndarray) -> np.ndarray:
+        """Row sums of qty * price (the sparse matrix-vector product)."""
+        return np.bincount(self.rows, weights=self.qty * prices[self.cols], minlength=self.n_rows)
+
+
+class CompositeCostMatrix:
+    """Component quantities and inline costs of a composite library."""
+
+    def __init__(self, composites: Sequence[Dict]):
+        self.codes = [c.get('code') for c in composites]
+        n = len(composites)
+
+        self.columns: Dict[str, int] = {}
+        coords = {slot: ([], [], []) for slot in SLOTS}
+        self.inline = {slot: np.zeros(n) for slot in SLOTS}
+
+        for i, composite in enumerate(composites):
+            components = composite.get('components', {})
+            for slot in SLOTS:
+                rows, cols, qty = coords[slot]
+                inline = 0.0
+                for item in components.get(slot, []):
+                    resource_id = item.get('resource_id')
+                    if resource_id:
+                        rows.append(i)
+                        cols.append(self.columns.setdefault(resource_id, len(self.columns)))
+                        qty.append(item.get('qty', 0))
+                    else:
+                        inline += item.get('qty', 0) * item.get('rate', 0)
+                self.inline[slot][i] = inline
+
+        self.resource_ids = list(self.columns)
+        self.slots = {slot: SlotMatrix(n, *coords[slot]) for slot in SLOTS}
+        self.waste_factor = np.array([c.get('material_waste_factor', DEFAULT_WASTE_FACTOR) for c in composites],
+                                     dtype=np.float64)
+        self.ohp_percent = np.array([c.get('ohp_percent', DEFAULT_OHP_PERCENT) for c in composites],
+                                    dtype=np.float64)
+        self.prices = np.full(len(self.resource_ids), np.nan)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def bind(self, price_table: PriceTable):
+        """Resolve every referenced resource_id against the price table once."""
+        self.prices = price_table.resolve(self.resource_ids)
+
+    def set_prices(self, updates: Mapping[str, float]) -> List[str]:
+        """Update unit prices in place; returns the IDs the library references."""
+        applied = []
+        for resource_id, price in updates.items():
+            j = self.columns.get(resource_id)
+            if j is not None:
+                self.prices[j] = price
+                applied.append(resource_id)
+        return applied
+
+    def unresolved_ids(self) -> List[str]:
+        return [rid for rid, price in zip(self.resource_ids, self.prices.tolist()) if np.isnan(price)]
+
+    def reprice(self) -> Dict[str, np.ndarray]:
+        """
+        Re-derive slot totals, nett_total and total_rate for every composite.
+
+        ``resolved`` is False for composites referencing an unpriced resource;
+        their totals are NaN.
+        """
+        missing = np.isnan(self.prices)
+        unresolved = np.zeros(len(self), dtype=bool)
+        totals = {}
+        for slot, field in zip(SLOTS, TOTAL_FIELDS):
+            matrix = self.slots[slot]
+            if missing.any() and matrix.rows.size:
+                unresolved |= np.bincount(matrix.rows, weights=missing[matrix.cols], minlength=len(self)) > 0
+            totals[field] = py_round(self.inline[slot] + matrix.dot(np.nan_to_num(self.prices)), 2)
+
+        rollup = rollup_waste_update(
+            totals['labour_total'], totals['materials_total'], totals['plant_total'],
+            waste_factor=self.waste_factor, ohp_percent=self.ohp_percent)
+        totals.update(rollup)
+        for field in TOTAL_FIELDS:
+            totals[field][unresolved] = np.nan
+        totals['resolved'] = ~unresolved
+        return totals
+
+
+def apply_totals(composites: Sequence[Dict], totals: Dict[str, np.ndarray],
+                 rows: Optional[Iterable[int]] = None) -> List[int]:
+    """Write re-derived totals back to resolved composites; returns changed rows."""
+    resolved = totals['resolved']
+    columns = {field: totals[field].tolist() for field in TOTAL_FIELDS}
+    changed = []
+    for i in (range(len(composites)) if rows is None else rows):
+        if not resolved[i]:
+            continue
+        composite = composites[i]
+        dirty = False
+        for field in TOTAL_FIELDS:
+            value = columns[field][i]
+            if composite.get(field) != value:
+                composite[field] = value
+                dirty = True
+        if dirty:
+            changed.append(i)
+    return changed
+
+
+def load_library(rates_dir: Path, selection: Optional[Mapping[str, Set[str]]] = None):
+    """
+    Load group files; returns (documents by path, composites, owning path per composite).
+
+    With a selection ({group_file: codes}), only those files are read and
+    only the listed composites are returned.
+    """
+    documents = {}
+    composites = []
+    owners = []
+    if selection is None:
+        paths = sorted(Path(rates_dir).glob('group_*.json'))
+    else:
+        paths = [Path(rates_dir) / name for name in sorted(selection)]
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        documents[path] = data
+        codes = None if selection is None else selection[path.name]
+        for rate in data.get('rates', []):
+            if codes is None or rate.get('code') in codes:
+                composites.append(rate)
+                owners.append(path)
+    return documents, composites, owners
+
+
+def write_documents(documents: Mapping[Path, Dict], paths: Iterable[Path]):
+    for path in paths:
+        # Write via a temp file, so a crash mid-write never leaves a
+        # truncated group file behind
+        fd, tmp_path = tempfile.mkstemp(prefix=f'.{path.name}.', suffix='.tmp', dir=path.parent)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(documents[path], f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp creates files as 0600; keep the original permissions
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def parse_price_overrides(values: Sequence[str]) -> Dict[str, float]:
+    overrides = {}
+    for value in values:
+        resource_id, sep, price = value.partition('=')
+        if not sep:
+            raise argparse.ArgumentTypeError(f'expected RESOURCE_ID=PRICE, got {value!r}')
+        overrides[resource_id.strip()] = float(price)
+    return overrides
+
+
+def build_price_table(labour_rates: str, materials_dir: Optional[str],
+                      overrides: Mapping[str, float]) -> PriceTable:
+    sources = [load_labour_rates(labour_rates), get_plant_resources()]
+    if materials_dir and os.path.isdir(materials_dir):
+        sources.append(ResourceCatalogue(materials_dir, prefix='MAT_AU_'))
+    return PriceTable(sources, overrides)
+
+
+def report_reprice(matrix: CompositeCostMatrix, totals: Dict[str, np.ndarray], elapsed: float):
+    resolved = int(totals['resolved'].sum())
+    print(f"Resources referenced: {len(matrix.resource_ids)}")
+    print(f"Re-priced {len(matrix)} composites in {elapsed * 1000:.2f} ms "
+          f"({resolved} resolved, {len(matrix) - resolved} skipped)")
+    for resource_id in matrix.unresolved_ids():
+        print(f"  No price for {resource_id}")
+
+
+def reprice(composites: Sequence[Dict], price_table: PriceTable) -> List[int]:
+    """Re-price composites in one pass and write totals back; returns changed rows."""
+    matrix = CompositeCostMatrix(composites)
+    matrix.bind(price_table)
+
+    start = time.perf_counter()
+    totals = matrix.reprice()
+    report_reprice(matrix, totals, time.perf_counter() - start)
+
+    changed = apply_totals(composites, totals)
+    print(f"Composites with changed totals: {len(changed)}")
+    return changed
+
+
+def load_reverse_index(path: Path, rates_dir: Path, rebuild: bool = False) -> ReverseIndex:
+    """Load the persisted reverse index, rebuilding it from the library if asked or missing."""
+    if not rebuild and path.exists():
+        return ReverseIndex.load(path)
+    print(f"Building reverse index from {rates_dir}...")
+    index = ReverseIndex.from_rates_dir(rates_dir)
+    if index.write(path):
+        print(f"Reverse index written to: {path} ({len(index.dependents)} resources)")
+    else:
+        print(f"Reverse index unchanged: {path}")
+    return index
+
+
+def run_incremental(rates_dir: Path, reverse_index: ReverseIndex, price_table: PriceTable,
+                    resource_ids: Iterable[str], write: bool) -> int:
+    """Re-price only the composites that depend on resource_ids."""
+    selection = reverse_index.affected(resource_ids)
+    expected = sum(len(codes) for codes in selection.values())
+    print(f"Affected: {expected} composites in {len(selection)} group files")
+    if not selection:
+        return 0
+
+    documents, composites, owners = load_library(rates_dir, selection)
+    if len(composites) != expected:
+        print(f"  WARNING: {expected - len(composites)} indexed composites not found; "
+              f"rebuild the index with --rebuild-index", file=sys.stderr)
+
+    changed = reprice(composites, price_table)
+    if write and changed:
+        paths = sorted({owners[i] for i in changed})
+        write_documents(documents, paths)
+        print(f"Wrote {len(paths)} group files")
+    return len(changed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-price resource-linked composite rates in bulk')
+    parser.add_argument('--rates-dir', default=str(RATES_DIR),
+                        help='Directory holding group_*.json composite files')
+    parser.add_argument('--labour-rates', default=LABOUR_RATES_FILE,
+                        help='labour-rates.json with LAB_AU_* resources')
+    parser.add_argument('--materials-dir', default=MATERIALS_DIR,
+                        help='Directory holding MAT_AU_*.json resources')
+    parser.add_argument('--set', dest='prices', action='append', default=[], metavar='RESOURCE_ID=PRICE',
+                        help='Override a resource unit price (repeatable)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only re-price composites that use the --set resources')
+    parser.add_argument('--reverse-index', default=str(REVERSE_INDEX_FILE),
+                        help='resource_id -> composites index written by link_resources.py')
+    parser.add_argument('--rebuild-index', action='store_true',
+                        help='Rebuild the reverse index from the group files')
+    parser.add_argument('--write', action='store_true',
+                        help='Write changed group files (default: report only)')
+    args = parser.parse_args()
+
+    rates_dir = Path(args.rates_dir)
+    overrides = parse_price_overrides(args.prices)
+    price_table = build_price_table(args.labour_rates, args.materials_dir, overrides)
+
+    if args.incremental or args.rebuild_index:
+        reverse_index = load_reverse_index(Path(args.reverse_index), rates_dir, args.rebuild_index)
+        if args.incremental:
+            if not overrides:
+                parser.error('--incremental needs at least one --set RESOURCE_ID=PRICE')
+            run_incremental(rates_dir, reverse_index, price_table, overrides, args.write)
+        return 0
+
+    documents, composites, owners = load_library(rates_dir)
+    print(f"Loaded {len(composites)} composites from {len(documents)} group files")
+
+    changed = reprice(composites, price_table)
+    if args.write and changed:
+        paths = sorted({owners[i] for i in changed})
+        write_documents(documents, paths)
+        print(f"Wrote {len(paths)} group files")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""Lazy, indexed catalogue of per-file resource records.
+
+Resource libraries such as ``resources/MAT_AU_*.json`` hold one record per
+file. The catalogue only builds a manifest of resource IDs up front, either
+from the persisted ``resources_index.json`` or from a directory scan, and
+reads individual records on first access behind an LRU cache. Files that
+fail to parse are recorded once in ``errors`` and reported instead of being
+silently skipped. Reading never writes to the resources directory; pass
+``persist_index=True`` to save the scanned manifest as the index.
+"""
+import json
+import os
+import sys
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+INDEX_FILENAME = 'resources_index.json'
+INDEX_VERSION = 1
+DEFAULT_CACHE_SIZE = 256
+
+
+class ManifestEntry(NamedTuple):
+    """File location and stat signature of a single resource record."""
+    file: str
+    mtime_ns: int
+    size: int
+
+
+class ResourceLoadError(ValueError):
+    """Raised when a resource record cannot be read or parsed."""
+
+
+class ResourceCatalogue(Mapping):
+    """
+    Read-only mapping of resource_id -> record for a resources directory.
+
+    Membership tests, ``len`` and iteration only use the manifest. The
+    persisted index is reused while the directory mtime it recorded is
+    unchanged (no file added or removed); otherwise the directory is
+    rescanned, and the index rewritten only when ``persist_index`` is set.
+    A record whose file stat no longer matches its manifest entry is still
+    read, and the entry is refreshed. A record that fails to read is not
+    retried until ``refresh``.
+    """
+
+    def __init__(self, res_dir: str, prefix: str = 'MAT_AU_',
+                 cache_size: int = DEFAULT_CACHE_SIZE, persist_index: bool = False):
+        self.res_dir = res_dir
+        self.prefix = prefix
+        self.index_path = os.path.join(res_dir, INDEX_FILENAME)
+        self.persist_index = persist_index
+        self.errors: List[Dict[str, str]] = []
+        self.manifest_source = None
+        self._failed: Dict[str, ResourceLoadError] = {}
+        self._manifest: Dict[str, ManifestEntry] = self._load_manifest()
+        self._read = lru_cache(maxsize=cache_size)(self._read_record)
+
+    # -------------------------------------------------------------------------
+    # Manifest
+    # -------------------------------------------------------------------------
+
+    def _load_manifest(self) -> Dict[str, ManifestEntry]:
+        manifest = self._read_index()
+        if manifest is not None:
+            self.manifest_source = 'index'
+            return manifest
+
+        manifest = self._scan()
+        self.manifest_source = 'scan'
+        if self.persist_index:
+            self._write_index(manifest)
+        return manifest
+
+    def _read_index(self) -> Optional[Dict[str, ManifestEntry]]:
+        """Return the persisted manifest, or None if missing or stale."""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self._report(INDEX_FILENAME, self.index_path, f'unreadable index, rescanning: {e}')
+            return None
+
+        if (index.get('version') != INDEX_VERSION
+                or index.get('prefix') != self.prefix
+                or index.get('dir_mtime_ns') != os.stat(self.res_dir).st_mtime_ns):
+            return None
+        return {
+            res_id: ManifestEntry(entry['file'], entry['mtime_ns'], entry['size'])
+            for res_id, entry in index.get('resources', {}).items()
+        }
+
+    def _scan(self) -> Dict[str, ManifestEntry]:
+        manifest = {}
+        with os.scandir(self.res_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.startswith(self.prefix) and name.endswith('.json') and entry.is_file():
+                    st = entry.stat()
+                    manifest[name[:-len('.json')]] = ManifestEntry(name, st.st_mtime_ns, st.st_size)
+        return dict(sorted(manifest.items()))
+
+    def _write_index(self, manifest: Dict[str, ManifestEntry]):
+        try:
+            # Creating the index changes the directory mtime, rewriting it in
+            # place does not; create it first so the recorded mtime is final.
+            # A torn write only makes the index unreadable, which rescans.
+            if not os.path.exists(self.index_path):
+                open(self.index_path, 'w').close()
+            index = {
+                'version': INDEX_VERSION,
+                'prefix': self.prefix,
+                'dir_mtime_ns': os.stat(self.res_dir).st_mtime_ns,
+                'count': len(manifest),
+                'resources': {res_id: entry._asdict() for res_id, entry in manifest.items()},
+            }
+            with open(self.index_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f, indent=2)
+        except OSError as e:
+            self._report(INDEX_FILENAME, self.index_path, f'could not persist index: {e}')
+
+    def refresh(self):
+        """Rescan the directory, drop cached records and errors, and rewrite the index if persisted."""
+        self._manifest = self._scan()
+        self.manifest_source = 'scan'
+        if self.persist_index:
+            self._write_index(self._manifest)
+        self._read.cache_clear()
+        self._failed.clear()
+        self.errors.clear()
+
+    # -------------------------------------------------------------------------
+    # Records
+    # -------------------------------------------------------------------------
+
+    def _report(self, res_id: str, path: str, message: str):
+        self.errors.append({'resource_id': res_id, 'path': path, 'error': message})
+        print(f"  WARNING: {res_id}: {message}", file=sys.stderr)
+
+    def _read_record(self, res_id: str) -> Dict:
+        entry = self._manifest[res_id]
+        path = os.path.join(self.res_dir, entry.file)
+        try:
+            st = os.stat(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self._report(res_id, path, str(e))
+            error = self._failed[res_id] = ResourceLoadError(f'{res_id}: {e}')
+            raise error from e
+
+        if (st.st_mtime_ns, st.st_size) != (entry.mtime_ns, entry.size):
+            self._manifest[res_id] = ManifestEntry(entry.file, st.st_mtime_ns, st.st_size)
+        return data
+
+    def __getitem__(self, res_id: str) -> Dict:
+        if res_id not in self._manifest:
+            raise KeyError(res_id)
+        if res_id in self._failed:
+            raise self._failed[res_id]
+        return self._read(res_id)
+
+    def get(self, res_id: str, default=None):
+        """Return the record, or default if it is missing or unreadable."""
+        try:
+            return self[res_id]
+        except (KeyError, ResourceLoadError):
+            return default
+
+    def __contains__(self, res_id) -> bool:
+        return res_id in self._manifest
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._manifest)
+
+    def __len__(self) -> int:
+        return len(self._manifest)
+
+    def validate(self) -> List[Dict[str, str]]:
+        """Read every record once and return the accumulated parse errors."""
+        for res_id in self._manifest:
+            self.get(res_id)
+        return self.errors
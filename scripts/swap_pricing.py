@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Swap-delta pricing for template applicable_swaps.
+
+A swap (e.g. cladding -> timber_weatherboard) replaces the composite of the
+scope items its category touches and leaves every other line alone, so its
+cost is a delta over the template's priced baseline rather than a new
+estimate. SWAP_CATEGORIES lists, per category, the NRM level 2 codes and
+description keywords that identify touched items and, per option, the
+composite each keyword swaps to, by exact composite name. ``baseline`` is
+the scope as expanded. An option whose composite is missing from the
+library, or priced in a different unit from the line it replaces, is
+reported as unresolved rather than priced at the baseline rate.
+
+Each scope line belongs to at most one category, so swap deltas are
+additive and a combination costs baseline + sum of its deltas. Options of
+each category are sorted by delta and combinations are enumerated lazily in
+ascending total from a heap, stopping at ``max_total``; hundreds or
+thousands of permutations cost one heap step each:
+
+    python swap_pricing.py options au-res-3bed-house-150 --region NT
+    python swap_pricing.py swap au-res-3bed-house-150 --set cladding=timber_weatherboard
+    python swap_pricing.py enumerate au-res-3bed-house-150 --max-total 450000 --limit 20
+    python swap_pricing.py --bench
+"""
+import argparse
+import heapq
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from costing_kernel import py_round
+from template_estimates import BUILD_SETS_FILE, RATES_DIR, TEMPLATE_MATRIX, TemplateExpander, normalise_unit
+
+BASELINE = 'baseline'
+
+# category -> NRM level 2 codes of touched items, the keywords (matched in
+# order against the item description) and per option {keyword: composite}
+SWAP_CATEGORIES = {
+    'cladding': {
+        'nrm': ('2.5',),
+        'keywords': ('external wall',),
+        'options': {
+            'brick_veneer': {'external wall': 'External wall - brick veneer, insulated, plaster'},
+            'timber_weatherboard': {'external wall': 'External wall - timber frame, weatherboard, plaster'},
+            'fibre_cement': {'external wall': 'External wall - timber frame, fibre cement, plaster'},
+            'rendered_masonry': {'external wall': 'External wall - rendered block, insulated, plaster'},
+            'metal_cladding': {'external wall': 'External wall - metal cladding, insulated'},
+            'cavity_brick_block': {'external wall': 'External wall - cavity brick/block, insulated, plaster'},
+        },
+    },
+    'roofing': {
+        'nrm': ('2.3',),
+        'keywords': ('roofing',),
+        'options': {
+            'colorbond_metal': {'roofing': 'Roof sheeting - Colorbond corrugated'},
+            'concrete_tiles': {'roofing': 'Roof tiles - concrete interlocking'},
+            'terracotta_tiles': {'roofing': 'Roof tiles - terracotta'},
+            'metal_deck': {'roofing': 'Roof sheeting - Colorbond Klip-lok'},
+        },
+    },
+    'flooring': {
+        'nrm': ('3.2',),
+        'keywords': ('flooring', 'carpet'),
+        'options': {
+            'carpet': {'flooring': 'Floor finish - carpet broadloom, standard',
+                       'carpet': 'Floor finish - carpet broadloom, standard'},
+            'timber_flooring': {'flooring': 'Floor finish - engineered timber',
+                                'carpet': 'Floor finish - engineered timber'},
+            'tiles': {'flooring': 'Floor finish - porcelain tile 600x600',
+                      'carpet': 'Floor finish - porcelain tile 600x600'},
+            'polished_concrete': {'flooring': 'Floor finish - polished concrete',
+                                  'carpet': 'Floor finish - polished concrete'},
+        },
+    },
+    'windows': {
+        'nrm': ('2.6',),
+        'keywords': ('window',),
+        'options': {
+            'aluminium': {'window': 'Window - aluminium sliding, double glazed'},
+            'timber_frames': {'window': 'Window - timber casement, double glazed'},
+            'upvc': {'window': 'Window - uPVC, double glazed'},
+        },
+    },
+    'kitchen': {
+        'nrm': ('4.1', '5.1'),
+        'keywords': ('kitchen cabinetry', 'kitchen sink'),
+        'options': {
+            'standard': {'kitchen cabinetry': 'Kitchen - joinery only, per linear metre',
+                         'kitchen sink': 'Kitchen mixer - standard'},
+            'premium': {'kitchen cabinetry': 'Kitchen benchtop - stone composite',
+                        'kitchen sink': 'Kitchen mixer - pull out spray'},
+        },
+    },
+    'bathroom': {
+        'nrm': ('4.1', '5.1'),
+        'keywords': ('vanity', 'shower screen', 'toilet'),
+        'options': {
+            'standard': {'vanity': 'Vanity - standard 900mm',
+                         'shower screen': 'Shower screen - semi-frameless',
+                         'toilet': 'WC suite - close coupled, standard'},
+            'premium': {'vanity': 'Vanity - premium double',
+                        'shower screen': 'Shower screen - frameless',
+                        'toilet': 'WC suite - wall hung'},
+        },
+    },
+}
+
+
+class CategorySwaps:
+    """Touched lines of one category and the replacement rows per option."""
+
+    def __init__(self, category: str, lines: np.ndarray, options: Dict[str, np.ndarray],
+                 unresolved: Optional[Dict[str, str]] = None):
+        self.category = category
+        self.lines = lines
+        self.options = options  # option -> replacement rows aligned with lines
+        self.unresolved = unresolved or {}  # option -> reason it cannot be priced
+
+    def distinct(self) -> List[str]:
+        """Options with distinct replacement rows, first name of each kept."""
+        seen, names = set(), []
+        for option, rows in self.options.items():
+            key = rows.tobytes()
+            if key not in seen:
+                seen.add(key)
+                names.append(option)
+        return names
+
+
+class TemplateSwaps:
+    """Swap rules of one template resolved against its expanded scope."""
+
+    def __init__(self, expander: TemplateExpander, template_id: str,
+                 categories: Mapping[str, Mapping] = SWAP_CATEGORIES):
+        self.expanded = expander.expand(template_id)
+        self.template_id = template_id
+        self.categories: Dict[str, CategorySwaps] = {}
+        self.unsupported: List[str] = []
+
+        claimed = np.zeros(len(self.expanded.rows), dtype=bool)
+        for category in self.expanded.template.get('applicable_swaps', []):
+            rules = categories.get(category)
+            if rules is None:
+                self.unsupported.append(category)
+                continue
+            lines, keywords = [], []
+            for line, item in enumerate(self.expanded.items):
+                if claimed[line] or not self.expanded.resolved[line] or item['nrm_level2_code'] not in rules['nrm']:
+                    continue
+                text = (item['description'] or '').lower()
+                keyword = next((k for k in rules['keywords'] if k in text), None)
+                if keyword:
+                    lines.append(line)
+                    keywords.append(keyword)
+            lines = np.array(lines, dtype=np.int64)
+            claimed[lines] = True
+
+            base_rows = self.expanded.rows[lines]
+            options, unresolved = {BASELINE: base_rows}, {}
+            for option, targets in rules['options'].items():
+                rows = base_rows.copy()
+                for i, (line, keyword) in enumerate(zip(lines, keywords)):
+                    if keyword not in targets:
+                        continue
+                    row = expander.index.rows_by_name.get(targets[keyword])
+                    unit = self.expanded.items[line]['unit']
+                    if row is None:
+                        unresolved[option] = f'no composite named {targets[keyword]!r}'
+                        break
+                    target_unit = normalise_unit(expander.index.composites[row].get('unit'))
+                    if target_unit != unit:
+                        unresolved[option] = f'{targets[keyword]!r} is priced per {target_unit}, not {unit}'
+                        break
+                    rows[i] = row
+                else:
+                    options[option] = rows
+            self.categories[category] = CategorySwaps(category, lines, options, unresolved)
+
+
+class SwapEngine:
+    """Priced baselines and swap deltas per (template, region)."""
+
+    def __init__(self, expander: TemplateExpander, categories: Mapping[str, Mapping] = SWAP_CATEGORIES):
+        self.expander = expander
+        self.rules = categories
+        self._swaps: Dict[str, TemplateSwaps] = {}
+        self._baselines: Dict[Tuple[str, str], Tuple[np.ndarray, float]] = {}
+        self._deltas: Dict[Tuple[str, str], Dict[str, Dict[str, float]]] = {}
+
+    @classmethod
+    def from_files(cls, template_path: Path = TEMPLATE_MATRIX, build_sets_path: Path = BUILD_SETS_FILE,
+                   rates_dir: Path = RATES_DIR) -> 'SwapEngine':
+        return cls(TemplateExpander.from_files(template_path, build_sets_path, rates_dir))
+
+    def swaps(self, template_id: str) -> TemplateSwaps:
+        swaps = self._swaps.get(template_id)
+        if swaps is None:
+            swaps = self._swaps[template_id] = TemplateSwaps(self.expander, template_id, self.rules)
+        return swaps
+
+    def _line_amounts(self, rows: np.ndarray, quantities: np.ndarray, region: Mapping) -> np.ndarray:
+        rates = np.where(rows >= 0, self.expander.region_rates(rows, [region])[:, 0], 0.0)
+        return py_round(quantities * rates, 2)
+
+    def baseline(self, template_id: str, region: str) -> Tuple[np.ndarray, float]:
+        """(line amounts, total) of the unswapped template in region (cached)."""
+        record = self.expander.regions[region]
+        key = (template_id, record['code'])
+        cached = self._baselines.get(key)
+        if cached is None:
+            expanded = self.expander.expand(template_id)
+            amounts = self._line_amounts(expanded.rows, expanded.quantities, record)
+            cached = self._baselines[key] = (amounts, round(float(amounts.sum()), 2))
+        return cached
+
+    def deltas(self, template_id: str, region: str) -> Dict[str, Dict[str, float]]:
+        """{category: {option: delta}} in region; only touched lines are re-priced."""
+        record = self.expander.regions[region]
+        key = (template_id, record['code'])
+        cached = self._deltas.get(key)
+        if cached is not None:
+            return cached
+
+        amounts, _ = self.baseline(template_id, region)
+        swaps = self.swaps(template_id)
+        quantities = swaps.expanded.quantities
+        cached = {}
+        for category, cat in swaps.categories.items():
+            base = float(amounts[cat.lines].sum())
+            options = list(cat.options)
+            # All options of a category in one (options x lines) pass
+            rows = np.stack([cat.options[o] for o in options]) if len(cat.lines) else np.zeros((len(options), 0),
+                                                                                                dtype=np.int64)
+            priced = self._line_amounts(rows.ravel(), np.tile(quantities[cat.lines], len(options)), record)
+            totals = priced.reshape(len(options), -1).sum(axis=1)
+            cached[category] = {o: round(float(t) - base, 2) for o, t in zip(options, totals)}
+        self._deltas[key] = cached
+        return cached
+
+    def price_swap(self, template_id: str, region: str, selection: Mapping[str, str]) -> Dict:
+        """Total and per-category deltas for one selection {category: option}."""
+        deltas = self.deltas(template_id, region)
+        _, total = self.baseline(template_id, region)
+        applied = {}
+        for category, option in selection.items():
+            if category not in deltas:
+                raise KeyError(f'No swap rules for category: {category}')
+            if option not in deltas[category]:
+                reason = self.swaps(template_id).categories[category].unresolved.get(option)
+                if reason:
+                    raise KeyError(f'Unresolved {category} option: {option} ({reason})')
+                raise KeyError(f'Unknown {category} option: {option}')
+            applied[category] = {'option': option, 'delta': deltas[category][option]}
+        delta = round(sum(a['delta'] for a in applied.values()), 2)
+        return {'template_id': template_id, 'region': self.expander.regions[region]['code'],
+                'baseline': total, 'delta': delta, 'total': round(total + delta, 2), 'swaps': applied}
+
+    def enumerate(self, template_id: str, region: str, max_total: Optional[float] = None,
+                  min_total: Optional[float] = None) -> Iterator[Tuple[float, Dict[str, str]]]:
+        """
+        Lazily yield (total, {category: option}) for every swap combination
+        in ascending total, stopping once totals exceed max_total. Totals
+        below min_total are skipped (they still have to be popped). Options
+        resolving to the same composites as an earlier one (e.g. a named
+        option equal to the baseline scope) are enumerated once.
+        """
+        deltas = self.deltas(template_id, region)
+        _, baseline = self.baseline(template_id, region)
+        swaps = self.swaps(template_id)
+        categories = list(deltas)
+        ranked = [sorted(((o, deltas[c][o]) for o in swaps.categories[c].distinct()), key=lambda item: item[1])
+                  for c in categories]
+        values = [np.array([d for _, d in options]) for options in ranked]
+
+        start = (0,) * len(categories)
+        heap = [(baseline + sum(v[0] for v in values), start)]
+        seen = {start}
+        while heap:
+            total, index = heapq.heappop(heap)
+            if max_total is not None and total > max_total:
+                return
+            if min_total is None or total >= min_total:
+                yield round(total, 2), {c: ranked[i][j][0] for i, (c, j) in enumerate(zip(categories, index))}
+            for i, j in enumerate(index):
+                if j + 1 < len(values[i]):
+                    successor = index[:i] + (j + 1,) + index[i + 1:]
+                    if successor not in seen:
+                        seen.add(successor)
+                        heapq.heappush(heap, (total + values[i][j + 1] - values[i][j], successor))
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def _parse_selection(values: Sequence[str]) -> Dict[str, str]:
+    selection = {}
+    for value in values:
+        category, sep, option = value.partition('=')
+        if not sep:
+            raise ValueError(f'Expected CATEGORY=OPTION, got {value!r}')
+        selection[category.strip()] = option.strip()
+    return selection
+
+
+def benchmark(engine: SwapEngine, region: str, repeat: int = 5):
+    template_ids = [t for t in engine.expander.templates if engine.expander.expand(t).build_set]
+    start = time.perf_counter()
+    for template_id in template_ids:
+        engine.deltas(template_id, region)
+    prepare = time.perf_counter() - start
+
+    timings, count = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(1 for t in template_ids for _ in engine.enumerate(t, region))
+        timings.append(time.perf_counter() - start)
+    per_combo = np.median(timings) / max(count, 1) * 1e6
+    print(f"{len(template_ids)} templates: deltas {prepare * 1000:.1f} ms, "
+          f"{count} combinations enumerated in {np.median(timings) * 1000:.1f} ms ({per_combo:.2f} us each)")
+
+    template_id = template_ids[0]
+    _, baseline = engine.baseline(template_id, region)
+    start = time.perf_counter()
+    cheapest = [total for total, _ in zip(engine.enumerate(template_id, region, max_total=baseline), range(20))]
+    print(f"{template_id}: {len(cheapest)} cheapest combinations within baseline "
+          f"in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Swap-delta pricing for template applicable_swaps')
+    parser.add_argument('command', nargs='?', choices=('options', 'swap', 'enumerate'))
+    parser.add_argument('template', nargs='?', help='Template id')
+    parser.add_argument('--region', help='Region code or name (default: baseline)')
+    parser.add_argument('--set', action='append', default=[], metavar='CATEGORY=OPTION',
+                        help='Swap selection for "swap" (repeatable)')
+    parser.add_argument('--max-total', type=float, help='Upper cost bound for "enumerate"')
+    parser.add_argument('--min-total', type=float, help='Lower cost bound for "enumerate"')
+    parser.add_argument('--limit', type=int, default=50, help='Maximum combinations to list (default 50)')
+    parser.add_argument('--templates', default=str(TEMPLATE_MATRIX), help='template-matrix.json path')
+    parser.add_argument('--build-sets', default=str(BUILD_SETS_FILE), help='Build sets JSON path')
+    parser.add_argument('--rates-dir', default=str(RATES_DIR),
+                        help='Directory holding group_*.json composite files')
+    parser.add_argument('--bench', action='store_true', help='Enumerate every combination of every template')
+    args = parser.parse_intermixed_args()
+
+    engine = SwapEngine.from_files(Path(args.templates), Path(args.build_sets), Path(args.rates_dir))
+    region = args.region or engine.expander.regions.baseline['code']
+
+    if args.bench:
+        benchmark(engine, region)
+        return 0
+    if not args.command or not args.template:
+        parser.error('give a command and a template id, or --bench')
+
+    try:
+        if args.command == 'options':
+            deltas = engine.deltas(args.template, region)
+            swaps = engine.swaps(args.template)
+            _, baseline = engine.baseline(args.template, region)
+            print(f"{args.template} in {region}: baseline {baseline:,.2f}")
+            for category, options in deltas.items():
+                lines = swaps.categories[category].lines
+                print(f"  {category} ({len(lines)} lines)")
+                for option, delta in options.items():
+                    print(f"    {option:<22} {delta:>+14,.2f}")
+                for option, reason in swaps.categories[category].unresolved.items():
+                    print(f"    {option:<22} {'unresolved':>14}  ({reason})")
+            if swaps.unsupported:
+                print(f"  No swap rules or scope for: {', '.join(swaps.unsupported)}")
+            return 0
+
+        if args.command == 'swap':
+            json.dump(engine.price_swap(args.template, region, _parse_selection(args.set)),
+                      sys.stdout, indent=2)
+            print()
+            return 0
+
+        start = time.perf_counter()
+        combos = list(zip(engine.enumerate(args.template, region, args.max_total, args.min_total),
+                          range(args.limit)))
+        elapsed = time.perf_counter() - start
+        for (total, selection), _ in combos:
+            changed = ', '.join(f'{c}={o}' for c, o in selection.items() if o != BASELINE) or BASELINE
+            print(f"  {total:>14,.2f}  {changed}")
+        print(f"{len(combos)} combinations in {elapsed * 1000:.2f} ms")
+        return 0
+    except (KeyError, ValueError) as e:
+        print(f"ERROR: {e.args[0]}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""
+Expand template-matrix.json templates into priced estimates.
+
+templates/template-matrix.json describes each template by its
+specifications only; scope comes from the build sets in
+heuristics-source/australian-residential-build-sets.json, whose
+``scope_items`` carry a quantity, unit and nrm_level2_code. A template uses
+the build set with the same GFA and bedroom count, or else the nearest one
+of its sector with quantities scaled by GFA (measured units linearly,
+counts rounded, ``item`` allowances unchanged). Templates with no build set
+in their sector have no scope: they are reported as unpriced, never as a
+complete zero total.
+
+Scope items resolve to composites through an NRM level 2 index built once
+over the library: an item takes the composite whose name and description
+best match its description's keywords (idf weighted, with sizes compared
+numerically), among composites of its level 2 code and, at a discount,
+the rest of its NRM section, in a unit its quantity converts to. m³
+footing and slab items are converted to the composite's m or m² by their
+section or thickness. A small override table next to the build sets
+(australian-residential-scope-overrides.json) maps the items the index
+gets wrong, items covered by another line's composite (listed with no
+amount) and items with no composite at all. Items left unresolved are
+listed, and a template's total is only reported once all of its scope is
+priced. Resolutions are cached per (code, unit, description) and expanded
+templates per template id, so
+a resolved template is a pair of row and quantity arrays.
+
+Pricing follows RegionalView: a rate in a region is round(total_rate *
+region factor / source factor, 2) and a line is round(qty * rate, 2), so
+all templates in all regions are one (lines x regions) array:
+
+    python template_estimates.py expand au-res-3bed-house-150 --region NT
+    python template_estimates.py batch --output /tmp/template_estimates.json
+"""
+import argparse
+import json
+import math
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from costing_kernel import py_round
+from regional_rates import Regions, load_regions
+
+BASE_DIR = Path(__file__).parent.parent
+RATES_DIR = BASE_DIR / 'au' / 'seed-data' / 'composite_rates'
+TEMPLATE_MATRIX = BASE_DIR / 'templates' / 'template-matrix.json'
+BUILD_SETS_FILE = BASE_DIR / 'heuristics-source' / 'australian-residential-build-sets.json'
+
+# Scope item units as written in the build sets -> composite units
+UNIT_ALIASES = {'no': 'nr', 'no.': 'nr', 'each': 'nr', 'ea': 'nr', 'm2': 'm²', 'm3': 'm³'}
+MEASURED_UNITS = frozenset(('m', 'm²', 'm³', 't'))
+ALLOWANCE_UNITS = frozenset(('item',))
+
+# An allowance of one item is priced against per-number composites
+COMPATIBLE_UNITS = {'item': ('item', 'nr')}
+
+# Keyword scoring of scope items against composites. Words are weighted by
+# their rarity across the library (idf), so boilerplate shared by a whole
+# bucket ("Floor finish - ...") counts for little; matches in a composite's
+# name count fully and in its description by DESCRIPTION_WEIGHT, and
+# unmatched name words are a penalty. Sizes (300x600, 250L, 7kW) add up to
+# SIZE_WEIGHT by how close they are. Composites in the item's NRM section
+# but another level 2 code compete at SECTION_WEIGHT of their score, and an
+# item whose best score is below MIN_SIMILARITY is left unresolved.
+MIN_SIMILARITY = 0.12
+SECTION_WEIGHT = 0.7
+DESCRIPTION_WEIGHT = 0.5
+SIZE_WEIGHT = 0.15
+# Build sets describe standard residential work
+PREFERRED_WORDS = frozenset(('standard', 'residential'))
+STOPWORDS = frozenset((
+    'all', 'and', 'are', 'around', 'area', 'deep', 'for', 'high', 'include', 'includes', 'including',
+    'install', 'installation', 'per', 'ready', 'supply', 'system', 'the', 'thick', 'type', 'wide', 'width', 'with',
+))
+_WORD_RE = re.compile(r'[a-z]+')
+_DIMS_RE = re.compile(r'(\d+(?:\.\d+)?)\s*x\s*(\d+(?:\.\d+)?)')
+_MEASURE_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(mm|kw|l|m|min)\b')
+
+# Exceptions to the index: composites for items it ranks wrongly or that
+# are coded outside the composite's NRM section, items whose cost is part of
+# another line's composite, and items with no composite in the library
+SCOPE_OVERRIDES_FILE = BASE_DIR / 'heuristics-source' / 'australian-residential-scope-overrides.json'
+
+# Resolution status of a scope line
+# (mapped: composite from the override table, matched: from the NRM index)
+MAPPED, MATCHED, INCLUDED, UNRESOLVED = 'mapped', 'matched', 'included', 'unresolved'
+
+
+def normalise_unit(unit: Optional[str]) -> str:
+    unit = (unit or '').strip()
+    return UNIT_ALIASES.get(unit.lower(), unit)
+
+
+def load_templates(path: Path = TEMPLATE_MATRIX) -> List[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [template for templates in data['sectors'].values() for template in templates]
+
+
+def load_build_sets(path: Path = BUILD_SETS_FILE) -> List[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['build_sets']
+
+
+def load_composites(rates_dir: Path = RATES_DIR) -> List[Dict]:
+    rates = []
+    for path in sorted(Path(rates_dir).glob('group_*.json')):
+        with open(path, 'r', encoding='utf-8') as f:
+            rates.extend(json.load(f).get('rates', []))
+    return rates
+
+
+def _sector(record: Mapping) -> str:
+    return record.get('sector') or record.get('specifications', {}).get('building_type', '')
+
+
+class ScopeOverrides:
+    """Compiled override table; see SCOPE_OVERRIDES_FILE."""
+
+    def __init__(self, data: Mapping):
+        def compile_entries(key):
+            return [(re.compile(e['pattern'], re.IGNORECASE), e.get('code')) for e in data.get(key, [])]
+
+        self.composites = compile_entries('composites')
+        self.included = compile_entries('included')
+        self.unpriced = compile_entries('unpriced')
+
+    @staticmethod
+    def _first(entries: Sequence[Tuple['re.Pattern', Optional[str]]], description: str):
+        return next((code for pattern, code in entries if pattern.search(description or '')), None)
+
+    def composite(self, description: str) -> Optional[str]:
+        return self._first(self.composites, description)
+
+    def included_in(self, description: str) -> Optional[str]:
+        return self._first(self.included, description)
+
+    def is_unpriced(self, description: str) -> bool:
+        return any(pattern.search(description or '') for pattern, _ in self.unpriced)
+
+
+def load_scope_overrides(path: Path = SCOPE_OVERRIDES_FILE) -> ScopeOverrides:
+    with open(path, 'r', encoding='utf-8') as f:
+        return ScopeOverrides(json.load(f))
+
+
+def _stem(word: str) -> str:
+    for suffix in ('ing', 'es', 's', 'e'):
+        if len(word) > 4 and word.endswith(suffix) and not word.endswith('ss'):
+            return word[:-len(suffix)]
+    return word
+
+
+def keywords(text: Optional[str]) -> Tuple[frozenset, frozenset, frozenset]:
+    """
+    (word stems, dimension pairs, measures) of a description.
+
+    Dimension pairs are sorted, so 300×600mm and 600x300 agree; measures
+    are (unit, value) pairs such as ('kw', 5.0) for both "5kW" and "5.0kW".
+    """
+    text = (text or '').lower().replace('×', 'x')
+    dims = frozenset(tuple(sorted((float(a), float(b)))) for a, b in _DIMS_RE.findall(text))
+    measures = frozenset((unit, float(value)) for value, unit in _MEASURE_RE.findall(_DIMS_RE.sub(' ', text)))
+    words = frozenset(_stem(w) for w in _WORD_RE.findall(text) if len(w) > 2 and w not in STOPWORDS)
+    return words, dims, measures
+
+
+def volume_divisor(item: Mapping) -> Tuple[Optional[float], int]:
+    """
+    (divisor, dimensions) turning an m³ scope item into a length (two
+    dimensions: width x depth) or an area (one: thickness).
+
+    Dimensions are the metre factors of the item's derivation (e.g. "GFA
+    150m² × 0.15m (100mm slab + thickening) × 1.05 (5% concrete waste)"),
+    which also carries any waste allowance; otherwise the mm sizes given as
+    wide/deep/thick in the description. (None, 0) if neither has any.
+    """
+    derivation = item.get('derivation') or ''
+    metres = [float(v) for v in re.findall(r'×\s*(0\.\d+)\s*m\b', derivation)]
+    if not metres:
+        metres = [int(v) / 1000 for v in re.findall(r'(\d+)\s*mm\s+(?:wide|deep|thick)', item.get('description') or '')]
+    if not metres:
+        return None, 0
+    waste = re.search(r'×\s*(1\.\d+)\s*\(\d+%[^)]*waste', derivation)
+    return math.prod(metres) * (float(waste.group(1)) if waste else 1.0), len(metres)
+
+
+def convert_quantity(item: Mapping, qty: float, unit: str, target_unit: str) -> Optional[float]:
+    """qty in the composite's unit, or None if the units cannot be reconciled."""
+    if target_unit == unit or target_unit in COMPATIBLE_UNITS.get(unit, ()):
+        return qty
+    if unit == 'm³' and target_unit in ('m²', 'm'):
+        divisor, dimensions = volume_divisor(item)
+        if divisor and dimensions == (1 if target_unit == 'm²' else 2):
+            return round(qty / divisor, 2)
+    return None
+
+
+# =============================================================================
+# NRM LEVEL 2 INDEX
+# =============================================================================
+
+class NrmIndex:
+    """
+    Composite rows bucketed by NRM section, with their keywords and the
+    library-wide idf of each word.
+    """
+
+    def __init__(self, composites: Sequence[Mapping]):
+        self.composites = list(composites)
+        self.rows_by_code = {rate.get('code'): row for row, rate in enumerate(self.composites)}
+        self.rows_by_name = {rate.get('name'): row for row, rate in reversed(list(enumerate(self.composites)))}
+        self.nrm_codes = [str(rate.get('nrm1_l2_code') or '') for rate in self.composites]
+        self.units = [normalise_unit(rate.get('unit')) for rate in self.composites]
+        self.names = [keywords(rate.get('name')) for rate in self.composites]
+        self.descriptions = [keywords(rate.get('description')) for rate in self.composites]
+        self.sections: Dict[str, List[int]] = {}
+        document_frequency: Dict[str, int] = {}
+        for row, code in enumerate(self.nrm_codes):
+            self.sections.setdefault(code.split('.')[0], []).append(row)
+            for word in self.names[row][0] | self.descriptions[row][0]:
+                document_frequency[word] = document_frequency.get(word, 0) + 1
+        n = len(self.composites)
+        self._idf = {word: math.log((n + 1) / (df + 0.5)) for word, df in document_frequency.items()}
+        self._unseen_idf = math.log((n + 1) / 0.5)
+        self._resolved: Dict[Tuple, Tuple[int, float]] = {}
+
+    def idf(self, word: str) -> float:
+        return self._idf.get(word, self._unseen_idf)
+
+    def score(self, query: Tuple[frozenset, frozenset, frozenset], row: int) -> float:
+        """Keyword similarity of a description's keywords to a composite."""
+        words, dims, measures = query
+        name_words, name_dims, name_measures = self.names[row]
+        text_words, text_dims, text_measures = self.descriptions[row]
+        idf = self.idf
+        total = sum(idf(w) for w in words) or 1.0
+        shared = (sum(idf(w) for w in words & name_words)
+                  + DESCRIPTION_WEIGHT * sum(idf(w) for w in words & (text_words - name_words)))
+        extra = sum(idf(w) for w in name_words - words - PREFERRED_WORDS)
+        score = shared / (total + DESCRIPTION_WEIGHT * extra)
+
+        composite_dims = name_dims | text_dims
+        if dims and composite_dims:
+            score += SIZE_WEIGHT if dims & composite_dims else -SIZE_WEIGHT / 3
+        composite_measures = name_measures | text_measures
+        for unit, value in measures:
+            values = [v for u, v in composite_measures if u == unit and v > 0]
+            if values and value > 0:
+                score += SIZE_WEIGHT * max(0.0, 1.0 - min(abs(math.log(value / v)) for v in values))
+        if (name_words | text_words) & PREFERRED_WORDS:
+            score += 0.02
+        return score
+
+    def resolve(self, item: Mapping) -> Tuple[int, float]:
+        """(composite row, similarity) for a scope item; row -1 if unresolved."""
+        nrm_code = str(item.get('nrm_level2_code') or '')
+        unit = normalise_unit(item.get('unit'))
+        description = item.get('description') or ''
+        dimensions = volume_divisor(item)[1] if unit == 'm³' else 0
+        key = (nrm_code, unit, description, dimensions)
+        cached = self._resolved.get(key)
+        if cached is not None:
+            return cached
+
+        query = keywords(description)
+        best = (-1, 0.0)
+        for row in self.sections.get(nrm_code.split('.')[0], ()):
+            if convert_quantity(item, 1.0, unit, self.units[row]) is None:
+                continue
+            score = self.score(query, row) * (1.0 if self.nrm_codes[row] == nrm_code else SECTION_WEIGHT)
+            if score > best[1]:
+                best = (row, score)
+        if best[1] < MIN_SIMILARITY:
+            best = (-1, best[1])
+        self._resolved[key] = best
+        return best
+
+
+# =============================================================================
+# EXPANSION
+# =============================================================================
+
+class ExpandedTemplate:
+    """A template's scope as resolved composite rows and quantities."""
+
+    def __init__(self, template: Mapping, build_set: Optional[Mapping], scale: float,
+                 items: List[Dict], rows: np.ndarray, quantities: np.ndarray):
+        self.template = template
+        self.build_set = build_set
+        self.scale = scale
+        self.items = items
+        self.rows = rows
+        self.quantities = quantities
+
+    @property
+    def template_id(self) -> str:
+        return self.template['template_id']
+
+    @property
+    def scoped(self) -> bool:
+        """Whether the template has a build set; without one it cannot be priced."""
+        return self.build_set is not None
+
+    @property
+    def complete(self) -> bool:
+        """Whether every line of a scoped template is priced or included."""
+        return self.scoped and not self.unresolved.any()
+
+    @property
+    def resolved(self) -> np.ndarray:
+        """Lines priced against a composite."""
+        return self.rows >= 0
+
+    @property
+    def unresolved(self) -> np.ndarray:
+        """Lines with no composite, whose cost is missing from any total."""
+        return np.array([item['status'] == UNRESOLVED for item in self.items], dtype=bool)
+
+
+def _scale_quantity(qty: float, unit: str, scale: float) -> float:
+    if scale == 1.0 or unit in ALLOWANCE_UNITS:
+        return qty
+    if unit in MEASURED_UNITS:
+        return round(qty * scale, 2)
+    return float(max(1, round(qty * scale)))
+
+
+class TemplateExpander:
+    """Resolve templates to composites and price them per region."""
+
+    def __init__(self, templates: Sequence[Mapping], build_sets: Sequence[Mapping],
+                 composites: Sequence[Mapping], regions: Optional[Regions] = None,
+                 overrides: Optional[ScopeOverrides] = None):
+        self.templates = {t['template_id']: t for t in templates}
+        self.build_sets = list(build_sets)
+        self.index = NrmIndex(composites)
+        self.overrides = overrides or load_scope_overrides()
+        self.regions = regions or Regions(load_regions())
+        self.codes = [rate.get('code') for rate in self.index.composites]
+        self.total_rate = np.array([rate.get('total_rate') or 0.0 for rate in self.index.composites], dtype=float)
+        self.source_factor = np.array([float(self.regions.source(rate)['factor'])
+                                       for rate in self.index.composites], dtype=float)
+        self._expanded: Dict[str, ExpandedTemplate] = {}
+
+    @classmethod
+    def from_files(cls, template_path: Path = TEMPLATE_MATRIX, build_sets_path: Path = BUILD_SETS_FILE,
+                   rates_dir: Path = RATES_DIR, overrides_path: Path = SCOPE_OVERRIDES_FILE) -> 'TemplateExpander':
+        return cls(load_templates(template_path), load_build_sets(build_sets_path), load_composites(rates_dir),
+                   overrides=load_scope_overrides(overrides_path))
+
+    def build_set_for(self, template: Mapping) -> Tuple[Optional[Mapping], float]:
+        """(build set, GFA scale) for a template; (None, 0.0) if its sector has none."""
+        spec = template.get('specifications', {})
+        gfa = spec.get('gfa_m2')
+        candidates = [b for b in self.build_sets if _sector(b) == template.get('sector')]
+        if not candidates or not gfa:
+            return None, 0.0
+
+        def distance(build_set):
+            other = build_set['specifications']
+            return (other.get('bedrooms') != spec.get('bedrooms'), abs(other['gfa_m2'] - gfa))
+
+        best = min(candidates, key=distance)
+        return best, gfa / best['specifications']['gfa_m2']
+
+    def resolve_item(self, item: Mapping, scale: float = 1.0) -> Tuple[int, Dict]:
+        """
+        (composite row, line) for a build set scope item; row -1 unless priced.
+
+        The line's qty and unit are in the composite's unit: m³ footings and
+        slabs priced per m or m² are converted through volume_divisor, with
+        the measured quantity kept as measured_qty / measured_unit. A
+        composite whose unit cannot be reconciled leaves the item
+        unresolved.
+        """
+        unit = normalise_unit(item.get('unit'))
+        description = item.get('description') or ''
+        qty = _scale_quantity(float(item.get('qty') or 0), unit, scale)
+        line = {
+            'nrm_level2_code': item.get('nrm_level2_code'),
+            'description': item.get('description'),
+            'unit': unit,
+            'qty': qty,
+            'code': None,
+            'similarity': None,
+            'status': UNRESOLVED,
+        }
+
+        included = self.overrides.included_in(description)
+        if included in self.index.rows_by_code:
+            line.update(status=INCLUDED, included_in=included)
+            return -1, line
+
+        if self.overrides.is_unpriced(description):
+            return -1, line
+
+        code = self.overrides.composite(description)
+        if code in self.index.rows_by_code:
+            row, score, status = self.index.rows_by_code[code], 1.0, MAPPED
+        else:
+            (row, score), status = self.index.resolve(item), MATCHED
+        line['similarity'] = round(score, 3)
+        if row < 0:
+            return -1, line
+
+        target_unit = normalise_unit(self.index.composites[row].get('unit'))
+        converted = convert_quantity(item, qty, unit, target_unit)
+        if converted is None:
+            line['unit_mismatch'] = target_unit
+            return -1, line
+        if target_unit != unit and unit not in COMPATIBLE_UNITS:
+            line.update(measured_qty=qty, measured_unit=unit, unit=target_unit, qty=converted)
+        line.update(code=self.codes[row], status=status)
+        return row, line
+
+    def expand(self, template_id: str) -> ExpandedTemplate:
+        """Resolved scope of a template (cached); KeyError for an unknown id."""
+        expanded = self._expanded.get(template_id)
+        if expanded is not None:
+            return expanded
+
+        template = self.templates.get(template_id)
+        if template is None:
+            raise KeyError(f'Unknown template: {template_id}')
+        build_set, scale = self.build_set_for(template)
+        items, rows = [], []
+        for item in (build_set or {}).get('scope_items', []):
+            row, line = self.resolve_item(item, scale)
+            items.append(line)
+            rows.append(row)
+        quantities = np.array([i['qty'] for i in items], dtype=float)
+        expanded = ExpandedTemplate(template, build_set, scale, items, np.array(rows, dtype=np.int64), quantities)
+        self._expanded[template_id] = expanded
+        return expanded
+
+    def region_rates(self, rows: np.ndarray, regions: Sequence[Mapping]) -> np.ndarray:
+        """(rows x regions) composite rates, as RegionalView prices them."""
+        factors = np.array([float(r['factor']) for r in regions], dtype=float)
+        rows = np.maximum(rows, 0)
+        ratio = factors[None, :] / self.source_factor[rows, None]
+        return py_round(self.total_rate[rows, None] * ratio, 2)
+
+    def price(self, template_id: str, region: str) -> Dict:
+        """
+        Priced estimate of one template in one region.
+
+        ``total`` is None while any scope item is unresolved: ``priced_total``
+        then covers the priced lines only and ``unresolved_items`` lists the
+        scope missing from it. A template without a build set is never
+        complete and has no total.
+        """
+        expanded = self.expand(template_id)
+        record = self.regions[region]
+        rates = self.region_rates(expanded.rows, [record])[:, 0]
+        rates = np.where(expanded.resolved, rates, 0.0)
+        amounts = py_round(expanded.quantities * rates, 2)
+        lines = [dict(item, rate=float(rate), amount=float(amount)) if resolved else dict(item)
+                 for item, rate, amount, resolved in zip(expanded.items, rates, amounts, expanded.resolved)]
+        unresolved = [{'description': item['description'], 'qty': item['qty'], 'unit': item['unit']}
+                      for item in expanded.items if item['status'] == UNRESOLVED]
+        priced_total = round(float(amounts.sum()), 2)
+        return {
+            'template_id': template_id,
+            'name': expanded.template.get('name'),
+            'region': record['code'],
+            'build_set': expanded.build_set['template_id'] if expanded.build_set else None,
+            'gfa_scale': round(expanded.scale, 4),
+            'complete': expanded.complete,
+            'total': priced_total if expanded.complete else None,
+            'priced_total': priced_total,
+            'unresolved': len(unresolved),
+            'unresolved_items': unresolved,
+            'lines': lines,
+        }
+
+    def price_all(self, template_ids: Optional[Sequence[str]] = None,
+                  regions: Optional[Sequence[Mapping]] = None
+                  ) -> Tuple[List[str], List[Mapping], np.ndarray, np.ndarray]:
+        """
+        (template ids, regions, priced totals[template, region], unresolved
+        item counts[template]) for every template in every region, priced as
+        one concatenated (lines x regions) array. A template's total is
+        complete only when it has a build set and its unresolved count is 0;
+        templates without one total 0 and are not complete.
+        """
+        template_ids = list(template_ids or self.templates)
+        regions = list(regions or self.regions.regions)
+        expanded = [self.expand(t) for t in template_ids]
+        rows = np.concatenate([e.rows for e in expanded] + [np.zeros(0, dtype=np.int64)])
+        quantities = np.concatenate([e.quantities for e in expanded] + [np.zeros(0)])
+        owner = np.repeat(np.arange(len(expanded)), [len(e.rows) for e in expanded])
+
+        rates = np.where((rows >= 0)[:, None], self.region_rates(rows, regions), 0.0)
+        amounts = py_round(quantities[:, None] * rates, 2)
+        totals = np.zeros((len(expanded), len(regions)))
+        np.add.at(totals, owner, amounts)
+        unresolved = np.array([int(e.unresolved.sum()) for e in expanded], dtype=np.int64)
+        return template_ids, regions, totals, unresolved
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Expand templates into priced estimates')
+    parser.add_argument('command', choices=('expand', 'batch'))
+    parser.add_argument('template', nargs='?', help='Template id for "expand"')
+    parser.add_argument('--region', help='Region code or name (default: baseline)')
+    parser.add_argument('--templates', default=str(TEMPLATE_MATRIX), help='template-matrix.json path')
+    parser.add_argument('--build-sets', default=str(BUILD_SETS_FILE), help='Build sets JSON path')
+    parser.add_argument('--rates-dir', default=str(RATES_DIR),
+                        help='Directory holding group_*.json composite files')
+    parser.add_argument('--output', help='Write the batch totals to this JSON file')
+    args = parser.parse_intermixed_args()
+
+    expander = TemplateExpander.from_files(Path(args.templates), Path(args.build_sets), Path(args.rates_dir))
+
+    if args.command == 'expand':
+        if not args.template:
+            parser.error('expand needs a template id')
+        try:
+            estimate = expander.price(args.template, args.region or expander.regions.baseline['code'])
+        except KeyError as e:
+            print(f"ERROR: {e.args[0]}", file=sys.stderr)
+            return 1
+        json.dump(estimate, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return 0
+
+    start = time.perf_counter()
+    template_ids, regions, totals, unresolved = expander.price_all()
+    elapsed = time.perf_counter() - start
+    unscoped = [t for t in template_ids if not expander.expand(t).scoped]
+    print(f"Priced {len(template_ids)} templates x {len(regions)} regions in {elapsed * 1000:.1f} ms "
+          f"({len(template_ids) - len(unscoped)} templates have a build set)")
+    baseline = next(i for i, r in enumerate(regions) if r is expander.regions.baseline)
+    for i, template_id in enumerate(template_ids):
+        expanded = expander.expand(template_id)
+        if expanded.scoped:
+            status = f"incomplete: {unresolved[i]} of {len(expanded.rows)} items unpriced" if unresolved[i] else 'complete'
+            print(f"  {template_id:<40} {totals[i, baseline]:>14,.2f}  ({status})")
+    if unscoped:
+        print(f"Unpriced, no build set ({len(unscoped)}):")
+        for template_id in unscoped:
+            print(f"  {template_id}")
+
+    if args.output:
+        result = {
+            'regions': [r['code'] for r in regions],
+            'templates': {},
+            'unscoped': unscoped,
+        }
+        for i, template_id in enumerate(template_ids):
+            expanded = expander.expand(template_id)
+            result['templates'][template_id] = {
+                'build_set': expanded.build_set['template_id'] if expanded.scoped else None,
+                'complete': expanded.complete,
+                'unresolved': int(unresolved[i]),
+                'priced_totals': dict(zip((r['code'] for r in regions), totals[i].round(2).tolist()))
+                if expanded.scoped else None,
+            }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""Tests for rebasing rates across regions and dates."""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'scripts'))
+import adjustments  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return adjustments.AdjustmentEngine.from_sources()
+
+
+def rate(code, base_date=None):
+    rate = {'code': code, 'region': 'Sydney Metro', 'total_rate': 100.0, 'nett_total': 90.0}
+    if base_date is not None:
+        rate['base_date'] = base_date
+    return rate
+
+
+def test_rates_without_usable_base_date_are_unresolved(engine):
+    library = adjustments.RateLibrary([rate('A', 'Jan-2025'), rate('B'), rate('C', 'sometime'), rate('D', '')])
+    totals, factors = library.rebase(engine, '2025-09-30', 'MEL_METRO')
+
+    assert factors['unresolved'].tolist() == [False, True, True, True]
+    assert np.isnan(factors['factor'][1:]).all()
+    assert not factors['extrapolated'][1:].any()
+    assert totals['total_rate'][1:].tolist() == [100.0, 100.0, 100.0]
+    assert totals['total_rate'][0] == pytest.approx(100.0 * factors['factor'][0], abs=0.005)
+
+
+def test_line_base_date_overrides_blank_rate_date(engine):
+    library = adjustments.RateLibrary([rate('A')])
+    totals, factors = library.reprice_portfolio(
+        engine, [{'code': 'A', 'quantity': 2}, {'code': 'A', 'quantity': 2, 'base_date': 'Jan-2025'}], '2025-09-30')
+    assert factors['unresolved'].tolist() == [True, False]
+    assert totals['amount'][0] == 200.0
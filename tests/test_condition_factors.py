@@ -0,0 +1,46 @@
+"""Tests for condition factor combinations."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'scripts'))
+import condition_factors  # noqa: E402
+import labour_hours  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def table():
+    return condition_factors.ConditionTable.from_file()
+
+
+@pytest.mark.parametrize('conditions', [
+    {'location': 'difficult_access', 'note': None},
+    {'note': None, 'location': 'difficult_access'},
+])
+def test_none_in_unknown_category_keeps_other_conditions(table, conditions):
+    expected = table.combination({'location': 'difficult_access'})
+    unknown = []
+    assert table.combination(conditions, unknown=unknown) == expected
+    assert unknown == ['Unknown condition category: note']
+    with pytest.raises(ValueError, match='Unknown condition category: note'):
+        table.combination(conditions)
+
+
+def test_none_value_leaves_category_unspecified(table):
+    assert table.combination({'location': None}) == 0
+    assert table.combination({'location': 'difficult_access', 'height': None}) == \
+        table.combination({'location': 'difficult_access'})
+
+
+def test_labour_hours_apply_conditions_beside_unknown_none():
+    calculator = labour_hours.LabourHoursCalculator.from_seed_data()
+    productivity_id = calculator.productivity[0]['id']
+    rows = calculator.calculate_rows([
+        {'productivity_id': productivity_id, 'quantity': 10, 'conditions': {'location': 'difficult_access'}},
+        {'productivity_id': productivity_id, 'quantity': 10,
+         'conditions': {'location': 'difficult_access', 'note': None}},
+    ])
+    assert rows[1]['condition_factor'] == rows[0]['condition_factor'] == pytest.approx(1.2)
+    assert rows[1]['total_hours'] == rows[0]['total_hours']
+    assert 'ignored: Unknown condition category: note' in rows[1]['calculation_notes']
@@ -0,0 +1,70 @@
+"""Regression tests for generate_rates output commits."""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'scripts'))
+import generate_rates  # noqa: E402
+
+STAGING_RATES = [
+    {'code': f'GRP0-TEST-00{i}', 'nrm1_code': '0.1', 'nrm_group': 0, 'description': f'Site clearance {i}',
+     'unit': 'm²', 'nrm2_codes': ['WS3'], 'notes': ''}
+    for i in range(1, 4)
+]
+
+
+@pytest.fixture
+def output(tmp_path, monkeypatch):
+    monkeypatch.setattr(generate_rates, 'output_dir', str(tmp_path))
+    monkeypatch.setattr(generate_rates, 'index_path', str(tmp_path / 'composite_rates_index.json'))
+    monkeypatch.setattr(generate_rates, 'STREAM_BATCH_SIZE', 1)
+    return tmp_path
+
+
+def write_staging(path: Path, lines):
+    path.write_text(''.join(line + '\n' for line in lines), encoding='utf-8')
+    return str(path)
+
+
+def test_streaming_writes_all_rates(output, tmp_path):
+    staging = write_staging(tmp_path / 'rates.ndjson', [json.dumps(r) for r in STAGING_RATES])
+    assert generate_rates.generate_streaming(staging) == {0: 3}
+    group = json.loads((output / 'group_0_facilitating.json').read_text(encoding='utf-8'))
+    assert [r['code'] for r in group['rates']] == [r['code'] for r in STAGING_RATES]
+
+
+def test_streaming_error_leaves_existing_output(output, tmp_path):
+    group_path = output / 'group_0_facilitating.json'
+    index_path = output / 'composite_rates_index.json'
+    group_path.write_text('{"original": true}', encoding='utf-8')
+    index_path.write_text('{"original": true}', encoding='utf-8')
+
+    lines = [json.dumps(r) for r in STAGING_RATES[:2]] + ['{"code": "GRP0-TEST-003", ']
+    staging = write_staging(tmp_path / 'rates.ndjson', lines)
+    with pytest.raises(json.JSONDecodeError):
+        generate_rates.generate_streaming(staging)
+
+    assert group_path.read_text(encoding='utf-8') == '{"original": true}'
+    assert index_path.read_text(encoding='utf-8') == '{"original": true}'
+    assert not list(output.glob('*.tmp'))
+
+
+def test_matrix_reports_each_variant_library(tmp_path, monkeypatch, capsys):
+    staging = write_staging(tmp_path / 'rates.ndjson', [json.dumps(r) for r in STAGING_RATES])
+    out_dir = tmp_path / 'matrix'
+    regions = Path(__file__).resolve().parents[1] / 'au' / 'reference-data' / 'regions.json'
+    monkeypatch.setattr(generate_rates, 'regions_file', str(regions))
+    monkeypatch.setattr(sys, 'argv', ['generate_rates.py', '--matrix', '--input', staging, '--output', str(out_dir),
+                                      '--regions', 'SYD_METRO', 'MEL_METRO', '--spec-levels', 'Standard',
+                                      '--jobs', '1'])
+    generate_rates.main()
+
+    out = capsys.readouterr().out
+    assert 'Wrote composite_rates_index.json' not in out
+    indexes = sorted(out_dir.glob('*/*/*/composite_rates_index.json'))
+    assert len(indexes) == 2
+    for index in indexes:
+        assert f'  {index}: 3 rates' in out
+    assert 'Group 0 (facilitating): 6 rates' in out
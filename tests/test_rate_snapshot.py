@@ -0,0 +1,51 @@
+"""Tests for the binary composite rate snapshot."""
+import json
+import os
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'scripts'))
+import rate_snapshot  # noqa: E402
+
+
+def test_new_snapshot_gets_default_permissions(tmp_path):
+    output = tmp_path / 'rates.snapshot'
+    rate_snapshot.build_snapshot(rate_snapshot.RATES_DIR, output)
+    umask = os.umask(0)
+    os.umask(umask)
+    assert stat.S_IMODE(output.stat().st_mode) == 0o666 & ~umask
+
+
+def test_rebuild_keeps_snapshot_permissions(tmp_path):
+    output = tmp_path / 'rates.snapshot'
+    output.write_bytes(b'')
+    output.chmod(0o640)
+    rate_snapshot.build_snapshot(rate_snapshot.RATES_DIR, output)
+    assert stat.S_IMODE(output.stat().st_mode) == 0o640
+
+
+def test_failed_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    def fail(src, dst):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(rate_snapshot.os, 'replace', fail)
+    with pytest.raises(OSError, match='disk full'):
+        rate_snapshot.build_snapshot(rate_snapshot.RATES_DIR, tmp_path / 'rates.snapshot')
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_bulk_and_single_row_decode_match_group_files(tmp_path):
+    output = tmp_path / 'rates.snapshot'
+    rate_snapshot.build_snapshot(rate_snapshot.RATES_DIR, output)
+    sources = {path.name: json.loads(path.read_text(encoding='utf-8'))
+               for path in sorted(rate_snapshot.RATES_DIR.glob('group_*.json'))}
+
+    snapshot = rate_snapshot.RateSnapshot(output)
+    assert dict(snapshot.documents()) == sources
+    for doc in sources.values():
+        for rate in doc['rates'][::25]:
+            assert snapshot.get_rate(rate['code']) == rate
+    snapshot.close()
@@ -0,0 +1,100 @@
+"""Tests for template expansion and pricing over the seed library."""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'scripts'))
+import template_estimates  # noqa: E402
+
+UNSCOPED_TEMPLATE = 'au-com-office-small-150'
+SCOPED_TEMPLATE = 'au-res-3bed-house-150'
+
+
+@pytest.fixture(scope='module')
+def expander():
+    return template_estimates.TemplateExpander.from_files()
+
+
+def test_template_without_build_set_is_unpriced(expander):
+    estimate = expander.price(UNSCOPED_TEMPLATE, expander.regions.baseline['code'])
+    assert estimate['build_set'] is None
+    assert estimate['complete'] is False
+    assert estimate['total'] is None
+    assert not expander.expand(UNSCOPED_TEMPLATE).complete
+
+
+def test_batch_reports_unscoped_templates_separately(tmp_path, monkeypatch, capsys):
+    output = tmp_path / 'estimates.json'
+    monkeypatch.setattr(sys, 'argv', ['template_estimates.py', 'batch', '--output', str(output)])
+    assert template_estimates.main() == 0
+
+    result = json.loads(output.read_text(encoding='utf-8'))
+    assert UNSCOPED_TEMPLATE in result['unscoped']
+    assert SCOPED_TEMPLATE not in result['unscoped']
+    unscoped = result['templates'][UNSCOPED_TEMPLATE]
+    assert unscoped['complete'] is False
+    assert unscoped['priced_totals'] is None
+    assert all(result['templates'][t]['build_set'] is None for t in result['unscoped'])
+    assert result['templates'][SCOPED_TEMPLATE]['priced_totals']
+    assert 'Unpriced, no build set' in capsys.readouterr().out
+
+
+CORE_ITEMS = {
+    # description prefix: (status, code)
+    'Concrete strip footings': ('matched', 'GRP1-STRFOU-002'),
+    'Concrete slab on ground': ('matched', 'GRP1-GROFLO-025'),
+    'Timber wall framing': ('matched', 'GRP2-TIMFRA-014'),
+    'Internal wall framing': ('matched', 'GRP2-TIMFRA-014'),
+    'Timber roof trusses': ('matched', 'GRP2-ROOSTR-041'),
+    'Metal roofing sheets': ('matched', 'GRP2-ROOSHE-049'),
+    'Aluminium sliding windows': ('matched', 'GRP2-WIN-128'),
+    'Plasterboard walls': ('matched', 'GRP3-WALFIN-002'),
+    'Plasterboard ceilings': ('matched', 'GRP3-CEIFIN-067'),
+    'Wall tiles': ('matched', 'GRP3-WALFIN-006'),
+    'Floor tiles': ('matched', 'GRP3-FLOFIN-029'),
+    'Skirting boards': ('matched', 'GRP3-SKI-018'),
+    'Switchboard': ('matched', 'GRP5-SWI-102'),
+    'Toilet suite': ('matched', 'GRP5-WCSUI-003'),
+    'Hot water system': ('matched', 'GRP5-HOTWAT-041'),
+    'Split system air conditioner': ('matched', 'GRP5-SPLSYS-061'),
+    'Landscaping allowance': ('matched', 'GRP8-TUR-056'),
+    'Brick veneer external walls': ('mapped', 'GRP2-EXTWAL-106'),
+    'Timber laminate flooring': ('mapped', 'GRP3-FLOFIN-042'),
+    'Bath, acrylic': ('mapped', 'GRP4-BAT-027'),
+    'Strip footing excavation': ('included', None),
+    'Wall painting': ('included', None),
+    'Kitchen sink': ('unresolved', None),
+}
+
+
+def build_set_items(expander, template_id):
+    build_set = next(b for b in expander.build_sets if b['template_id'] == template_id)
+    return build_set['scope_items']
+
+
+@pytest.mark.parametrize('prefix', sorted(CORE_ITEMS))
+def test_core_items_resolve_to_expected_composites(expander, prefix):
+    item = next(i for i in build_set_items(expander, 'au-res-3bed-bv-150') if i['description'].startswith(prefix))
+    _, line = expander.resolve_item(item)
+    assert (line['status'], line['code']) == CORE_ITEMS[prefix]
+
+
+def test_volume_items_are_converted_to_composite_units(expander):
+    items = build_set_items(expander, 'au-res-3bed-bv-150')
+    slab = next(i for i in items if i['description'].startswith('Concrete slab on ground'))
+    _, line = expander.resolve_item(slab)
+    assert (line['measured_unit'], line['unit']) == ('m³', 'm²')
+
+
+@pytest.mark.parametrize('description, unit, code', [
+    ('Timber stud wall frame, 90x45', 'm²', 'GRP2-TIMFRA-014'),
+    ('Colorbond corrugated roof sheeting', 'm²', 'GRP2-ROOSHE-049'),
+    ('Ceramic floor tiling 300 x 300mm', 'm²', 'GRP3-FLOFIN-029'),
+    ('Split system AC, 7.0kW', 'no', 'GRP5-SPLSYS-061'),
+])
+def test_index_resolves_reworded_items(expander, description, unit, code):
+    nrm_code = expander.index.composites[expander.index.rows_by_code[code]]['nrm1_l2_code']
+    row, _ = expander.index.resolve({'nrm_level2_code': nrm_code, 'unit': unit, 'description': description})
+    assert expander.codes[row] == code